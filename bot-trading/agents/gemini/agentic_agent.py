@@ -42,6 +42,11 @@ _CX_TOOLS = Tool(
                         "type": "integer",
                         "description": "Number of candles to fetch. Defaults to 200.",
                     },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Only return these result fields (e.g. ['trend', 'premium_discount_zone', 'rsi14', 'potential_entries']). Omit for the full analysis. 'structure_levels' (trend, BOS/CHoCH and order blocks per swing size) is only returned when listed.",
+                    },
                 },
                 "required": ["symbol"],
             },
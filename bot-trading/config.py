@@ -19,3 +19,50 @@ ENV = os.getenv("ENV", "development")  # development, production
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY")
 BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY")
 BINANCE_BASE_URL = os.getenv("BINANCE_BASE_URL", "https://api.binance.com")
+BINANCE_FUTURES_URL = os.getenv("BINANCE_FUTURES_URL", "https://fapi.binance.com")
+
+# Shared keep-alive HTTP pool used for market data requests
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "5"))
+
+# Persistent memory-mapped kline store (services/kline_store.py)
+KLINE_STORE_ENABLED = os.getenv("KLINE_STORE_ENABLED", "true").lower() == "true"
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", "data/klines")
+ARCHIVE_WORKERS = int(os.getenv("ARCHIVE_WORKERS", "0"))  # 0 = one per CPU (services/kline_archive.py)
+
+# Live kline WebSocket ingestion (services/market_stream.py)
+BINANCE_STREAM_URL = os.getenv("BINANCE_STREAM_URL", "wss://fstream.binance.com")
+MARKET_STREAM_BUFFER_SIZE = int(os.getenv("MARKET_STREAM_BUFFER_SIZE", "1000"))
+
+# Shared Binance request-weight budget (services/rate_limiter.py)
+BINANCE_WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", "2400"))
+BINANCE_ORDERS_PER_10S = int(os.getenv("BINANCE_ORDERS_PER_10S", "300"))
+BINANCE_ORDERS_PER_MINUTE = int(os.getenv("BINANCE_ORDERS_PER_MINUTE", "1200"))
+BINANCE_WEIGHT_HEADROOM = float(os.getenv("BINANCE_WEIGHT_HEADROOM", "0.9"))
+
+# Bar-close-aligned cache of analysis inputs (services/candle_cache.py)
+CANDLE_CACHE_SIZE = int(os.getenv("CANDLE_CACHE_SIZE", "256"))
+CANDLE_CACHE_FORMING_TTL = float(os.getenv("CANDLE_CACHE_FORMING_TTL", "5"))
+
+# Candle source for analysis: "rest" (Binance) or "file" (offline, services/candle_source.py)
+CANDLE_SOURCE = os.getenv("CANDLE_SOURCE", "rest")
+CANDLE_SOURCE_DIR = os.getenv("CANDLE_SOURCE_DIR", "data/candles")
+
+# Symbols fetched at once by a cross-symbol indicator scan (services/indicator_scan.py)
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "5"))
+
+# Swing sizes of the optional "structure_levels" SMC field (services/smc_service.py)
+SMC_STRUCTURE_SIZES = tuple(int(s) for s in os.getenv("SMC_STRUCTURE_SIZES", "3,5,10,20,50").split(",") if s.strip())
+
+# Bars between SmcEngine state checkpoints used by as_of replays (services/smc_engine.py)
+SMC_CHECKPOINT_INTERVAL = int(os.getenv("SMC_CHECKPOINT_INTERVAL", "100"))
+
+# Compile the sequential SMC loops with Numba when it is installed (services/smc_kernels.py)
+SMC_NUMBA_ENABLED = os.getenv("SMC_NUMBA_ENABLED", "true").lower() == "true"
+
+# Pivots within this many ATRs of each other form one equal-highs/lows liquidity pool (services/smc_results.py)
+SMC_LIQUIDITY_TOLERANCE_ATR = float(os.getenv("SMC_LIQUIDITY_TOLERANCE_ATR", "0.1"))
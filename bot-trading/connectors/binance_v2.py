@@ -1,10 +1,12 @@
 # https://github.com/binance/binance-connector-python
 # Uses binance-connector-python (UMFutures) instead of binance_sdk_derivatives_trading_usds_futures
 import asyncio
+from urllib.parse import parse_qsl, urlparse
 
 from connectors.telegram import telegram_bot
 from binance.um_futures import UMFutures
 import config
+from services.rate_limiter import default_priority, endpoint_cost, request_budget
 
 BINANCE_API_KEY = config.BINANCE_API_KEY
 BINANCE_SECRET_KEY = config.BINANCE_SECRET_KEY
@@ -16,12 +18,29 @@ EXPECTED_PROFIT = 0.40
 EXPECTED_STOP_LOSS = 0.30
 
 
+class BudgetedUMFutures(UMFutures):
+    """UMFutures that reserves request weight from the shared budget before every call."""
+
+    def _dispatch_request(self, http_method):
+        send = super()._dispatch_request(http_method)
+
+        def dispatch(url, params=None, **kwargs):
+            path = urlparse(url).path
+            weight, orders = endpoint_cost(http_method, path, dict(parse_qsl(params or "")))
+            request_budget.acquire(weight, orders, default_priority(http_method, path))
+            response = send(url=url, params=params, **kwargs)
+            request_budget.record(path, weight, response.status_code, response.headers)
+            return response
+
+        return dispatch
+
+
 class BinanceConnector:
     def __init__(self):
         self.balance = 0
         self.positions = []
 
-        self.client = UMFutures(
+        self.client = BudgetedUMFutures(
             key=BINANCE_API_KEY,
             secret=BINANCE_SECRET_KEY,
             base_url=(
@@ -26,9 +26,9 @@ def _get_cx():
 
 
 def _get_fetch_candles():
-    from tools.cx_connector import _fetch_candles
+    from services.candle_source import candle_source
 
-    return _fetch_candles
+    return candle_source.fetch_candles
 
 
 _binance = None
@@ -263,6 +263,12 @@ async def telegram_bot(message: str, more=None):
 # ─── Command Handlers ─────────────────────────────────────────────────────────
 
 
+# The /analyze reply only shows these, so nothing else is computed
+_ANALYZE_FIELDS = [
+    "trend", "last_bos", "last_choch", "premium_discount_zone", "premium_discount_pct", "rsi14", "potential_entries",
+]
+
+
 async def _cmd_analyze(_: str, args: list):
     try:
         if not args:
@@ -275,7 +281,7 @@ async def _cmd_analyze(_: str, args: list):
 
         loop = asyncio.get_event_loop()
         data = await loop.run_in_executor(
-            None, _get_cx().smc_analysis, symbol, timeframe, limit
+            None, _get_cx().smc_analysis, symbol, timeframe, limit, _ANALYZE_FIELDS
         )
 
         if data.get("status") == "error":
@@ -586,13 +592,12 @@ async def _cmd_order(_: str, args: list):
         loop = asyncio.get_event_loop()
         cx = _get_cx()
 
-        results_4h, results_2h, results_30m = await asyncio.gather(
-            loop.run_in_executor(None, cx.smc_analysis, symbol, "4h", 200),
-            loop.run_in_executor(None, cx.smc_analysis, symbol, "2h", 200),
-            loop.run_in_executor(None, cx.smc_analysis, symbol, "30m", 200),
+        # 30m-based; timeframes too costly to resample from 30m are fetched directly
+        by_tf = await loop.run_in_executor(
+            None, cx.smc_analysis_multi, symbol, ["4h", "2h", "30m"], 200, "30m"
         )
 
-        tf_results = [("4h", results_4h), ("2h", results_2h), ("30m", results_30m)]
+        tf_results = [("4h", by_tf["4h"]), ("2h", by_tf["2h"]), ("30m", by_tf["30m"])]
 
         for tf, data in tf_results:
             if data.get("status") == "error":
@@ -9,12 +9,17 @@ import config
 from routers.stream import stream
 from routers.trading import trading
 from connectors.telegram import listen_messages
+from services import http_client
+from services.market_stream import market_stream
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     asyncio.create_task(listen_messages())
+    await http_client.warm_up()
     yield
+    await market_stream.close()
+    await http_client.aclose()
 
 
 app = FastAPI(title="Trading Bot API", lifespan=lifespan)
@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+from services.analysis_records import Record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded in one pass, skipping FastAPI's jsonable_encoder walk.
+
+    Return it from an endpoint directly (returning a plain dict would still go
+    through jsonable_encoder). Encoded with orjson when installed, else the
+    stdlib json module; analysis records left in the content are written
+    with to_dict().
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
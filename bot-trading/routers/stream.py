@@ -51,7 +51,9 @@ async def stream_text(
     master = get_master_agent(provider)
 
     async def event_generator():
-        for chunk in master(query, model=model):
+        # The agents call blocking tools (REST fetches, budget waits); step them in a worker thread
+        chunks = master(query, model=model)
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
             for line in chunk.splitlines(keepends=True):
                 for char in line:
                     yield f"data: {json.dumps({'character': char})}\n\n"
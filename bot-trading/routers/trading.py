@@ -2,11 +2,19 @@ from typing import List
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 from connectors.binance_v2 import BinanceConnector
+from routers.responses import FastJSONResponse
+from services.candle_cache import candle_cache
+from services.indicator_scan import IndicatorScanService
+from services.market_analysis import MarketAnalysisService
+from services.market_stream import market_stream
+from services.rate_limiter import request_budget
 from services.smc_service import SmcService
 from services.wyckoff_service import WyckoffService
 
 _smc_service = SmcService()
 _wyckoff_service = WyckoffService()
+_market_analysis_service = MarketAnalysisService()
+_indicator_scan_service = IndicatorScanService()
 
 trading = APIRouter()
 
@@ -73,6 +81,16 @@ async def get_models():
     return AI_MODELS
 
 
+@trading.get("/rate-limit")
+async def get_rate_limit():
+    return request_budget.snapshot()
+
+
+@trading.get("/candle-cache")
+async def get_candle_cache():
+    return candle_cache.stats()
+
+
 @trading.get("/pairs")
 async def get_pairs():
     return {"pairs": TRADING_PAIRS}
@@ -88,8 +106,13 @@ class BulkLeverageRequest(BaseModel):
     leverage: int
 
 
+class StreamSubscriptionRequest(BaseModel):
+    symbol: str
+    interval: str
+
+
 @trading.post("/leverage")
-async def change_leverage(request: LeverageRequest):
+def change_leverage(request: LeverageRequest):
     try:
         connector = BinanceConnector()
         result = connector.set_leverage(request.symbol, request.leverage)
@@ -100,26 +123,50 @@ async def change_leverage(request: LeverageRequest):
         return {"success": False, "message": str(e)}
 
 
-@trading.get("/smc")
-async def get_smc_analysis(
+# The analysis routes are plain def: FastAPI runs them in its threadpool, so their
+# blocking fetches and budget waits never hold up the event loop.
+@trading.get("/smc", response_class=FastJSONResponse)
+def get_smc_analysis(
     symbol: str = Query(..., description="Trading pair symbol, e.g. BTCUSDT"),
     timeframe: str = Query("1h", description="Candle timeframe, e.g. 1h, 4h, 1d"),
-    limit: int = Query(200, ge=50, le=1000, description="Number of candles to fetch"),
+    limit: int = Query(200, ge=50, le=10_000, description="Number of candles to fetch (paged beyond 1500)"),
+    fields: str | None = Query(None, description="Comma-separated result fields, e.g. trend,rsi14,potential_entries"),
+    as_of: int | None = Query(None, description="Open time (ms) of a past bar: the analysis as it was at that bar"),
 ):
-    return _smc_service.smc_analysis(symbol, timeframe, limit)
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return FastJSONResponse(_smc_service.smc_analysis(symbol, timeframe, limit, selected, as_of))
 
 
-@trading.get("/wyckoff")
-async def get_wyckoff_analysis(
+@trading.get("/wyckoff", response_class=FastJSONResponse)
+def get_wyckoff_analysis(
     symbol: str = Query(..., description="Trading pair symbol, e.g. BTCUSDT"),
     timeframe: str = Query("1h", description="Candle timeframe, e.g. 1h, 4h, 1d"),
-    limit: int = Query(200, ge=50, le=1000, description="Number of candles to fetch"),
+    limit: int = Query(200, ge=50, le=10_000, description="Number of candles to fetch (paged beyond 1500)"),
 ):
-    return _wyckoff_service.wyckoff_analysis(symbol, timeframe, limit)
+    return FastJSONResponse(_wyckoff_service.wyckoff_analysis(symbol, timeframe, limit))
+
+
+@trading.get("/analysis", response_class=FastJSONResponse)
+def get_market_analysis(
+    symbol: str = Query(..., description="Trading pair symbol, e.g. BTCUSDT"),
+    timeframe: str = Query("1h", description="Candle timeframe, e.g. 1h, 4h, 1d"),
+    limit: int = Query(200, ge=50, le=10_000, description="Number of candles to fetch (paged beyond 1500)"),
+):
+    return FastJSONResponse(_market_analysis_service.market_analysis(symbol, timeframe, limit))
+
+
+@trading.get("/scan", response_class=FastJSONResponse)
+def scan_indicators(
+    symbols: str | None = Query(None, description="Comma-separated symbols; defaults to all trading pairs"),
+    timeframe: str = Query("1h", description="Candle timeframe, e.g. 1h, 4h, 1d"),
+    limit: int = Query(200, ge=50, le=10_000, description="Number of candles per symbol"),
+):
+    selected = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else TRADING_PAIRS
+    return FastJSONResponse(_indicator_scan_service.scan(selected, timeframe, limit))
 
 
 @trading.post("/leverage/bulk")
-async def change_leverage_bulk(request: BulkLeverageRequest):
+def change_leverage_bulk(request: BulkLeverageRequest):
     connector = BinanceConnector()
     results = []
     for symbol in request.symbols:
@@ -144,3 +191,23 @@ async def change_leverage_bulk(request: BulkLeverageRequest):
         except Exception as e:
             results.append({"symbol": symbol, "success": False, "message": str(e)})
     return {"results": results}
+
+
+@trading.get("/stream/subscriptions")
+async def get_stream_subscriptions():
+    return {"subscriptions": market_stream.subscriptions()}
+
+
+@trading.post("/stream/subscribe")
+async def subscribe_stream(request: StreamSubscriptionRequest):
+    try:
+        await market_stream.subscribe(request.symbol, request.interval)
+        return {"success": True, "subscriptions": market_stream.subscriptions()}
+    except Exception as e:
+        return {"success": False, "message": str(e)}
+
+
+@trading.post("/stream/unsubscribe")
+async def unsubscribe_stream(request: StreamSubscriptionRequest):
+    await market_stream.unsubscribe(request.symbol, request.interval)
+    return {"success": True, "subscriptions": market_stream.subscriptions()}
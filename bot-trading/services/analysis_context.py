@@ -0,0 +1,80 @@
+import numpy as np
+
+from services import indicators
+from services.candle_frame import CandleFrame
+
+
+class AnalysisContext:
+    """Intermediates and indicator series over one frame, each computed on first use.
+
+    The candle cache keeps one context per cached frame version and hands it
+    to every derive(), so SMC, Wyckoff and the classic indicators of the same
+    bars share true range, ATRs, the volume SMA and any indicator series.
+    Indicators of several periods share one intermediate: every RSI period
+    smooths the same gains/losses, every ATR the same true range, and every
+    Bollinger period reads the same cumulative sums.
+
+    The indicator series work along the last axis, so a frame of (symbols,
+    bars) matrices (indicators.left_align) gives every symbol's series at once.
+    """
+
+    __slots__ = ("frame", "_memo")
+
+    def __init__(self, frame: CandleFrame):
+        self.frame = frame
+        self._memo: dict[tuple, object] = {}
+
+    def memo(self, key: tuple, compute):
+        """compute(), once per key for this frame."""
+        memo = self._memo
+        if key not in memo:
+            memo[key] = compute()
+        return memo[key]
+
+    # ── shared intermediates ──────────────────────────────────────────────
+    def true_range(self) -> np.ndarray:
+        frame = self.frame
+        return self.memo(("tr",), lambda: indicators.true_range(frame.high, frame.low, frame.close))
+
+    def gain_loss(self) -> np.ndarray:
+        return self.memo(("gain_loss",), lambda: indicators.gain_loss(self.frame.close))
+
+    def close_sums(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.memo(("close_sums",), lambda: indicators.shifted_sums(self.frame.close))
+
+    # ── indicator series ──────────────────────────────────────────────────
+    def ema(self, period: int) -> np.ndarray:
+        return self.memo(("ema", period), lambda: indicators.ema(self.frame.close, period))
+
+    def rsi(self, period: int) -> np.ndarray:
+        return self.memo(("rsi", period), lambda: indicators.rsi(self.frame.close, period, self.gain_loss()))
+
+    def atr_series(self, period: int) -> np.ndarray:
+        def compute():
+            out = np.full(np.shape(self.frame.close), np.nan)
+            out[..., 1:] = indicators.wilder(self.true_range(), period)
+            return out
+
+        return self.memo(("atr", period), compute)
+
+    def bollinger(self, period: int = 20, mult: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.memo(
+            ("bollinger", period, mult),
+            lambda: indicators.bollinger(self.frame.close, period, mult, self.close_sums()),
+        )
+
+    def atr(self, period: int = 14) -> float:
+        """Latest Wilder ATR, 0.0 when there are fewer than period + 1 bars (indicators.atr)."""
+        if len(self.frame) < period + 1:
+            return 0.0
+        return float(self.atr_series(period)[-1])
+
+    def vol_sma(self, period: int = 20) -> list[float]:
+        """Per-bar mean volume of the trailing `period` bars (fewer at the start)."""
+
+        def compute():
+            sums = np.concatenate([[0.0], np.cumsum(self.frame.volume, dtype=np.float64)])
+            ends = np.arange(1, len(sums))
+            return ((sums[ends] - sums[np.maximum(ends - period, 0)]) / np.minimum(ends, period)).tolist()
+
+        return self.memo(("vol_sma", period), compute)
@@ -0,0 +1,138 @@
+"""Slotted result records of the SMC and Wyckoff analyses.
+
+The analyses build one of these per swing, break, order block, gap, pool,
+entry and event, most of which are dropped again by the [-10:] / [:5]
+truncations of the result. A record is a few slots instead of a dict, and
+only the ones that reach a payload are turned into dicts, by plain().
+"""
+
+
+class Record:
+    """Base of the result records: to_dict() gives the JSON shape, slots in order."""
+
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+
+class SwingPoint(Record):
+    __slots__ = ("index", "price", "type")
+
+    def __init__(self, index: int, price: float, type: str):
+        self.index = index
+        self.price = price
+        self.type = type
+
+
+class StructureBreak(Record):
+    """A BOS or CHoCH: the close at bar_index beyond the pivot price."""
+
+    __slots__ = ("price", "direction", "type", "bar_index")
+
+    def __init__(self, price: float, direction: str, type: str, bar_index: int):
+        self.price = price
+        self.direction = direction
+        self.type = type
+        self.bar_index = bar_index
+
+
+class OrderBlock(Record):
+    __slots__ = ("type", "index", "high", "low", "mitigated", "mitigated_index", "strength")
+
+    def __init__(self, type: str, index: int, high: float, low: float, mitigated_index: int | None, strength: int):
+        self.type = type
+        self.index = index
+        self.high = high
+        self.low = low
+        self.mitigated = mitigated_index is not None
+        self.mitigated_index = mitigated_index
+        self.strength = strength
+
+
+class FairValueGap(Record):
+    __slots__ = ("type", "high", "low", "index", "filled", "filled_index", "strength")
+
+    def __init__(self, type: str, high: float, low: float, index: int, filled_index: int | None, strength: int):
+        self.type = type
+        self.high = high
+        self.low = low
+        self.index = index
+        self.filled = filled_index is not None
+        self.filled_index = filled_index
+        self.strength = strength
+
+
+class LiquidityPool(Record):
+    __slots__ = ("type", "level", "low", "high", "touches", "first_index", "last_index", "swept")
+
+    def __init__(
+        self, type: str, level: float, low: float, high: float,
+        touches: int, first_index: int, last_index: int, swept: bool,
+    ):
+        self.type = type
+        self.level = level
+        self.low = low
+        self.high = high
+        self.touches = touches
+        self.first_index = first_index
+        self.last_index = last_index
+        self.swept = swept
+
+
+class EntryZone(Record):
+    """A potential entry: an order block and a fair value gap of the same side in confluence."""
+
+    __slots__ = ("type", "zone_high", "zone_low", "confluence_score", "ob_strength", "fvg_strength", "distance_pct")
+
+    def __init__(
+        self, type: str, zone_high: float, zone_low: float,
+        confluence_score: int, ob_strength: int, fvg_strength: int, distance_pct: float,
+    ):
+        self.type = type
+        self.zone_high = zone_high
+        self.zone_low = zone_low
+        self.confluence_score = confluence_score
+        self.ob_strength = ob_strength
+        self.fvg_strength = fvg_strength
+        self.distance_pct = distance_pct
+
+
+class WyckoffEvent(Record):
+    __slots__ = (
+        "event_type", "bar_index", "price", "volume", "volume_ratio", "spread_ratio", "close_ratio", "quality_score",
+    )
+
+    def __init__(
+        self, event_type: str, bar_index: int, price: float, volume: float,
+        volume_ratio: float, spread_ratio: float, close_ratio: float, quality_score: int,
+    ):
+        self.event_type = event_type
+        self.bar_index = bar_index
+        self.price = price
+        self.volume = volume
+        self.volume_ratio = volume_ratio
+        self.spread_ratio = spread_ratio
+        self.close_ratio = close_ratio
+        self.quality_score = quality_score
+
+
+def plain(value):
+    """`value` with every Record in it, through lists, tuples and dicts, replaced by its to_dict()."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    return value
@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import numpy as np
+
+import config
+from services.analysis_context import AnalysisContext
+from services.candle_frame import CandleFrame
+from services.candle_source import CandleSource, candle_source
+from services.intervals import interval_ms, is_fixed_interval, now_ms
+from services.single_flight import SingleFlight
+
+
+class _Entry:
+    __slots__ = ("closed", "forming", "closes_at", "refreshed_at", "version", "context", "derived", "closed_derived")
+
+    def __init__(self, rows: np.ndarray, step: int):
+        self.closed = rows[:-1]
+        self.forming = rows[-1:]
+        self.closes_at = int(rows["timestamp"][-1]) + step
+        self.refreshed_at = time.monotonic()
+        self.version = 0
+        self.context: AnalysisContext | None = None
+        self.derived: dict[str, tuple[int, Any]] = {}
+        self.closed_derived: dict[str, Any] = {}
+
+    def set_forming(self, bar: np.ndarray) -> bool:
+        self.refreshed_at = time.monotonic()
+        if bar.tobytes() == self.forming.tobytes():
+            return False
+        self.forming = bar
+        self.version += 1
+        self.context = None
+        return True
+
+    def get_context(self) -> AnalysisContext:
+        if self.context is None:
+            self.context = AnalysisContext(CandleFrame.from_records(np.concatenate([self.closed, self.forming])))
+        return self.context
+
+
+class CandleCache:
+    """LRU cache of analysis inputs keyed by (symbol, interval, limit).
+
+    Each entry keeps the closed-bar prefix apart from the still-forming last
+    bar. The prefix is valid until the forming bar closes (forever for an
+    offline source); until then only the last bar is re-fetched (one small
+    request), and no more often than every CANDLE_CACHE_FORMING_TTL seconds.
+    At the bar close the prefix is rolled forward with just the bars that
+    closed, not refetched in full.
+
+    derive() memoizes results computed from the frame and keeps them until
+    the frame actually changes, so an unchanged forming bar reuses them too.
+    derive_closed() results are computed from the closed bars alone, so they
+    survive forming-bar changes and are recomputed only when the entry rolls.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        forming_ttl: float = None,
+        source: CandleSource = None,
+        clock: Callable[[], int] = None,
+    ):
+        self._max_entries = max_entries or config.CANDLE_CACHE_SIZE
+        self._forming_ttl = config.CANDLE_CACHE_FORMING_TTL if forming_ttl is None else forming_ttl
+        self._source = source or candle_source
+        self._now = clock or now_ms
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = SingleFlight()
+        self._stats = {"hits": 0, "forming_refreshes": 0, "rolls": 0, "misses": 0, "evictions": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lookup(self, key: tuple) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: tuple, entry: _Entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _load(self, key: tuple) -> _Entry:
+        symbol, interval, limit = key
+        rows = self._source.fetch_rows(symbol, interval, limit)
+        if len(rows) == 0:
+            raise ValueError(f"No klines for {symbol} {interval}")
+        entry = _Entry(rows, interval_ms(interval))
+        self._store(key, entry)
+        self._count("misses")
+        return entry
+
+    def _roll(self, key: tuple, entry: _Entry) -> _Entry:
+        """Append the bars that closed since the entry was built, or reload it."""
+        symbol, interval, limit = key
+        step = interval_ms(interval)
+        forming_ts = int(entry.forming["timestamp"][0])
+        elapsed = (self._now() - forming_ts) // step
+        if elapsed >= limit:
+            return self._load(key)
+        rows = self._source.fetch_rows(symbol, interval, elapsed + 1)
+        if len(rows) == 0 or int(rows["timestamp"][0]) != forming_ts:
+            return self._load(key)
+        rolled = _Entry(np.concatenate([entry.closed, rows])[-limit:], step)
+        self._store(key, rolled)
+        self._count("rolls")
+        return rolled
+
+    def _refresh_forming(self, key: tuple, entry: _Entry) -> _Entry:
+        symbol, interval, _ = key
+        bar = self._source.fetch_rows(symbol, interval, 1)
+        if len(bar) == 0 or bar["timestamp"][0] != entry.forming["timestamp"][0]:
+            return self._roll(key, entry)
+        with self._lock:
+            entry.set_forming(bar[-1:].copy())
+            self._stats["forming_refreshes"] += 1
+        return entry
+
+    def _resolve(self, key: tuple) -> _Entry:
+        entry = self._lookup(key)
+        if entry is None:
+            return self._in_flight.do(key, lambda: self._load(key))
+        if not self._source.live:
+            self._count("hits")
+            return entry
+        if self._now() >= entry.closes_at:
+            return self._in_flight.do(key, lambda: self._roll(key, entry))
+        if time.monotonic() - entry.refreshed_at >= self._forming_ttl:
+            return self._in_flight.do(key, lambda: self._refresh_forming(key, entry))
+        self._count("hits")
+        return entry
+
+    def get_frame(self, symbol: str, interval: str, limit: int) -> CandleFrame:
+        if not is_fixed_interval(interval):
+            return self._source.fetch_frame(symbol, interval, limit)
+        return self._resolve((symbol, interval, limit)).get_context().frame
+
+    def derive(self, symbol: str, interval: str, limit: int, name: str, fn: Callable[[AnalysisContext], Any]) -> Any:
+        """fn(context), reused until the cached frame for (symbol, interval, limit) changes.
+
+        context.frame is the cached frame; the context's memoized intermediates
+        and indicator series are shared by every derivation of that frame version.
+        """
+        if not is_fixed_interval(interval):
+            return fn(AnalysisContext(self._source.fetch_frame(symbol, interval, limit)))
+        key = (symbol, interval, limit)
+        entry = self._resolve(key)
+        with self._lock:
+            version = entry.version
+            cached = entry.derived.get(name)
+            context = entry.get_context()
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        result = self._in_flight.do((key, name, id(entry), version), lambda: fn(context))
+        with self._lock:
+            if entry.version == version:
+                entry.derived[name] = (version, result)
+        return result
+
+    def derive_closed(
+        self, symbol: str, interval: str, limit: int, name: str, fn: Callable[[np.ndarray], Any]
+    ) -> tuple[Any, np.ndarray]:
+        """(fn(closed bars), forming bar) of the cached window for (symbol, interval, limit).
+
+        Like derive(), but fn sees only the closed bars, so its result is kept
+        while the forming bar changes and recomputed when the window rolls.
+        Callers share the result and must not mutate it.
+        """
+        if not is_fixed_interval(interval):
+            rows = self._source.fetch_rows(symbol, interval, limit)
+            return fn(rows[:-1]), rows[-1:]
+        key = (symbol, interval, limit)
+        entry = self._resolve(key)
+        with self._lock:
+            result = entry.closed_derived.get(name)
+            forming = entry.forming
+        if result is None:
+            result = self._in_flight.do((key, name, id(entry)), lambda: fn(entry.closed))
+            with self._lock:
+                result = entry.closed_derived.setdefault(name, result)
+        return result, forming
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = sum(self._stats[k] for k in ("hits", "forming_refreshes", "rolls", "misses"))
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hit_rate": round((lookups - self._stats["misses"]) / lookups, 4) if lookups else None,
+            }
+
+
+candle_cache = CandleCache()
@@ -0,0 +1,55 @@
+import numpy as np
+
+FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class CandleFrame:
+    """Columnar OHLCV series: one contiguous float64 array per field.
+
+    Slicing returns a frame of views over the same buffers (no copy), and
+    integer indexing returns the bar as a dict. Convert with to_dicts() only
+    at the JSON boundary.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.float64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, rows: np.ndarray) -> "CandleFrame":
+        """Build from KLINE_DTYPE records (kline store, ring buffers, resampler)."""
+        return cls(*(np.ascontiguousarray(rows[name], dtype=np.float64) for name in FIELDS))
+
+    @classmethod
+    def from_dicts(cls, candles: list[dict]) -> "CandleFrame":
+        return cls(*(np.fromiter((c[name] for c in candles), np.float64, len(candles)) for name in FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CandleFrame(*(getattr(self, name)[key] for name in FIELDS))
+        return {
+            "timestamp": int(self.timestamp[key]),
+            "open": float(self.open[key]),
+            "high": float(self.high[key]),
+            "low": float(self.low[key]),
+            "close": float(self.close[key]),
+            "volume": float(self.volume[key]),
+        }
+
+    def to_dicts(self) -> list[dict]:
+        return [
+            {"timestamp": int(t), "open": o, "high": h, "low": lo, "close": c, "volume": v}
+            for t, o, h, lo, c, v in zip(
+                self.timestamp.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist(),
+            )
+        ]
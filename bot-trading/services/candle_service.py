@@ -1,23 +1,271 @@
-import httpx
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+from services.candle_frame import CandleFrame
+from services.http_client import get_async_client, get_client
+from services.intervals import interval_ms, is_fixed_interval, now_ms
+from services.kline_store import KLINE_DTYPE, KlineStore, find_gaps
+from services.market_stream import market_stream
+from services.rate_limiter import Priority, endpoint_cost
+from services.resampler import base_bars_needed, resample
+from services.single_flight import SingleFlight
+
+_store = KlineStore(config.KLINE_STORE_DIR) if config.KLINE_STORE_ENABLED else None
+_in_flight = SingleFlight()
 
 
 class CandleService:
-    BINANCE_FUTURES_URL = "https://fapi.binance.com/fapi/v1"
+    """REST candle source (Binance USDⓈ-M futures) backed by the kline store and live streams."""
+
+    KLINES_PATH = "/fapi/v1/klines"
+    MAX_LIMIT = 1500
+    live = True
+
+    @staticmethod
+    def _to_records(klines: list[list]) -> np.ndarray:
+        rows = np.empty(len(klines), dtype=KLINE_DTYPE)
+        if klines:
+            cols = np.array([k[:6] for k in klines], dtype=np.float64)
+            rows["timestamp"] = cols[:, 0]
+            for i, name in enumerate(("open", "high", "low", "close", "volume"), start=1):
+                rows[name] = cols[:, i]
+        return rows
 
-    def fetch_candles(self, symbol: str, timeframe: str, limit: int = 300) -> list[dict]:
-        url = f"{self.BINANCE_FUTURES_URL}/klines"
+    def _plan_params(self, symbol: str, timeframe: str, limit: int, end_time: int | None) -> dict:
+        """REST params for the next fetch: only the bars after the stored tail when possible.
+
+        The last stored bar is re-requested because it may still have been
+        forming when it was written.
+        """
         params = {"symbol": symbol, "interval": timeframe, "limit": limit}
-        with httpx.Client(timeout=10) as client:
-            resp = client.get(url, params=params)
-            resp.raise_for_status()
+        if end_time is not None:
+            params["endTime"] = end_time
+            return params
+        if _store is None or not is_fixed_interval(timeframe):
+            return params
+        last_ts = _store.last_timestamp(symbol, timeframe)
+        if last_ts is None:
+            return params
+        missing = (now_ms() - last_ts) // interval_ms(timeframe) + 1
+        if missing < self.MAX_LIMIT and _store.count(symbol, timeframe) + missing - 1 >= limit:
+            params["startTime"] = last_ts
+            params["limit"] = missing + 1
+        return params
+
+    def _finish(self, symbol: str, timeframe: str, limit: int, end_time: int | None, klines: list[list]) -> np.ndarray:
+        rows = self._to_records(klines)
+        if _store is None or not is_fixed_interval(timeframe):
+            return rows
+        _store.write(symbol, timeframe, rows, interval_ms(timeframe))
+        if end_time is not None:
+            return rows
+        return _store.tail(symbol, timeframe, limit)
+
+    def _plan_pages(self, timeframe: str, start_ms: int, end_ms: int) -> list[dict]:
+        """Split [start_ms, end_ms] into non-overlapping startTime/endTime pages of MAX_LIMIT bars."""
+        step = interval_ms(timeframe)
+        span = step * self.MAX_LIMIT
+        first = start_ms // step * step
         return [
-            {
-                "timestamp": int(k[0]),
-                "open": float(k[1]),
-                "high": float(k[2]),
-                "low": float(k[3]),
-                "close": float(k[4]),
-                "volume": float(k[5]),
-            }
-            for k in resp.json()
+            {"startTime": s, "endTime": min(s + span - 1, end_ms), "limit": self.MAX_LIMIT}
+            for s in range(first, end_ms + 1, span)
         ]
+
+    def _merge_pages(self, pages: list[np.ndarray]) -> np.ndarray:
+        rows = np.concatenate(pages) if pages else self._to_records([])
+        _, keep = np.unique(rows["timestamp"], return_index=True)
+        return rows[keep]
+
+    def _gap_pages(self, timeframe: str, rows: np.ndarray) -> list[dict]:
+        """Pages re-requesting every bar missing between the first and last of `rows`."""
+        step = interval_ms(timeframe)
+        return [
+            page
+            for start, missing in find_gaps(rows["timestamp"], step)
+            for page in self._plan_pages(timeframe, start, start + (missing - 1) * step)
+        ]
+
+    def _finish_range(self, symbol: str, timeframe: str, rows: np.ndarray) -> np.ndarray:
+        """Report gaps that survived the refetch and write the contiguous tail through to the store.
+
+        The store holds one contiguous run, so only the bars after the last
+        gap are written; the rows are returned with their gaps (exchange
+        outages have no klines to fetch).
+        """
+        step = interval_ms(timeframe)
+        gaps = find_gaps(rows["timestamp"], step)
+        for start, missing in gaps[:10]:
+            print(f"[BACKFILL] {symbol} {timeframe}: {missing} bars missing from {start}")
+        if _store is not None and len(rows):
+            tail = int(np.searchsorted(rows["timestamp"], gaps[-1][0])) if gaps else 0
+            _store.write(symbol, timeframe, rows[tail:], step)
+        return rows
+
+    def _get_page(self, symbol: str, timeframe: str, page: dict) -> np.ndarray:
+        resp = get_client().get(
+            self.KLINES_PATH,
+            params={"symbol": symbol, "interval": timeframe, **page},
+            extensions={"priority": Priority.SCAN},
+        )
+        resp.raise_for_status()
+        return self._to_records(resp.json())
+
+    async def _get_page_async(self, symbol: str, timeframe: str, page: dict, sem: asyncio.Semaphore) -> np.ndarray:
+        async with sem:
+            resp = await get_async_client().get(
+                self.KLINES_PATH,
+                params={"symbol": symbol, "interval": timeframe, **page},
+                extensions={"priority": Priority.SCAN},
+            )
+        resp.raise_for_status()
+        return self._to_records(resp.json())
+
+    def fetch_range(self, symbol: str, timeframe: str, start_ms: int, end_ms: int | None = None) -> np.ndarray:
+        """Every bar opening in [start_ms, end_ms], fetched as concurrent REST pages.
+
+        Fan-out is bounded by BACKFILL_CONCURRENCY; page boundaries are
+        deduplicated, holes between pages are re-requested once, and the
+        merged series is written through to the store.
+        """
+
+        def fetch(pages: list[dict]) -> list[np.ndarray]:
+            with ThreadPoolExecutor(max_workers=min(config.BACKFILL_CONCURRENCY, len(pages) or 1)) as pool:
+                return list(pool.map(lambda page: self._get_page(symbol, timeframe, page), pages))
+
+        end_ms = now_ms() if end_ms is None else end_ms
+        rows = self._merge_pages(fetch(self._plan_pages(timeframe, start_ms, end_ms)))
+        refetch = self._gap_pages(timeframe, rows)
+        if refetch:
+            rows = self._merge_pages([rows, *fetch(refetch)])
+        return self._finish_range(symbol, timeframe, rows)
+
+    async def fetch_range_async(
+        self, symbol: str, timeframe: str, start_ms: int, end_ms: int | None = None
+    ) -> np.ndarray:
+        sem = asyncio.Semaphore(config.BACKFILL_CONCURRENCY)
+
+        async def fetch(pages: list[dict]) -> list[np.ndarray]:
+            return list(await asyncio.gather(*(self._get_page_async(symbol, timeframe, p, sem) for p in pages)))
+
+        end_ms = now_ms() if end_ms is None else end_ms
+        rows = self._merge_pages(await fetch(self._plan_pages(timeframe, start_ms, end_ms)))
+        refetch = self._gap_pages(timeframe, rows)
+        if refetch:
+            rows = self._merge_pages([rows, *await fetch(refetch)])
+        return self._finish_range(symbol, timeframe, rows)
+
+    def _history_start(self, timeframe: str, limit: int, end_time: int | None) -> tuple[int, int]:
+        end_ms = now_ms() if end_time is None else end_time
+        step = interval_ms(timeframe)
+        return end_ms // step * step - (limit - 1) * step, end_ms
+
+    def _load_rows(self, symbol: str, timeframe: str, limit: int, end_time: int | None) -> np.ndarray:
+        if end_time is None:
+            rows = market_stream.get_candles(symbol, timeframe, limit)
+            if rows is not None:
+                return rows
+        params = self._plan_params(symbol, timeframe, limit, end_time)
+        if "startTime" not in params and limit > self.MAX_LIMIT:
+            return self.fetch_range(symbol, timeframe, *self._history_start(timeframe, limit, end_time))[-limit:]
+        resp = get_client().get(self.KLINES_PATH, params=params)
+        resp.raise_for_status()
+        return self._finish(symbol, timeframe, limit, end_time, resp.json())
+
+    async def _load_rows_async(self, symbol: str, timeframe: str, limit: int, end_time: int | None) -> np.ndarray:
+        if end_time is None:
+            rows = market_stream.get_candles(symbol, timeframe, limit)
+            if rows is not None:
+                return rows
+        params = self._plan_params(symbol, timeframe, limit, end_time)
+        if "startTime" not in params and limit > self.MAX_LIMIT:
+            rows = await self.fetch_range_async(symbol, timeframe, *self._history_start(timeframe, limit, end_time))
+            return rows[-limit:]
+        resp = await get_async_client().get(self.KLINES_PATH, params=params)
+        resp.raise_for_status()
+        return self._finish(symbol, timeframe, limit, end_time, resp.json())
+
+    def fetch_rows(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> np.ndarray:
+        """Kline records, with concurrent identical requests sharing one fetch."""
+        return _in_flight.do(
+            (symbol, timeframe, limit, end_time),
+            lambda: self._load_rows(symbol, timeframe, limit, end_time),
+        )
+
+    async def fetch_rows_async(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> np.ndarray:
+        return await _in_flight.do_async(
+            (symbol, timeframe, limit, end_time),
+            lambda: self._load_rows_async(symbol, timeframe, limit, end_time),
+        )
+
+    def fetch_frame(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> CandleFrame:
+        return CandleFrame.from_records(self.fetch_rows(symbol, timeframe, limit, end_time))
+
+    async def fetch_frame_async(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> CandleFrame:
+        return CandleFrame.from_records(await self.fetch_rows_async(symbol, timeframe, limit, end_time))
+
+    def fetch_candles(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> list[dict]:
+        return self.fetch_frame(symbol, timeframe, limit, end_time).to_dicts()
+
+    async def fetch_candles_async(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> list[dict]:
+        return (await self.fetch_frame_async(symbol, timeframe, limit, end_time)).to_dicts()
+
+    def _fetch_weight(self, limit: int) -> int:
+        """Request weight of fetching `limit` bars: one klines call, or MAX_LIMIT pages beyond that."""
+        if limit <= self.MAX_LIMIT:
+            return endpoint_cost("GET", self.KLINES_PATH, {"limit": limit})[0]
+        return -(-limit // self.MAX_LIMIT) * endpoint_cost("GET", self.KLINES_PATH, {"limit": self.MAX_LIMIT})[0]
+
+    def _resample_plan(self, timeframes: list[str], limit: int, base_interval: str) -> tuple[str, list[str]]:
+        """(base interval, timeframes resampled from one fetch of it) for the least request weight.
+
+        The finest k timeframes are resampled from the coarsest of
+        base_interval and themselves that divides them all; the rest are
+        fetched directly. A coarse timeframe resampled from a fine base can
+        cost more than its own fetch: 4h x 200 needs 1607 30m bars, two
+        weight-10 pages, against one weight-2 call. Ties go to fewer requests.
+        """
+        ordered = sorted(set(timeframes), key=interval_ms)
+        best = None
+        for k in range(len(ordered), -1, -1):
+            group = ordered[:k]
+            bases = [
+                tf for tf in (base_interval, *group)
+                if all(interval_ms(target) % interval_ms(tf) == 0 for target in group)
+            ]
+            if not bases:
+                continue
+            base = max(bases, key=interval_ms)
+            weight = (len(ordered) - k) * self._fetch_weight(limit)
+            if group:
+                weight += self._fetch_weight(base_bars_needed(base, group, limit))
+            if best is None or weight < best[0]:
+                best = (weight, base, group)
+        return best[1], best[2]
+
+    def fetch_resampled(
+        self, symbol: str, timeframes: list[str], limit: int = 300, base_interval: str = "30m"
+    ) -> dict[str, CandleFrame]:
+        """Frames for several timeframes, built locally from one base fetch where that is cheapest.
+
+        See _resample_plan: timeframes that would cost more to resample than
+        to fetch are fetched directly.
+        """
+        base, resampled = self._resample_plan(timeframes, limit, base_interval)
+        frames = {}
+        if resampled:
+            rows = self.fetch_rows(symbol, base, base_bars_needed(base, resampled, limit))
+            frames = {tf: CandleFrame.from_records(resample(rows, base, tf)[-limit:]) for tf in resampled}
+        return {tf: frames[tf] if tf in frames else self.fetch_frame(symbol, tf, limit) for tf in timeframes}
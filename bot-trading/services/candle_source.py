@@ -0,0 +1,181 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Protocol
+
+import numpy as np
+
+import config
+from services.candle_frame import FIELDS, CandleFrame
+from services.candle_service import CandleService
+from services.intervals import interval_ms, is_fixed_interval
+from services.kline_store import KLINE_DTYPE
+from services.resampler import base_bars_needed, resample
+
+# Binance switched some archives to microsecond open times; anything this
+# large cannot be a millisecond timestamp.
+_MICROSECOND_TS = 10**14
+
+
+class CandleSource(Protocol):
+    """Where analysis candles come from. `live` sources have a forming last bar."""
+
+    live: bool
+
+    def fetch_rows(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> np.ndarray: ...
+
+    def fetch_frame(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> CandleFrame: ...
+
+    def fetch_candles(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> list[dict]: ...
+
+    def fetch_resampled(
+        self, symbol: str, timeframes: list[str], limit: int = 300, base_interval: str = "30m"
+    ) -> dict[str, CandleFrame]: ...
+
+
+def _from_columns(cols: np.ndarray) -> np.ndarray:
+    rows = np.empty(len(cols), dtype=KLINE_DTYPE)
+    for i, name in enumerate(FIELDS):
+        rows[name] = cols[:, i]
+    return rows
+
+
+def _read_npy(path: str) -> np.ndarray:
+    data = np.load(path, mmap_mode="r")
+    if data.dtype == KLINE_DTYPE:
+        return data
+    return _from_columns(np.asarray(data, dtype=np.float64).reshape(len(data), -1))
+
+
+def _read_bin(path: str) -> np.ndarray:
+    if os.path.getsize(path) < KLINE_DTYPE.itemsize:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    return np.memmap(path, dtype=KLINE_DTYPE, mode="r")
+
+
+def _read_csv(path: str) -> np.ndarray:
+    with open(path) as f:
+        first = f.readline()
+    header = 0 if first[:1].isdigit() else 1
+    cols = np.loadtxt(path, delimiter=",", usecols=range(6), skiprows=header, ndmin=2, dtype=np.float64)
+    return _from_columns(cols)
+
+
+def _read_parquet(path: str) -> np.ndarray:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Reading .parquet candles requires pyarrow") from e
+    table = pq.read_table(path)
+    names = [n if n in table.column_names else None for n in FIELDS]
+    if "timestamp" not in table.column_names and "open_time" in table.column_names:
+        names[0] = "open_time"
+    if None in names:
+        names = table.column_names[:6]
+    cols = np.column_stack([table.column(n).to_numpy().astype(np.float64) for n in names])
+    return _from_columns(cols)
+
+
+_READERS = {
+    ".npy": _read_npy,
+    ".bin": _read_bin,
+    ".csv": _read_csv,
+    ".parquet": _read_parquet,
+}
+
+
+class FileCandleSource:
+    """Offline candles from `{SYMBOL}_{interval}.{npy,bin,csv,parquet}` files.
+
+    .npy and .bin (the kline store's own format) are memory-mapped, so a read
+    is a binary search plus a slice. CSV/Parquet files are parsed once and kept
+    in a small LRU keyed by path and mtime. An interval without its own file
+    is resampled from the coarsest finer interval on disk.
+    """
+
+    live = False
+
+    def __init__(self, root: str, cache_size: int = 64):
+        self.root = root
+        self._cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _files(self, symbol: str) -> dict[str, str]:
+        prefix = f"{symbol.upper()}_"
+        files = {}
+        for name in os.listdir(self.root):
+            stem, ext = os.path.splitext(name)
+            if stem.startswith(prefix) and ext in _READERS:
+                files.setdefault(stem[len(prefix):], os.path.join(self.root, name))
+        return files
+
+    def _load(self, path: str) -> np.ndarray:
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+                return rows
+        rows = _READERS[os.path.splitext(path)[1]](path)
+        if len(rows) and rows["timestamp"][0] >= _MICROSECOND_TS:
+            rows = rows.copy()
+            rows["timestamp"] //= 1000
+        with self._lock:
+            self._cache[key] = rows
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return rows
+
+    def _rows(self, symbol: str, timeframe: str) -> np.ndarray:
+        for ext in _READERS:
+            path = os.path.join(self.root, f"{symbol.upper()}_{timeframe}{ext}")
+            if os.path.exists(path):
+                return self._load(path)
+        files = self._files(symbol)
+        if is_fixed_interval(timeframe):
+            target = interval_ms(timeframe)
+            bases = [
+                tf for tf in files
+                if is_fixed_interval(tf) and interval_ms(tf) < target and target % interval_ms(tf) == 0
+            ]
+            if bases:
+                base = max(bases, key=interval_ms)
+                return resample(self._load(files[base]), base, timeframe)
+        raise FileNotFoundError(f"No candle file for {symbol} {timeframe} in {self.root}")
+
+    def fetch_rows(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> np.ndarray:
+        rows = self._rows(symbol, timeframe)
+        if end_time is not None:
+            rows = rows[: np.searchsorted(rows["timestamp"], end_time, side="right")]
+        return rows[-limit:]
+
+    async def fetch_rows_async(
+        self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None
+    ) -> np.ndarray:
+        return self.fetch_rows(symbol, timeframe, limit, end_time)
+
+    def fetch_frame(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> CandleFrame:
+        return CandleFrame.from_records(self.fetch_rows(symbol, timeframe, limit, end_time))
+
+    def fetch_candles(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> list[dict]:
+        return self.fetch_frame(symbol, timeframe, limit, end_time).to_dicts()
+
+    def fetch_resampled(
+        self, symbol: str, timeframes: list[str], limit: int = 300, base_interval: str = "30m"
+    ) -> dict[str, CandleFrame]:
+        rows = self.fetch_rows(symbol, base_interval, base_bars_needed(base_interval, timeframes, limit))
+        return {tf: CandleFrame.from_records(resample(rows, base_interval, tf)[-limit:]) for tf in timeframes}
+
+
+def get_candle_source(kind: str = None) -> CandleSource:
+    """CANDLE_SOURCE=rest (Binance, default) or file (CANDLE_SOURCE_DIR)."""
+    kind = (kind or config.CANDLE_SOURCE).lower()
+    if kind == "rest":
+        return CandleService()
+    if kind == "file":
+        return FileCandleSource(config.CANDLE_SOURCE_DIR)
+    raise ValueError(f"Unknown CANDLE_SOURCE '{kind}'")
+
+
+candle_source = get_candle_source()
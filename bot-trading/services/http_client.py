@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import httpx
+
+import config
+from services.rate_limiter import default_priority, endpoint_cost, request_budget
+
+_PING_PATH = "/fapi/v1/ping"
+
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    if not config.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    except ImportError:
+        return False
+    return True
+
+
+def _request_cost(request: httpx.Request) -> tuple[int, int]:
+    return endpoint_cost(request.method, request.url.path, dict(request.url.params))
+
+
+def _priority(request: httpx.Request):
+    priority = request.extensions.get("priority")
+    return default_priority(request.method, request.url.path) if priority is None else priority
+
+
+def _reserve(request: httpx.Request):
+    request_budget.acquire(*_request_cost(request), _priority(request))
+
+
+async def _reserve_async(request: httpx.Request):
+    await request_budget.acquire_async(*_request_cost(request), _priority(request))
+
+
+def _record(response: httpx.Response):
+    request = response.request
+    weight, _ = _request_cost(request)
+    request_budget.record(request.url.path, weight, response.status_code, response.headers)
+
+
+async def _record_async(response: httpx.Response):
+    _record(response)
+
+
+def _client_kwargs() -> dict:
+    return {
+        "base_url": config.BINANCE_FUTURES_URL,
+        "http2": _http2_enabled(),
+        "timeout": config.HTTP_TIMEOUT,
+        "limits": httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_client() -> httpx.Client:
+    """Process-wide keep-alive client for blocking callers (executor threads).
+
+    Every request reserves its weight from the shared request budget first;
+    pass extensions={"priority": Priority.X} to override the default priority.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(
+                    **_client_kwargs(),
+                    event_hooks={"request": [_reserve], "response": [_record]},
+                )
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive client for coroutines on the app event loop."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(
+                    **_client_kwargs(),
+                    event_hooks={"request": [_reserve_async], "response": [_record_async]},
+                )
+    return _async_client
+
+
+async def warm_up():
+    """Open a pooled connection on both clients so the first request skips TCP+TLS setup."""
+    try:
+        await asyncio.gather(
+            get_async_client().get(_PING_PATH),
+            asyncio.to_thread(get_client().get, _PING_PATH),
+        )
+    except httpx.HTTPError as e:
+        print(f"[HTTP] warm-up failed: {e}")
+
+
+async def aclose():
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import config
+from services import indicators
+from services.analysis_context import AnalysisContext
+from services.candle_cache import candle_cache
+from services.candle_frame import FIELDS, CandleFrame
+
+# Latest-bar series of smc_analysis's classic indicator fields, over a (symbols, bars) context: name -> (series, decimals)
+_SERIES = {
+    "ema9": (lambda c: c.ema(9), None),
+    "ema20": (lambda c: c.ema(20), None),
+    "ema50": (lambda c: c.ema(50), None),
+    "bb_upper": (lambda c: c.bollinger(20, 2.0)[0], None),
+    "bb_middle": (lambda c: c.bollinger(20, 2.0)[1], None),
+    "bb_lower": (lambda c: c.bollinger(20, 2.0)[2], None),
+    "rsi7": (lambda c: c.rsi(7), 2),
+    "rsi14": (lambda c: c.rsi(14), 2),
+    "rsi21": (lambda c: c.rsi(21), 2),
+}
+
+# Cells per (symbols, bars) block: enough symbols to amortize the per-call overhead,
+# few enough that each indicator's temporaries stay in cache
+_BLOCK_CELLS = 1 << 14
+
+
+class IndicatorScanService:
+    """Classic indicators (ATR, EMA, Bollinger, RSI) of a whole symbol universe in one pass.
+
+    The symbols' bars are stacked into left-aligned (symbols, bars) matrices,
+    so each indicator is one vectorized call over every symbol instead of one
+    per symbol; shorter histories are masked by reading each row at its own
+    length. Values match SmcService._calc_classic_indicators per symbol.
+    """
+
+    def _batch(self, frames: list[CandleFrame]) -> list[dict]:
+        """_calc_classic_indicators of every frame (each with at least one bar), in order.
+
+        Frames are grouped by length into blocks of at most _BLOCK_CELLS
+        cells (a single long history gets a block of its own), which keeps the
+        padding of ragged rows small.
+        """
+        order = sorted(range(len(frames)), key=lambda k: len(frames[k]))
+        results: list[dict] = [{}] * len(frames)
+        start = 0
+        while start < len(order):
+            stop = start + 1
+            while stop < len(order) and (stop - start + 1) * len(frames[order[stop]]) <= _BLOCK_CELLS:
+                stop += 1
+            block = order[start:stop]
+            for k, values in zip(block, self._block([frames[k] for k in block])):
+                results[k] = values
+            start = stop
+        return results
+
+    def _block(self, frames: list[CandleFrame]) -> list[dict]:
+        """_calc_classic_indicators of each frame, from one left-aligned (symbols, bars) context."""
+        columns = {name: indicators.left_align([getattr(f, name) for f in frames])[0] for name in FIELDS}
+        lengths = np.array([len(f) for f in frames], dtype=np.int64)
+        context = AnalysisContext(CandleFrame(**columns))
+
+        atr = indicators.at_lengths(context.atr_series(14), lengths)
+        values = {"atr": [round(v, 6) for v in np.where(lengths >= 15, atr, 0.0).tolist()]}
+        for name, (series, ndigits) in _SERIES.items():
+            last = indicators.at_lengths(series(context), lengths)
+            values[name] = [
+                None if v != v else (v if ndigits is None else round(v, ndigits)) for v in last.tolist()
+            ]
+        return [{name: column[row] for name, column in values.items()} for row in range(len(frames))]
+
+    def scan(self, symbols: list[str], timeframe: str = "1h", limit: int = 200) -> dict[str, dict]:
+        """{symbol: {"result": {"current_price", "bars", <indicators>}} or an error response}."""
+
+        def fetch(symbol: str) -> CandleFrame | Exception:
+            try:
+                return candle_cache.get_frame(symbol, timeframe, limit)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(config.SCAN_CONCURRENCY, len(symbols) or 1)) as pool:
+            fetched = dict(zip(symbols, pool.map(fetch, symbols)))
+
+        results: dict[str, dict] = {}
+        frames = {}
+        for symbol, frame in fetched.items():
+            if isinstance(frame, Exception):
+                results[symbol] = {"status": "error", "message": str(frame)}
+            elif not len(frame):
+                results[symbol] = {"status": "error", "message": "No candles"}
+            else:
+                frames[symbol] = frame
+        try:
+            batch = self._batch(list(frames.values())) if frames else []
+        except Exception as e:
+            return {symbol: {"status": "error", "message": str(e)} for symbol in symbols}
+        for (symbol, frame), values in zip(frames.items(), batch):
+            results[symbol] = {
+                "result": {"current_price": float(frame.close[-1]), "bars": len(frame), **values}
+            }
+        return {symbol: results[symbol] for symbol in symbols}
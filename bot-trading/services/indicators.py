@@ -0,0 +1,161 @@
+"""Vectorized indicator kernels over float64 arrays.
+
+Every kernel works along the last axis, so a (symbols, bars) matrix is
+processed in one call just like a single series. Bars without enough history
+are NaN.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Block length for the closed-form recurrence: long enough to amortize the
+# Python loop over blocks, short enough that alpha**_BLOCK stays well above
+# underflow for every period we use.
+_BLOCK = 64
+
+
+@lru_cache(maxsize=64)
+def _block_weights(alpha: float, beta: float, size: int) -> tuple[np.ndarray, np.ndarray]:
+    idx = np.arange(size)
+    lag = idx[:, None] - idx[None, :]
+    kernel = np.where(lag >= 0, beta * alpha ** np.maximum(lag, 0), 0.0)
+    return kernel.T.copy(), alpha ** (idx + 1)
+
+
+def _recurrence(x: np.ndarray, alpha: float, beta: float, y0) -> np.ndarray:
+    """y[i] = alpha * y[i-1] + beta * x[i] with y[-1] = y0, along the last axis.
+
+    Each block of _BLOCK samples is solved in closed form with one matrix
+    product (the zero-state response). The state carried out of each block
+    obeys the same recurrence with alpha**_BLOCK, so it is solved the same way
+    one level up instead of in a Python loop.
+    """
+    n = x.shape[-1]
+    if n == 0:
+        return np.empty_like(x)
+    size = min(_BLOCK, n)
+    kernel_t, carry_weights = _block_weights(alpha, beta, size)
+
+    pad = (-n) % size
+    if pad:
+        x = np.concatenate([x, np.zeros(x.shape[:-1] + (pad,))], axis=-1)
+    blocks = (x.reshape(-1, size) @ kernel_t).reshape(x.shape[:-1] + (-1, size))
+    carry = np.empty(blocks.shape[:-1])
+    carry[..., 0] = y0
+    if carry.shape[-1] > 1:
+        carry[..., 1:] = _recurrence(blocks[..., :-1, -1], alpha ** size, 1.0, y0)
+    blocks += carry[..., None] * carry_weights
+    return blocks.reshape(x.shape)[..., :n]
+
+
+def _smoothed(x: np.ndarray, period: int, alpha: float, beta: float) -> np.ndarray:
+    """SMA of the first `period` samples as the seed, then the recurrence."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < period:
+        return out
+    seed = x[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    out[..., period:] = _recurrence(x[..., period:], alpha, beta, seed)
+    return out
+
+
+def ema(close: np.ndarray, period: int) -> np.ndarray:
+    k = 2 / (period + 1)
+    return _smoothed(np.asarray(close, dtype=np.float64), period, 1 - k, k)
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's moving average (RMA), as used by ATR and RSI."""
+    return _smoothed(np.asarray(values, dtype=np.float64), period, (period - 1) / period, 1 / period)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range of bars 1..n-1 (bar 0 has no previous close)."""
+    prev_close = close[..., :-1]
+    high, low = high[..., 1:], low[..., 1:]
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr_series(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    tr = true_range(high, low, close)
+    out = np.full(np.shape(close), np.nan)
+    out[..., 1:] = wilder(tr, period)
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> float:
+    """Latest Wilder ATR, 0.0 when there are fewer than period + 1 bars."""
+    if len(close) < period + 1:
+        return 0.0
+    return float(wilder(true_range(high, low, close), period)[-1])
+
+
+def gain_loss(close: np.ndarray) -> np.ndarray:
+    """Stacked (gains, losses) of the bar-to-bar changes, the shared input of every RSI period."""
+    diff = np.diff(np.asarray(close, dtype=np.float64), axis=-1)
+    return np.stack([np.maximum(diff, 0.0), np.maximum(-diff, 0.0)])
+
+
+def rsi(close: np.ndarray, period: int = 14, gains_losses: np.ndarray | None = None) -> np.ndarray:
+    if gains_losses is None:
+        gains_losses = gain_loss(close)
+    avg_gain, avg_loss = wilder(gains_losses, period)
+    out = np.full(np.shape(close), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[..., 1:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    return out
+
+
+def shifted_sums(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Cumulative sums of the series and its squares, shifted by its first value.
+
+    The shift keeps E[x^2] - E[x]^2 well conditioned for prices far from zero;
+    one pair of sums serves every Bollinger period.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    shifted = close - close[..., :1]
+    zero = np.zeros(close.shape[:-1] + (1,))
+    sums = np.concatenate([zero, np.cumsum(shifted, axis=-1)], axis=-1)
+    squares = np.concatenate([zero, np.cumsum(shifted * shifted, axis=-1)], axis=-1)
+    return sums, squares
+
+
+def bollinger(
+    close: np.ndarray, period: int = 20, mult: float = 2.0, sums: tuple[np.ndarray, np.ndarray] | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(upper, middle, lower) from rolling sums of the series and its squares (shifted_sums)."""
+    close = np.asarray(close, dtype=np.float64)
+    middle = np.full(close.shape, np.nan)
+    upper, lower = middle.copy(), middle.copy()
+    if close.shape[-1] < period:
+        return upper, middle, lower
+    sums, squares = shifted_sums(close) if sums is None else sums
+    mean = (sums[..., period:] - sums[..., :-period]) / period
+    var = (squares[..., period:] - squares[..., :-period]) / period - mean * mean
+    std = np.sqrt(np.maximum(var, 0.0))
+    middle[..., period - 1:] = mean + close[..., :1]
+    upper[..., period - 1:] = middle[..., period - 1:] + mult * std
+    lower[..., period - 1:] = middle[..., period - 1:] - mult * std
+    return upper, middle, lower
+
+
+def left_align(series: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Ragged series as one (len(series), longest) matrix, each row from column 0, plus their lengths.
+
+    Rows are padded on the right with their own last value. Every kernel is
+    causal, so padding only reaches columns past a row's end, and a finite pad
+    keeps the block recurrences from spreading NaN back into real bars. Read
+    each row's latest value with at_lengths().
+    """
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    out = np.empty((len(series), int(lengths.max()) if len(series) else 0))
+    for row, s in zip(out, series):
+        row[: len(s)] = s
+        row[len(s):] = s[-1] if len(s) else np.nan
+    return out, lengths
+
+
+def at_lengths(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """values[row, lengths[row] - 1]: each left-aligned row's value at its last real bar."""
+    return values[np.arange(len(lengths)), lengths - 1]
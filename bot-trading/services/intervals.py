@@ -0,0 +1,32 @@
+import time
+
+_UNIT_MS = {
+    "m": 60_000,
+    "h": 3_600_000,
+    "d": 86_400_000,
+    "w": 604_800_000,
+}
+
+
+def interval_ms(interval: str) -> int:
+    """Length of a fixed-width kline interval ("15m", "4h", "1d", "3h", ...) in ms.
+
+    Calendar months ("1M") have no fixed width and raise ValueError.
+    """
+    unit = interval[-1:]
+    count = interval[:-1]
+    if unit not in _UNIT_MS or not count.isdigit() or int(count) <= 0:
+        raise ValueError(f"Unsupported interval '{interval}'")
+    return int(count) * _UNIT_MS[unit]
+
+
+def is_fixed_interval(interval: str) -> bool:
+    try:
+        interval_ms(interval)
+    except ValueError:
+        return False
+    return True
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
@@ -0,0 +1,159 @@
+"""Seed the kline store from Binance's public kline archives (data.binance.vision).
+
+Run: cd bot-trading && python -m services.kline_archive ~/Downloads/klines [--workers 8]
+
+Works entirely from files on disk: monthly (BTCUSDT-1h-2024-01.zip) and
+daily (BTCUSDT-1h-2024-02-01.zip) archives can be mixed freely.
+"""
+
+import argparse
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config
+from services.candle_frame import FIELDS
+from services.intervals import interval_ms, is_fixed_interval
+from services.kline_store import KLINE_DTYPE, KlineStore, find_gaps
+
+_ARCHIVE_NAME = re.compile(r"^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.zip$")
+
+# Some archives carry microsecond open times; anything this large cannot be ms.
+_MICROSECOND_TS = 10**14
+
+
+def parse_archive_name(path: str) -> tuple[str, str, str] | None:
+    """(symbol, interval, date) for a Binance kline archive file name, else None."""
+    match = _ARCHIVE_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    return match["symbol"], match["interval"], match["date"]
+
+
+def _parse_csv(stream: io.BufferedIOBase) -> np.ndarray:
+    """First six CSV columns as float64, parsed by a C tokenizer (pandas when installed)."""
+    header = 0 if stream.peek(1)[:1].isdigit() else 1
+    try:
+        import pandas as pd
+    except ImportError:
+        return np.loadtxt(
+            io.TextIOWrapper(stream), delimiter=",", usecols=range(6), skiprows=header, ndmin=2, dtype=np.float64
+        )
+    frame = pd.read_csv(
+        stream, header=None, skiprows=header, usecols=range(6), dtype=np.float64, engine="c"
+    )
+    return frame.to_numpy()
+
+
+def read_archive(path: str) -> np.ndarray:
+    """Stream every CSV member of one archive into KLINE_DTYPE records, without extracting to disk."""
+    parts = []
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if name.endswith(".csv"):
+                with zf.open(name) as member:
+                    parts.append(_parse_csv(io.BufferedReader(member)))
+    cols = np.concatenate(parts) if parts else np.empty((0, 6))
+    rows = np.empty(len(cols), dtype=KLINE_DTYPE)
+    for i, name in enumerate(FIELDS):
+        rows[name] = cols[:, i]
+    if len(rows) and rows["timestamp"][0] >= _MICROSECOND_TS:
+        rows["timestamp"] //= 1000
+    return rows
+
+
+def merge(batches: list[np.ndarray]) -> tuple[np.ndarray, int]:
+    """Sort and dedupe overlapping archives; returns (rows, duplicates dropped)."""
+    rows = np.concatenate(batches) if batches else np.empty(0, dtype=KLINE_DTYPE)
+    rows = rows[np.argsort(rows["timestamp"], kind="stable")]
+    _, keep = np.unique(rows["timestamp"], return_index=True)
+    return rows[keep], len(rows) - len(keep)
+
+
+def collect(paths: list[str]) -> dict[tuple[str, str], list[str]]:
+    """Archive files under `paths`, grouped by (symbol, interval) and sorted by date."""
+    found: dict[tuple[str, str], list[tuple[str, str]]] = {}
+    for root in paths:
+        files = [root] if os.path.isfile(root) else [
+            os.path.join(d, f) for d, _, names in os.walk(root) for f in names
+        ]
+        for path in files:
+            parsed = parse_archive_name(path)
+            if parsed is not None:
+                symbol, interval, date = parsed
+                found.setdefault((symbol, interval), []).append((date, path))
+    return {key: [path for _, path in sorted(items)] for key, items in found.items()}
+
+
+def import_archives(
+    paths: list[str], store: KlineStore = None, workers: int = None, strict: bool = False
+) -> list[dict]:
+    """Parse archives across worker processes and upsert them into the kline store.
+
+    Gaps (exchange outages, missing files) are reported. The store holds one
+    contiguous run per key, so only the bars after the last gap are written
+    ("stored" in the report); with strict=True a gapped series raises
+    ValueError instead.
+    """
+    store = store or KlineStore(config.KLINE_STORE_DIR)
+    groups = collect(paths)
+    report = []
+    with ProcessPoolExecutor(max_workers=workers or config.ARCHIVE_WORKERS or None) as pool:
+        parsed = {key: pool.map(read_archive, files) for key, files in groups.items()}
+        for (symbol, interval), batches in parsed.items():
+            entry = {"symbol": symbol, "interval": interval, "files": len(groups[(symbol, interval)])}
+            if not is_fixed_interval(interval):
+                report.append({**entry, "status": "skipped", "message": f"{interval} has no fixed width"})
+                continue
+            step = interval_ms(interval)
+            rows, duplicates = merge(list(batches))
+            gaps = find_gaps(rows["timestamp"], step)
+            if gaps and strict:
+                raise ValueError(f"{symbol} {interval}: {len(gaps)} gaps, first at {gaps[0][0]}")
+            tail = int(np.searchsorted(rows["timestamp"], gaps[-1][0])) if gaps else 0
+            written = store.write(symbol, interval, rows[tail:], step)
+            if not written:
+                message = "archive ends before the stored bars; backfill the gap first"
+            elif tail:
+                message = f"{tail} bars before the last gap were not stored"
+            else:
+                message = None
+            report.append({
+                **entry,
+                "status": "written" if written else "dropped",
+                "rows": len(rows),
+                "stored": len(rows) - tail if written else 0,
+                "first": int(rows["timestamp"][0]) if len(rows) else None,
+                "last": int(rows["timestamp"][-1]) if len(rows) else None,
+                "duplicates": duplicates,
+                "gaps": gaps,
+                "message": message,
+            })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="archive files or directories containing them")
+    parser.add_argument("--store", default=config.KLINE_STORE_DIR, help="kline store directory")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--strict", action="store_true", help="fail on any gap instead of reporting it")
+    args = parser.parse_args()
+
+    for r in import_archives(args.paths, KlineStore(args.store), args.workers, args.strict):
+        line = f"[ARCHIVE] {r['symbol']} {r['interval']}: {r['status']} ({r['files']} files"
+        if "rows" in r:
+            line += f", {r['rows']} bars, {r['stored']} stored, {r['duplicates']} duplicates, {len(r['gaps'])} gaps"
+        print(line + ")")
+        for start, missing in r.get("gaps", [])[:10]:
+            print(f"    gap at {start}: {missing} bars missing")
+        if r.get("message"):
+            print(f"    {r['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import threading
+
+import numpy as np
+
+KLINE_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+
+def find_gaps(timestamps: np.ndarray, step_ms: int) -> list[tuple[int, int]]:
+    """(first missing open time, bars missing) for every break in the series."""
+    diffs = np.diff(timestamps)
+    return [
+        (int(timestamps[i]) + step_ms, int(diffs[i]) // step_ms - 1)
+        for i in np.flatnonzero(diffs != step_ms)
+    ]
+
+
+class KlineStore:
+    """Persistent per-(symbol, interval) kline arrays backed by np.memmap.
+
+    Each pair lives in one headerless file of fixed-width KLINE_DTYPE records
+    sorted by open time, so the row count is simply file size / itemsize and a
+    bar is located by binary search on the timestamp column. The store keeps a
+    single contiguous run per key: a batch that does not touch the stored run
+    replaces it when newer and is ignored when older.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._maps: dict[tuple[str, str], np.memmap] = {}
+        self._locks: dict[tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _key(self, symbol: str, interval: str) -> tuple[str, str]:
+        return symbol.upper(), interval
+
+    def _path(self, key: tuple[str, str]) -> str:
+        return os.path.join(self.root, f"{key[0]}_{key[1]}.bin")
+
+    def _lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _open(self, key: tuple[str, str]) -> np.ndarray:
+        mm = self._maps.get(key)
+        if mm is not None:
+            return mm
+        path = self._path(key)
+        if not os.path.exists(path) or os.path.getsize(path) < KLINE_DTYPE.itemsize:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        mm = np.memmap(path, dtype=KLINE_DTYPE, mode="r+")
+        self._maps[key] = mm
+        return mm
+
+    def _grow(self, key: tuple[str, str], length: int) -> np.memmap:
+        path = self._path(key)
+        self._maps.pop(key, None)
+        with open(path, "ab") as f:
+            f.truncate(length * KLINE_DTYPE.itemsize)
+        return self._open(key)
+
+    def _replace(self, key: tuple[str, str], rows: np.ndarray):
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        os.makedirs(self.root, exist_ok=True)
+        rows.astype(KLINE_DTYPE, copy=False).tofile(tmp)
+        self._maps.pop(key, None)
+        os.replace(tmp, path)
+
+    def read(self, symbol: str, interval: str) -> np.ndarray:
+        """Read-only view over every stored bar (empty array when nothing is stored)."""
+        key = self._key(symbol, interval)
+        with self._lock(key):
+            view = self._open(key).view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def tail(self, symbol: str, interval: str, limit: int) -> np.ndarray:
+        key = self._key(symbol, interval)
+        with self._lock(key):
+            return np.array(self._open(key)[-limit:])
+
+    def count(self, symbol: str, interval: str) -> int:
+        key = self._key(symbol, interval)
+        with self._lock(key):
+            return len(self._open(key))
+
+    def last_timestamp(self, symbol: str, interval: str) -> int | None:
+        key = self._key(symbol, interval)
+        with self._lock(key):
+            data = self._open(key)
+            return int(data["timestamp"][-1]) if len(data) else None
+
+    def write(self, symbol: str, interval: str, rows: np.ndarray, step_ms: int) -> bool:
+        """Upsert a sorted, contiguous batch of bars; returns False if it was dropped.
+
+        Bars already stored with the same open time are overwritten (the last
+        stored bar is usually the still-forming one). Appends that extend the
+        run are written in place; anything else rewrites the file.
+        """
+        if len(rows) == 0:
+            return False
+        key = self._key(symbol, interval)
+        with self._lock(key):
+            data = self._open(key)
+            ts = data["timestamp"]
+            first, last = int(rows["timestamp"][0]), int(rows["timestamp"][-1])
+
+            if len(data) == 0 or first > int(ts[-1]) + step_ms:
+                self._replace(key, rows)
+                return True
+            if last < int(ts[0]) - step_ms:
+                return False
+
+            start = int(np.searchsorted(ts, first))
+            end = int(np.searchsorted(ts, last, side="right"))
+            if end == len(data) and start + len(rows) >= len(data):
+                mm = self._grow(key, start + len(rows))
+                mm[start:] = rows
+                mm.flush()
+            else:
+                self._replace(key, np.concatenate([data[:start], rows, data[end:]]))
+            return True
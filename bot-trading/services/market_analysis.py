@@ -0,0 +1,34 @@
+from services.analysis_context import AnalysisContext
+from services.candle_cache import candle_cache
+from services.smc_service import SmcService
+from services.wyckoff_service import WyckoffService
+
+
+class MarketAnalysisService:
+    """SMC and Wyckoff analysis of one symbol/timeframe from a single candle fetch.
+
+    Both passes share one AnalysisContext, so true range, ATR(14) and the
+    volume SMA are computed once.
+    """
+
+    def __init__(self):
+        self._smc = SmcService()
+        self._wyckoff = WyckoffService()
+
+    def _build_result(self, symbol: str, timeframe: str, context: AnalysisContext) -> dict:
+        frame = context.frame
+        return {
+            "smc": self._smc._build_result(symbol, timeframe, frame, context),
+            "wyckoff": {"symbol": symbol, "timeframe": timeframe, **self._wyckoff._calc(frame, context)},
+        }
+
+    def market_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
+        """{"result": {"smc": <smc_analysis result>, "wyckoff": <wyckoff_analysis result>}}."""
+        try:
+            result = candle_cache.derive(
+                symbol, timeframe, limit, "analysis",
+                lambda context: self._build_result(symbol, timeframe, context),
+            )
+            return {"result": result}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
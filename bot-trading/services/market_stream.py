@@ -0,0 +1,235 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+
+import aiohttp
+import numpy as np
+
+import config
+from services.intervals import interval_ms
+from services.kline_store import KLINE_DTYPE
+
+
+async def _rest_seed(symbol: str, interval: str, limit: int) -> np.ndarray:
+    from services.candle_service import CandleService
+
+    return await CandleService().fetch_rows_async(symbol, interval, limit)
+
+
+class KlineRingBuffer:
+    """Fixed-size circular buffer of the most recent klines for one (symbol, interval)."""
+
+    def __init__(self, interval: str, capacity: int):
+        self.step = interval_ms(interval)
+        self.capacity = capacity
+        self.warm = False
+        self._rows = np.zeros(capacity, dtype=KLINE_DTYPE)
+        self._head = 0  # slot of the next append
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def seed(self, rows: np.ndarray):
+        rows = rows[-self.capacity:]
+        with self._lock:
+            self._rows[: len(rows)] = rows
+            self._size = len(rows)
+            self._head = len(rows) % self.capacity
+
+    def push(self, row: np.void) -> bool:
+        """Apply a stream update; returns False when it would leave a gap."""
+        with self._lock:
+            ts = int(row["timestamp"])
+            if self._size:
+                last = (self._head - 1) % self.capacity
+                last_ts = int(self._rows[last]["timestamp"])
+                if ts == last_ts:
+                    self._rows[last] = row
+                    return True
+                if ts < last_ts:
+                    return True
+                if ts != last_ts + self.step:
+                    return False
+            self._rows[self._head] = row
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            return True
+
+    def tail(self, limit: int) -> np.ndarray:
+        with self._lock:
+            n = min(limit, self._size)
+            idx = (self._head - n + np.arange(n)) % self.capacity
+            return self._rows[idx]
+
+
+class MarketStream:
+    """Binance combined kline stream feeding per-(symbol, interval) ring buffers.
+
+    Subscriptions are reference counted: the first subscribe for a pair adds
+    its stream to the live connection and seeds the buffer over REST, the last
+    unsubscribe removes it. A buffer is warm only while it is seeded and the
+    socket is up; on disconnect or a detected gap it goes cold and is
+    re-seeded, so readers never see a buffer with missing bars.
+    """
+
+    def __init__(self, url: str = None, capacity: int = None, seed=None):
+        self.url = url or config.BINANCE_STREAM_URL
+        self.capacity = capacity or config.MARKET_STREAM_BUFFER_SIZE
+        self._seed = seed or _rest_seed
+        self._buffers: dict[tuple[str, str], KlineRingBuffer] = {}
+        self._refs: dict[tuple[str, str], int] = {}
+        self._pending: dict[tuple[str, str], list] = {}
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._task: asyncio.Task | None = None
+        self._msg_id = 0
+
+    @staticmethod
+    def _key(symbol: str, interval: str) -> tuple[str, str]:
+        return symbol.upper(), interval
+
+    @staticmethod
+    def _stream_name(key: tuple[str, str]) -> str:
+        return f"{key[0].lower()}@kline_{key[1]}"
+
+    def subscriptions(self) -> list[dict]:
+        return [
+            {"symbol": key[0], "interval": key[1], "refs": refs, "warm": self._buffers[key].warm,
+             "bars": len(self._buffers[key])}
+            for key, refs in self._refs.items()
+        ]
+
+    def get_candles(self, symbol: str, interval: str, limit: int) -> np.ndarray | None:
+        """Latest `limit` bars from a warm buffer, or None when REST must be used."""
+        buf = self._buffers.get(self._key(symbol, interval))
+        if buf is None or not buf.warm or len(buf) < limit:
+            return None
+        return buf.tail(limit)
+
+    async def subscribe(self, symbol: str, interval: str):
+        key = self._key(symbol, interval)
+        self._refs[key] = self._refs.get(key, 0) + 1
+        if self._refs[key] > 1:
+            return
+        self._buffers[key] = KlineRingBuffer(interval, self.capacity)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if self._ws is not None:
+            await self._send("SUBSCRIBE", [self._stream_name(key)])
+            await self._warm(key)
+
+    async def unsubscribe(self, symbol: str, interval: str):
+        key = self._key(symbol, interval)
+        if key not in self._refs:
+            return
+        self._refs[key] -= 1
+        if self._refs[key] > 0:
+            return
+        del self._refs[key]
+        self._buffers.pop(key, None)
+        self._pending.pop(key, None)
+        await self._send("UNSUBSCRIBE", [self._stream_name(key)])
+        if not self._refs and self._ws is not None:
+            await self._ws.close()
+
+    @asynccontextmanager
+    async def subscription(self, symbol: str, interval: str):
+        await self.subscribe(symbol, interval)
+        try:
+            yield self
+        finally:
+            await self.unsubscribe(symbol, interval)
+
+    async def close(self):
+        self._refs.clear()
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._buffers.clear()
+        self._pending.clear()
+
+    async def _send(self, method: str, streams: list[str]):
+        if self._ws is None or self._ws.closed or not streams:
+            return
+        self._msg_id += 1
+        await self._ws.send_json({"method": method, "params": streams, "id": self._msg_id})
+
+    async def _warm(self, key: tuple[str, str]):
+        """(Re)seed a buffer over REST, replaying stream updates that arrive meanwhile."""
+        buf = self._buffers.get(key)
+        if buf is None or key in self._pending:
+            return
+        buf.warm = False
+        self._pending[key] = []
+        try:
+            rows = await self._seed(key[0], key[1], self.capacity)
+        except Exception as e:
+            print(f"[MarketStream] seed failed for {key[0]} {key[1]}: {e}")
+            self._pending.pop(key, None)
+            return
+        pending = self._pending.pop(key, [])
+        if self._buffers.get(key) is not buf:
+            return
+        buf.seed(rows)
+        connected = self._ws is not None and not self._ws.closed
+        if all(buf.push(row) for row in pending):
+            buf.warm = connected
+        elif connected:
+            asyncio.create_task(self._warm(key))
+
+    def _on_message(self, msg: dict):
+        data = msg.get("data")
+        if not data or data.get("e") != "kline":
+            return
+        k = data["k"]
+        key = self._key(k["s"], k["i"])
+        buf = self._buffers.get(key)
+        if buf is None:
+            return
+        row = np.array(
+            (k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])),
+            dtype=KLINE_DTYPE,
+        )[()]
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.append(row)
+        elif not buf.push(row):
+            asyncio.create_task(self._warm(key))
+
+    async def _run(self):
+        backoff = 1
+        async with aiohttp.ClientSession() as session:
+            while self._refs:
+                try:
+                    async with session.ws_connect(f"{self.url}/stream", heartbeat=30) as ws:
+                        self._ws = ws
+                        backoff = 1
+                        await self._send("SUBSCRIBE", [self._stream_name(k) for k in self._refs])
+                        for key, buf in self._buffers.items():
+                            if not buf.warm:
+                                asyncio.create_task(self._warm(key))
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._on_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[MarketStream] connection error: {e}")
+                finally:
+                    self._ws = None
+                    for buf in self._buffers.values():
+                        buf.warm = False
+                if self._refs:
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+
+
+market_stream = MarketStream()
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class RangeIndex:
+    """Range-extreme queries over one series, built once in O(n log n).
+
+    kind="min" answers "first bar at or after `start` whose value is below
+    `level`" (a zone broken to the downside); kind="max" the same for
+    "above". The suffix extreme makes the never-crossed case O(1); otherwise
+    a sparse table of power-of-two window extremes finds the first crossing
+    in O(log n).
+
+    arg_extreme() is an O(1) range argmin/argmax from a second sparse table
+    of indices, built on first use. window_extremes() and first_crossings()
+    answer the same questions for many windows / starts in one vectorized
+    pass, so several swing sizes share one table.
+    """
+
+    def __init__(self, values: np.ndarray, kind: str):
+        if kind not in ("min", "max"):
+            raise ValueError(f"kind must be 'min' or 'max', not '{kind}'")
+        self.kind = kind
+        values = np.asarray(values, dtype=np.float64)
+        self._ufunc = np.minimum if kind == "min" else np.maximum
+        self.values = values
+        self.suffix = self._ufunc.accumulate(values[::-1])[::-1]
+        self._levels = [values]
+        width = 1
+        while 2 * width <= len(values):
+            prev = self._levels[-1]
+            self._levels.append(self._ufunc(prev[:-width], prev[width:]))
+            width *= 2
+        self._arg_levels: list[np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _build_args(self) -> list[np.ndarray]:
+        values = self.values
+        better = np.less if self.kind == "min" else np.greater
+        levels = [np.arange(len(values))]
+        width = 1
+        while 2 * width <= len(values):
+            prev = levels[-1]
+            left, right = prev[:-width], prev[width:]
+            # Ties keep the left candidate, so every window reports its first extreme.
+            levels.append(np.where(better(values[right], values[left]), right, left))
+            width *= 2
+        return levels
+
+    def arg_extreme(self, start: int, stop: int) -> int:
+        """Index of the first min (kind="min") or max over values[start:stop]; stop > start."""
+        if self._arg_levels is None:
+            self._arg_levels = self._build_args()
+        j = (stop - start).bit_length() - 1
+        level = self._arg_levels[j]
+        left, right = int(level[start]), int(level[stop - (1 << j)])
+        return right if self._crosses(self.values[right], self.values[left]) else left
+
+    def _crosses(self, value: float, level: float) -> bool:
+        return value < level if self.kind == "min" else value > level
+
+    def first_crossing(self, start: int, level: float) -> int | None:
+        """Index of the first bar >= start strictly beyond `level`, or None."""
+        n = len(self.values)
+        if start >= n or not self._crosses(self.suffix[start], level):
+            return None
+        k = start
+        for j in range(len(self._levels) - 1, -1, -1):
+            width = 1 << j
+            if k + width <= n and not self._crosses(self._levels[j][k], level):
+                k += width
+        return k
+
+    def window_extremes(self, width: int) -> np.ndarray:
+        """out[i] = extreme of values[i : i + width]; n - width + 1 values from two table lookups each."""
+        n = len(self.values)
+        if width > n:
+            return np.empty(0)
+        j = width.bit_length() - 1
+        level = self._levels[j]
+        return self._ufunc(level[: n - width + 1], level[width - (1 << j) : n - (1 << j) + 1])
+
+    def first_crossings(self, starts: np.ndarray, stops: np.ndarray, levels: np.ndarray) -> np.ndarray:
+        """first_crossing() for many (start, level) pairs at once, limited to [start, stop); -1 if none."""
+        k = np.asarray(starts, dtype=np.int64).copy()
+        stops = np.asarray(stops, dtype=np.int64)
+        levels = np.asarray(levels, dtype=np.float64)
+        for j in range(len(self._levels) - 1, -1, -1):
+            width = 1 << j
+            table = self._levels[j]
+            fits = k + width <= stops
+            idx = np.where(fits, k, 0)
+            k = np.where(fits & ~self._crosses(table[idx], levels), k + width, k)
+        hit = k < stops
+        return np.where(hit & self._crosses(self.values[np.minimum(k, len(self.values) - 1)], levels), k, -1)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+
+import config
+
+
+class Priority(IntEnum):
+    ORDER = 0  # order placement / cancellation
+    ACCOUNT = 1  # account, leverage, exchange info
+    MARKET_DATA = 2  # single kline fetches
+    SCAN = 3  # bulk backfills and market-wide scans
+
+
+# USDⓈ-M futures request weights (https://developers.binance.com/docs/derivatives/usds-margined-futures)
+_ENDPOINT_WEIGHTS = {
+    "/fapi/v1/ping": 1,
+    "/fapi/v1/time": 1,
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v1/order": 1,
+    "/fapi/v1/algoOrder": 1,
+    "/fapi/v1/batchOrders": 5,
+    "/fapi/v1/allOpenOrders": 1,
+    "/fapi/v1/leverage": 1,
+    "/fapi/v1/marginType": 1,
+    "/fapi/v2/account": 5,
+    "/fapi/v3/account": 5,
+    "/fapi/v2/balance": 5,
+    "/fapi/v3/balance": 5,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v3/positionRisk": 5,
+    "/fapi/v1/allOrders": 5,
+    "/fapi/v1/userTrades": 5,
+}
+_ORDER_PATHS = {"/fapi/v1/order", "/fapi/v1/algoOrder", "/fapi/v1/batchOrders"}
+
+
+def _kline_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def endpoint_cost(method: str, path: str, params: dict) -> tuple[int, int]:
+    """(request weight, order count) a request will consume."""
+    if path.endswith("/klines"):
+        return _kline_weight(int(params.get("limit", 500))), 0
+    if path == "/fapi/v1/openOrders":
+        return (1 if params.get("symbol") else 40), 0
+    orders = 1 if method.upper() == "POST" and path in _ORDER_PATHS else 0
+    return _ENDPOINT_WEIGHTS.get(path, 1), orders
+
+
+def default_priority(method: str, path: str) -> Priority:
+    if path in _ORDER_PATHS or path == "/fapi/v1/allOpenOrders":
+        return Priority.ORDER
+    if path.endswith("/klines"):
+        return Priority.MARKET_DATA
+    return Priority.ACCOUNT
+
+
+class _Bucket:
+    def __init__(self, limit: int, window_s: float):
+        self.capacity = float(limit)
+        self.tokens = float(limit)
+        self.rate = limit / window_s
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, cost: float) -> float:
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+
+class RequestBudget:
+    """Shared token buckets for Binance's request-weight and order-count limits.
+
+    Callers reserve the cost of a request before sending it and block while
+    any bucket is short, so the process slows down instead of collecting 429s.
+    Waiters are served strictly by (priority, arrival), so an order placement
+    overtakes a queued scan. X-MBX-USED-WEIGHT-* / X-MBX-ORDER-COUNT-* response
+    headers resync the buckets with the exchange's own count, and a 429/418
+    Retry-After pauses every caller.
+    """
+
+    def __init__(
+        self,
+        weight_limit: int = None,
+        orders_per_10s: int = None,
+        orders_per_minute: int = None,
+        headroom: float = None,
+    ):
+        headroom = config.BINANCE_WEIGHT_HEADROOM if headroom is None else headroom
+        self._buckets = {
+            "x-mbx-used-weight-1m": _Bucket((weight_limit or config.BINANCE_WEIGHT_LIMIT) * headroom, 60),
+            "x-mbx-order-count-10s": _Bucket((orders_per_10s or config.BINANCE_ORDERS_PER_10S) * headroom, 10),
+            "x-mbx-order-count-1m": _Bucket((orders_per_minute or config.BINANCE_ORDERS_PER_MINUTE) * headroom, 60),
+        }
+        self._cond = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._spent: dict[str, list[int]] = {}
+
+    def _costs(self, weight: int, orders: int) -> dict[str, float]:
+        return {
+            name: min(bucket.capacity, weight if name.startswith("x-mbx-used-weight") else orders)
+            for name, bucket in self._buckets.items()
+        }
+
+    def try_acquire(self, weight: int, orders: int = 0, priority: Priority = Priority.MARKET_DATA) -> bool:
+        """Take the budget only if nobody is queued and it is available right now."""
+        with self._cond:
+            if self._queue:
+                return False
+            return self._take(self._costs(weight, orders), time.monotonic()) == 0.0
+
+    def _take(self, costs: dict[str, float], now: float) -> float:
+        """Deduct `costs` and return 0, or return how long to wait before retrying."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        wait = 0.0
+        for name, bucket in self._buckets.items():
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_for(costs[name]))
+        if wait > 0:
+            return wait
+        for name, bucket in self._buckets.items():
+            bucket.tokens -= costs[name]
+        return 0.0
+
+    def acquire(self, weight: int, orders: int = 0, priority: Priority = Priority.MARKET_DATA):
+        """Block until the budget is free; on an event loop thread, take it now or raise RuntimeError.
+
+        Waiting on the loop's thread would stall every coroutine on it (the
+        websocket stream, other requests), so such callers must run in a
+        worker thread or use acquire_async().
+        """
+        if _on_event_loop():
+            if self.try_acquire(weight, orders, priority):
+                return
+            raise RuntimeError("Request budget exhausted; blocking acquire() refused on the event loop thread")
+        costs = self._costs(weight, orders)
+        with self._cond:
+            ticket = (int(priority), next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = self._take(costs, time.monotonic()) if self._queue[0] == ticket else 1.0
+                    if wait == 0.0:
+                        return
+                    self._cond.wait(timeout=min(wait, 1.0))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    async def acquire_async(self, weight: int, orders: int = 0, priority: Priority = Priority.MARKET_DATA):
+        if not self.try_acquire(weight, orders, priority):
+            await asyncio.to_thread(self.acquire, weight, orders, priority)
+
+    def record(self, path: str, weight: int, status_code: int, headers):
+        """Account a finished request and resync with the exchange's rate-limit headers."""
+        with self._cond:
+            spent = self._spent.setdefault(path, [0, 0])
+            spent[0] += 1
+            spent[1] += weight
+            now = time.monotonic()
+            for name, bucket in self._buckets.items():
+                used = headers.get(name)
+                if used is not None:
+                    bucket.refill(now)
+                    bucket.tokens = min(bucket.tokens, bucket.capacity - float(used))
+            if status_code in (418, 429):
+                retry_after = float(headers.get("retry-after", 60))
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.refill(now)
+            return {
+                "available": {name: round(b.tokens, 1) for name, b in self._buckets.items()},
+                "capacity": {name: b.capacity for name, b in self._buckets.items()},
+                "queued": len(self._queue),
+                "paused_for_s": round(max(0.0, self._paused_until - now), 1),
+                "endpoints": {path: {"requests": n, "weight": w} for path, (n, w) in self._spent.items()},
+            }
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+request_budget = RequestBudget()
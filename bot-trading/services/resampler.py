@@ -0,0 +1,55 @@
+import numpy as np
+
+from services.intervals import interval_ms
+from services.kline_store import KLINE_DTYPE
+
+# Binance weekly klines open on Monday 00:00 UTC; the Unix epoch was a Thursday.
+_WEEK_OFFSET_MS = 4 * 86_400_000
+
+
+def bucket_offset_ms(interval: str) -> int:
+    return _WEEK_OFFSET_MS if interval.endswith("w") else 0
+
+
+def resample(rows: np.ndarray, base_interval: str, target_interval: str) -> np.ndarray:
+    """Aggregate base-interval klines into a higher timeframe.
+
+    Buckets are aligned to the Unix epoch, i.e. to UTC midnight for any
+    interval that divides a day (30m, 1h, 2h, 3h, 4h, 1d, ...), and to Monday
+    for weekly intervals, matching Binance's own kline boundaries. A leading
+    bucket that starts before the first base bar is dropped; the trailing
+    bucket is kept as the still-forming bar.
+    """
+    base = interval_ms(base_interval)
+    target = interval_ms(target_interval)
+    if target % base:
+        raise ValueError(f"{target_interval} is not a multiple of {base_interval}")
+    if target == base or len(rows) == 0:
+        return rows
+
+    offset = bucket_offset_ms(target_interval)
+    ts = rows["timestamp"]
+    buckets = (ts - offset) // target * target + offset
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if ts[0] != buckets[0]:
+        starts = starts[1:]
+        if len(starts) == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        rows, buckets = rows[starts[0]:], buckets[starts[0]:]
+        starts = starts - starts[0]
+    ends = np.r_[starts[1:], len(rows)] - 1
+
+    out = np.empty(len(starts), dtype=KLINE_DTYPE)
+    out["timestamp"] = buckets[starts]
+    out["open"] = rows["open"][starts]
+    out["high"] = np.maximum.reduceat(rows["high"], starts)
+    out["low"] = np.minimum.reduceat(rows["low"], starts)
+    out["close"] = rows["close"][ends]
+    out["volume"] = np.add.reduceat(rows["volume"], starts)
+    return out
+
+
+def base_bars_needed(base_interval: str, target_intervals: list[str], limit: int) -> int:
+    """Base bars required so every target interval gets `limit` buckets, the last one forming."""
+    ratio = max(interval_ms(tf) // interval_ms(base_interval) for tf in target_intervals)
+    return limit * ratio + ratio - 1
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    def __init__(self, on_loop: bool):
+        self.on_loop = on_loop
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.cancelled = False
+        self.waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one in-flight execution.
+
+    The first caller for a key runs the work; every caller that arrives while
+    it is running waits for it and receives the same result or exception.
+    Coroutines may join a call led by a thread, but a blocking caller never
+    waits on a coroutine leader: that leader finishes on its event loop, and
+    the blocking caller may be running on that very loop's thread. It runs
+    the work itself instead. A cancelled coroutine leader is not an outcome:
+    its cancellation is its own, and the coroutines waiting on it retry the
+    call, one of them leading it. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def _join(self, key: Hashable, on_loop: bool) -> tuple[_Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call(on_loop)
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call):
+        with self._lock:
+            self._calls.pop(key, None)
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_resolve, fut)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call, leader = self._join(key, on_loop=False)
+        if not leader:
+            if call.on_loop:
+                return fn()
+            call.done.wait()
+            return call.outcome()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+        finally:
+            self._finish(key, call)
+        return call.outcome()
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call, leader = self._join(key, on_loop=True)
+        while not leader:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            with self._lock:
+                pending = not call.done.is_set()
+                if pending:
+                    call.waiters.append((loop, fut))
+            if pending:
+                await fut
+            if not call.cancelled:
+                return call.outcome()
+            call, leader = self._join(key, on_loop=True)
+        try:
+            call.result = await fn()
+        except asyncio.CancelledError:
+            call.cancelled = True
+            raise
+        except BaseException as e:
+            call.error = e
+        finally:
+            self._finish(key, call)
+        return call.outcome()
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,579 @@
+"""Incremental SMC analysis: an SmcEngine fed bar by bar.
+
+update() advances pivots, BOS/CHoCH state, the FVG registry, the ATR / EMA /
+RSI recursions and the range extremes in amortized O(1) per bar. snapshot()
+returns exactly what SmcService._calc_smc returns for the same bars.
+
+Two parts of the batch result depend on the whole series, so they are
+finished at snapshot time instead of per bar:
+- Order blocks are located on high/low "parsed" with the ATR(200) of the
+  latest bar, so every break is kept and its OB resolved against the current
+  volatility filter (cached until that filter flips a bar inside its range).
+- OB and FVG strengths use the latest ATR(14).
+
+A bar with the same open time as the last one (the forming bar) replaces it:
+its effects are undone from a per-bar log and the new values applied.
+
+Every `checkpoint_every` bars the engine records a checkpoint: the per-bar
+state plus the lengths of its append-only lists. as_of(bar) restores the
+nearest checkpoint at or before `bar` into a new engine and replays at most
+`checkpoint_every` bars, so the state at any earlier bar is available
+without recomputing from the first bar.
+"""
+
+import heapq
+from collections import deque
+
+import numpy as np
+
+import config
+from services import smc_results
+from services.analysis_records import FairValueGap, SwingPoint
+from services.candle_frame import FIELDS, CandleFrame
+from services.smc_structure import StructureTracker
+
+SWING_SIZE = 50
+INTERNAL_SIZE = 5
+MIN_BARS = 60
+
+
+class _Smoother:
+    """One sample at a time of indicators._smoothed: SMA seed, then y = alpha * y + beta * x."""
+
+    __slots__ = ("period", "alpha", "beta", "count", "total", "value")
+
+    def __init__(self, period: int, alpha: float, beta: float):
+        self.period = period
+        self.alpha = alpha
+        self.beta = beta
+        self.count = 0
+        self.total = 0.0
+        self.value: float | None = None
+
+    @classmethod
+    def ema(cls, period: int) -> "_Smoother":
+        k = 2 / (period + 1)
+        return cls(period, 1 - k, k)
+
+    @classmethod
+    def wilder(cls, period: int) -> "_Smoother":
+        return cls(period, (period - 1) / period, 1 / period)
+
+    def copy(self) -> "_Smoother":
+        other = _Smoother(self.period, self.alpha, self.beta)
+        other.count, other.total, other.value = self.count, self.total, self.value
+        return other
+
+    def push(self, x: float):
+        self.count += 1
+        if self.count <= self.period:
+            self.total += x
+            if self.count == self.period:
+                self.value = self.total / self.period
+        else:
+            self.value = self.alpha * self.value + self.beta * x
+
+
+class _Columns:
+    """Growable float64 OHLCV columns (capacity doubles, so appends are amortized O(1))."""
+
+    def __init__(self, capacity: int = 256):
+        self._buf = np.empty((len(FIELDS), capacity))
+        self.n = 0
+
+    def append(self, row: tuple):
+        if self.n == self._buf.shape[1]:
+            grown = np.empty((len(FIELDS), 2 * self.n))
+            grown[:, : self.n] = self._buf
+            self._buf = grown
+        self._buf[:, self.n] = row
+        self.n += 1
+
+    def frame(self) -> CandleFrame:
+        return CandleFrame(*self._buf[:, : self.n])
+
+    def head(self, n: int) -> "_Columns":
+        """A copy holding the first n rows."""
+        columns = _Columns(max(256, 2 * n))
+        columns._buf[:, :n] = self._buf[:, :n]
+        columns.n = n
+        return columns
+
+
+class _SwingTracker:
+    """SmcService._find_swings for one pivot size, confirming one pivot bar per new bar.
+
+    Monotonic deques hold the max high / min low of the last `size` bars, so
+    the bar `size` back is tested against them in O(1).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.highs: list[SwingPoint] = []
+        self.lows: list[SwingPoint] = []
+        self.leg: str | None = None
+        self._max: deque[tuple[int, float]] = deque()
+        self._min: deque[tuple[int, float]] = deque()
+
+    @staticmethod
+    def _push(window: deque, i: int, value: float, dominates, expired: int, log: list):
+        while window and dominates(value, window[-1][1]):
+            log.append((window.append, window.pop()))
+        window.append((i, value))
+        log.append((window.pop,))
+        while window[0][0] <= expired:
+            log.append((window.appendleft, window.popleft()))
+
+    def push(self, i: int, highs: list[float], lows: list[float], log: list) -> int | None:
+        """Feed bar i; returns the pivot index when bar i confirmed one."""
+        p = i - self.size
+        self._push(self._max, i, highs[i], float.__ge__, p, log)
+        self._push(self._min, i, lows[i], float.__le__, p, log)
+        if p < 0:
+            return None
+        new_leg_high = highs[p] > self._max[0][1]
+        new_leg_low = lows[p] < self._min[0][1]
+        if not (new_leg_high or new_leg_low):
+            return None
+
+        prev_leg = self.leg
+        self.leg = "bearish" if new_leg_high else "bullish"
+        log.append((setattr, self, "leg", prev_leg))
+        if self.leg == prev_leg or prev_leg is None:
+            return None
+        if self.leg == "bullish":  # startOfBullishLeg → pivot LOW confirmed
+            pivots = self.lows
+            pivots.append(SwingPoint(p, lows[p], "low"))
+        else:  # startOfBearishLeg → pivot HIGH confirmed
+            pivots = self.highs
+            pivots.append(SwingPoint(p, highs[p], "high"))
+        log.append((pivots.pop,))
+        return p
+
+
+class SmcEngine:
+    """Stateful SMC analysis over every bar fed to it, oldest first."""
+
+    def __init__(self, checkpoint_every: int | None = None):
+        self._bars = _Columns()
+        self._highs: list[float] = []
+        self._lows: list[float] = []
+        self._closes: list[float] = []
+
+        self._swing = _SwingTracker(SWING_SIZE)
+        self._internal = _SwingTracker(INTERNAL_SIZE)
+        # Pivots arrive `size` bars late, so keep enough saved states to replay from one.
+        self._structures = (
+            (self._swing, StructureTracker(self._swing.highs, self._swing.lows, SWING_SIZE + 2)),
+            (self._internal, StructureTracker(self._internal.highs, self._internal.lows, INTERNAL_SIZE + 2)),
+        )
+
+        self._fvgs: list[dict] = []
+        # Open gaps by the level a later bar must trade through: -gap_low for bullish, gap_high for bearish
+        self._open_bullish: list[tuple[float, int, dict]] = []
+        self._open_bearish: list[tuple[float, int, dict]] = []
+
+        self._range_high = float("-inf")
+        self._range_low = float("inf")
+        self._atr = _Smoother.wilder(14)
+        self._atr200 = _Smoother.wilder(200)
+        self._emas = {period: _Smoother.ema(period) for period in (9, 20, 50)}
+        self._rsis = {period: (_Smoother.wilder(period), _Smoother.wilder(period)) for period in (7, 14, 21)}
+        self._bb = deque(maxlen=20)
+
+        # Undo information for the last bar, so a forming-bar update can replace it
+        self._log: list[tuple] = []
+        self._saved: tuple | None = None
+        self._replayed: list[tuple[StructureTracker, int | None]] = []
+
+        # Snapshot-time caches: OB location per break, mitigation scan per OB
+        self._high_vol = np.zeros(0, dtype=bool)
+        self._located: dict[tuple, tuple[int, float, float]] = {}
+        self._mitigation: dict[tuple, list] = {}
+        self._rewritten = 0
+
+        # _checkpoints[j] is the state before bar j * checkpoint_every
+        self._checkpoint_every = checkpoint_every or config.SMC_CHECKPOINT_INTERVAL
+        self._checkpoints: list[tuple] = []
+
+    def __len__(self) -> int:
+        return self._bars.n
+
+    @property
+    def last_timestamp(self) -> float:
+        return self._bars._buf[0, self._bars.n - 1] if self._bars.n else float("-inf")
+
+    @classmethod
+    def from_frame(cls, frame: CandleFrame, checkpoint_every: int | None = None) -> "SmcEngine":
+        engine = cls(checkpoint_every)
+        engine.extend(frame)
+        return engine
+
+    def frame(self) -> CandleFrame:
+        """The bars fed so far (views of the engine's columns, valid until the next update)."""
+        return self._bars.frame()
+
+    def extend(self, frame: CandleFrame):
+        for row in zip(*(getattr(frame, name).tolist() for name in FIELDS)):
+            self.update(row)
+
+    def update(self, bar):
+        """Feed one bar: a dict with the FIELDS keys or a (timestamp, open, high, low, close, volume) sequence.
+
+        A bar with the last bar's open time replaces it (forming-bar update).
+        """
+        row = tuple(float(bar[name]) for name in FIELDS) if isinstance(bar, dict) else tuple(map(float, bar))
+        last_ts = self.last_timestamp
+        if row[0] < last_ts:
+            raise ValueError(f"bar at {int(row[0])} is older than the last bar at {int(last_ts)}")
+        if row[0] == last_ts:
+            self._rollback()
+        self._apply(row)
+
+    # ------------------------------------------------------------------ per bar
+
+    def _apply(self, row: tuple):
+        i = self._bars.n
+        _, _, high, low, close, _ = row
+        if i % self._checkpoint_every == 0:
+            del self._checkpoints[i // self._checkpoint_every:]
+            self._checkpoints.append(self._checkpoint())
+        log = self._log = []
+        self._saved = (
+            self._range_high, self._range_low,
+            self._atr.copy(), self._atr200.copy(),
+            {p: s.copy() for p, s in self._emas.items()},
+            {p: (g.copy(), lo.copy()) for p, (g, lo) in self._rsis.items()},
+            self._bb[0] if len(self._bb) == self._bb.maxlen else None,
+        )
+
+        self._bars.append(row)
+        self._highs.append(high)
+        self._lows.append(low)
+        self._closes.append(close)
+        self._range_high = max(self._range_high, high)
+        self._range_low = min(self._range_low, low)
+
+        if i:
+            prev_close = self._closes[i - 1]
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            self._atr.push(tr)
+            self._atr200.push(tr)
+            diff = close - prev_close
+            for gain, loss in self._rsis.values():
+                gain.push(max(diff, 0.0))
+                loss.push(max(-diff, 0.0))
+        for ema in self._emas.values():
+            ema.push(close)
+        self._bb.append(close)
+
+        self._fill_fvgs(i, high, low, log)
+        if i >= 2:
+            self._detect_fvg(i - 1, log)
+
+        self._replayed = []
+        for swings, structure in self._structures:
+            pivot = swings.push(i, self._highs, self._lows, log)
+            if pivot is None:
+                structure.advance(self._closes, i, i + 1)
+            else:
+                # Batch structure sees a pivot from its own bar on: replay the bars since then.
+                structure.rewind(pivot - 1)
+                structure.advance(self._closes, pivot, i + 1)
+            self._replayed.append((structure, pivot))
+
+    def _fill_fvgs(self, i: int, high: float, low: float, log: list):
+        heap = self._open_bullish
+        while heap and -heap[0][0] > low:
+            item = heapq.heappop(heap)
+            item[2]["filled_index"] = i
+            log.append((self._reopen, heap, item))
+        heap = self._open_bearish
+        while heap and heap[0][0] < high:
+            item = heapq.heappop(heap)
+            item[2]["filled_index"] = i
+            log.append((self._reopen, heap, item))
+
+    @staticmethod
+    def _reopen(heap: list, item: tuple):
+        item[2]["filled_index"] = None
+        heapq.heappush(heap, item)
+
+    def _detect_fvg(self, i: int, log: list):
+        """Pine Script FVG at middle bar i, confirmed by bar i + 1 (see SmcService._find_fvgs)."""
+        highs, lows, closes = self._highs, self._lows, self._closes
+        if lows[i + 1] > highs[i - 1] and closes[i] > highs[i - 1]:
+            fvg = {"type": "bullish", "high": lows[i + 1], "low": highs[i - 1], "index": i, "filled_index": None}
+            heap, item = self._open_bullish, (-fvg["low"], i, fvg)
+        elif highs[i + 1] < lows[i - 1] and closes[i] < lows[i - 1]:
+            fvg = {"type": "bearish", "high": lows[i - 1], "low": highs[i + 1], "index": i, "filled_index": None}
+            heap, item = self._open_bearish, (fvg["high"], i, fvg)
+        else:
+            return
+        self._fvgs.append(fvg)
+        heapq.heappush(heap, item)
+        log.append((self._close_gap, heap, item))
+
+    def _close_gap(self, heap: list, item: tuple):
+        self._fvgs.pop()
+        heap.remove(item)
+        heapq.heapify(heap)
+
+    def _rollback(self):
+        """Undo the last bar."""
+        i = self._bars.n - 1
+        for entry in reversed(self._log):
+            entry[0](*entry[1:])
+        for structure, pivot in self._replayed:
+            if pivot is None:
+                structure.rewind(i - 1)
+            else:
+                structure.rewind(pivot - 1)
+                structure.advance(self._closes, pivot, i)
+
+        (self._range_high, self._range_low, self._atr, self._atr200,
+         self._emas, self._rsis, evicted) = self._saved
+        self._bb.pop()
+        if evicted is not None:
+            self._bb.appendleft(evicted)
+        self._highs.pop()
+        self._lows.pop()
+        self._closes.pop()
+        self._bars.n -= 1
+        self._rewritten = min(self._rewritten, i)
+        self._log = []
+        self._saved = None
+
+    # ------------------------------------------------------------------ checkpoints
+
+    def _checkpoint(self) -> tuple:
+        """State before bar n: copies of the small per-bar state, lengths of the append-only lists."""
+        n = self._bars.n
+        swings = tuple(
+            (len(sw.highs), len(sw.lows), sw.leg, tuple(sw._max), tuple(sw._min))
+            for sw in (self._swing, self._internal)
+        )
+        structures = []
+        for _, structure in self._structures:
+            # Breaks from the last `history` bars can still be rewound and replayed: keep those by value.
+            breaks = structure.breaks
+            stable = len(breaks)
+            while stable and breaks[stable - 1][0] >= n - structure._history:
+                stable -= 1
+            structures.append((structure._state, stable, tuple(breaks[stable:]), dict(structure._saved)))
+        return (
+            self._range_high, self._range_low,
+            self._atr.copy(), self._atr200.copy(),
+            {p: s.copy() for p, s in self._emas.items()},
+            {p: (g.copy(), lo.copy()) for p, (g, lo) in self._rsis.items()},
+            tuple(self._bb), swings, tuple(structures), len(self._fvgs),
+        )
+
+    def as_of(self, bar: int) -> "SmcEngine":
+        """A new engine over bars 0..bar, from the nearest checkpoint plus a replay of the bars after it."""
+        n = self._bars.n
+        if not 0 <= bar < n:
+            raise IndexError(f"bar {bar} is outside the {n} bars fed so far")
+        every = self._checkpoint_every
+        start = bar // every * every
+        (range_high, range_low, atr, atr200, emas, rsis, bb,
+         swings, structures, n_fvgs) = self._checkpoints[bar // every]
+
+        engine = SmcEngine(every)
+        engine._bars = self._bars.head(start)
+        engine._highs = self._highs[:start]
+        engine._lows = self._lows[:start]
+        engine._closes = self._closes[:start]
+        engine._range_high, engine._range_low = range_high, range_low
+        engine._atr, engine._atr200 = atr.copy(), atr200.copy()
+        engine._emas = {p: s.copy() for p, s in emas.items()}
+        engine._rsis = {p: (g.copy(), lo.copy()) for p, (g, lo) in rsis.items()}
+        engine._bb.extend(bb)
+
+        for sw, src, (n_highs, n_lows, leg, window_max, window_min) in zip(
+            (engine._swing, engine._internal), (self._swing, self._internal), swings
+        ):
+            sw.highs.extend(src.highs[:n_highs])
+            sw.lows.extend(src.lows[:n_lows])
+            sw.leg = leg
+            sw._max.extend(window_max)
+            sw._min.extend(window_min)
+        for (_, structure), (_, src), (state, stable, tail, saved) in zip(
+            engine._structures, self._structures, structures
+        ):
+            structure._state = state
+            structure.breaks.extend(src.breaks[:stable])
+            structure.breaks.extend(tail)
+            structure._saved = dict(saved)
+
+        for fvg in self._fvgs[:n_fvgs]:
+            filled = fvg["filled_index"]
+            fvg = dict(fvg, filled_index=filled if filled is not None and filled < start else None)
+            engine._fvgs.append(fvg)
+            if fvg["filled_index"] is None:
+                if fvg["type"] == "bullish":
+                    engine._open_bullish.append((-fvg["low"], fvg["index"], fvg))
+                else:
+                    engine._open_bearish.append((fvg["high"], fvg["index"], fvg))
+        heapq.heapify(engine._open_bullish)
+        heapq.heapify(engine._open_bearish)
+
+        # OB locations / mitigation scans carry over; snapshot() drops what the shorter series invalidates.
+        engine._high_vol = self._high_vol[: bar + 1].copy()
+        engine._located = dict(self._located)
+        engine._mitigation = {key: list(entry) for key, entry in self._mitigation.items()}
+        engine._rewritten = min(self._rewritten, bar + 1)
+
+        engine._checkpoints = self._checkpoints[: bar // every]
+        rows = self._bars._buf[:, start : bar + 1].T.tolist()
+        for row in rows:
+            engine._apply(tuple(row))
+        return engine
+
+    # ------------------------------------------------------------------ results
+
+    def atr(self) -> float:
+        return self._atr.value if self._atr.value is not None else 0.0
+
+    def _atr200_value(self) -> float:
+        """ATR over min(200, n - 1) bars, as _calc_smc uses it: the plain TR mean until 200 TRs exist."""
+        state = self._atr200
+        if state.value is not None:
+            return state.value
+        return state.total / state.count if state.count else 0.0
+
+    def snapshot(self) -> dict:
+        """The SmcService._calc_smc result for every bar fed so far."""
+        n = self._bars.n
+        if n < MIN_BARS:
+            return smc_results.empty_smc(self._closes[-1] if n else 0)
+
+        frame = self._bars.frame()
+        atr = self.atr()
+        atr200 = self._atr200_value() or atr
+        self._refresh_caches(frame, (frame.high - frame.low) >= 2 * atr200)
+
+        located, mitigation = {}, {}
+        order_blocks, results = [], []
+        for _, structure in self._structures:
+            for i, direction, pivot_idx in structure.breaks:
+                if pivot_idx >= i:
+                    continue
+                key = (direction, pivot_idx, i)
+                ob = located[key] = self._located.get(key) or self._locate(frame, direction, pivot_idx, i)
+                ob_idx, ob_high, ob_low = ob
+                level = ob_low if direction == "bullish" else ob_high
+                mkey = (direction, ob_idx, level)
+                mitigated_index = self._mitigated_index(frame, mkey, mitigation)
+                order_blocks.append(
+                    smc_results.order_block(frame, direction, ob_idx, ob_high, ob_low, mitigated_index, atr)
+                )
+            results.append((structure.trend, structure.last_bos, structure.last_choch))
+        self._located, self._mitigation = located, mitigation
+        self._rewritten = n
+
+        active_fvgs = []
+        for fvg in reversed(self._fvgs):
+            if fvg["filled_index"] is None:
+                active_fvgs.append(FairValueGap(
+                    fvg["type"], fvg["high"], fvg["low"], fvg["index"], None,
+                    smc_results.score_fvg(fvg["high"], fvg["low"], atr),
+                ))
+                if len(active_fvgs) == 6:
+                    break
+        active_fvgs.reverse()
+
+        (trend, last_bos, last_choch), (_, int_last_bos, int_last_choch) = results
+        liquidity_pools = smc_results.liquidity_pools(
+            self._swing.highs + self._internal.highs, self._swing.lows + self._internal.lows, atr,
+            np.maximum.accumulate(frame.high[::-1])[::-1], np.minimum.accumulate(frame.low[::-1])[::-1],
+        )
+        return smc_results.assemble(
+            trend=trend,
+            swing_highs=list(self._swing.highs), swing_lows=list(self._swing.lows),
+            internal_highs=list(self._internal.highs), internal_lows=list(self._internal.lows),
+            last_bos=last_bos, last_choch=last_choch,
+            internal_last_bos=int_last_bos, internal_last_choch=int_last_choch,
+            order_blocks=order_blocks, active_fvgs=active_fvgs, liquidity_pools=liquidity_pools,
+            range_high=self._range_high, range_low=self._range_low,
+            close=self._closes[-1], atr=atr,
+        )
+
+    def _refresh_caches(self, frame: CandleFrame, high_vol: np.ndarray):
+        """Drop cached OB locations whose range holds a bar the volatility filter flipped."""
+        old = self._high_vol
+        m = min(len(old), len(high_vol), self._rewritten)
+        flipped = np.flatnonzero(old[:m] != high_vol[:m])
+        if len(old) > m:
+            flipped = np.concatenate([flipped, np.arange(m, min(len(old), len(high_vol)))])
+        self._high_vol = high_vol
+        if len(flipped):
+            self._located = {
+                (direction, start, stop): ob for (direction, start, stop), ob in self._located.items()
+                if not _touches(flipped, start, stop)
+            }
+        # Bars from _rewritten on were replaced by forming-bar updates: rescan them.
+        n = self._rewritten
+        for entry in self._mitigation.values():
+            if entry[0] is not None and entry[0] >= n:
+                entry[0] = None
+            entry[1] = min(entry[1], n)
+
+    def _locate(self, frame: CandleFrame, direction: str, start: int, stop: int) -> tuple[int, float, float]:
+        """OB bar with min parsedLow (bullish) or max parsedHigh (bearish) in [start, stop)."""
+        high_vol = self._high_vol[start:stop]
+        highs, lows = frame.high[start:stop], frame.low[start:stop]
+        parsed_highs = np.where(high_vol, lows, highs)
+        parsed_lows = np.where(high_vol, highs, lows)
+        k = int(parsed_lows.argmin() if direction == "bullish" else parsed_highs.argmax())
+        return start + k, float(parsed_highs[k]), float(parsed_lows[k])
+
+    def _mitigated_index(self, frame: CandleFrame, key: tuple, mitigation: dict) -> int | None:
+        """First bar after the OB trading through `level`, scanning only bars not checked before."""
+        entry = mitigation.get(key) or self._mitigation.get(key) or [None, key[1] + 1]
+        mitigation[key] = entry
+        n = len(frame)
+        if entry[0] is None and entry[1] < n:
+            direction, _, level = key
+            if direction == "bullish":
+                hits = np.flatnonzero(frame.low[entry[1]:] < level)
+            else:
+                hits = np.flatnonzero(frame.high[entry[1]:] > level)
+            if len(hits):
+                entry[0] = entry[1] + int(hits[0])
+            entry[1] = n
+        return entry[0]
+
+    def indicators(self) -> dict:
+        """SmcService._calc_classic_indicators from the running recursions."""
+
+        def rsi(period: int) -> float | None:
+            gain, loss = self._rsis[period]
+            if gain.value is None:
+                return None
+            return round(100.0 if loss.value == 0 else 100 - 100 / (1 + gain.value / loss.value), 2)
+
+        bb_upper = bb_middle = bb_lower = None
+        if len(self._bb) == self._bb.maxlen:
+            window = np.fromiter(self._bb, np.float64, len(self._bb))
+            bb_middle = float(window.mean())
+            std = float(window.std())
+            bb_upper, bb_lower = bb_middle + 2.0 * std, bb_middle - 2.0 * std
+
+        return {
+            "atr": round(self.atr(), 6),
+            "ema9": self._emas[9].value,
+            "ema20": self._emas[20].value,
+            "ema50": self._emas[50].value,
+            "bb_upper": bb_upper,
+            "bb_middle": bb_middle,
+            "bb_lower": bb_lower,
+            "rsi7": rsi(7),
+            "rsi14": rsi(14),
+            "rsi21": rsi(21),
+        }
+
+
+def _touches(sorted_idx: np.ndarray, start: int, stop: int) -> bool:
+    j = int(np.searchsorted(sorted_idx, start))
+    return j < len(sorted_idx) and sorted_idx[j] < stop
@@ -0,0 +1,150 @@
+"""Compiled loops for the sequential parts of the batch SMC analysis.
+
+Pivot leg tracking, the BOS/CHoCH state machine and the order-block search
+are bar-by-bar recursions. With Numba installed (and SMC_NUMBA_ENABLED) they
+run as nopython kernels over float64 arrays; otherwise ENABLED is False and
+SmcService / StructureLevel use their NumPy + RangeIndex paths, which give
+the same results. The kernels stay callable as plain Python either way.
+"""
+
+import numpy as np
+
+import config
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+ENABLED = numba is not None and config.SMC_NUMBA_ENABLED
+
+
+def _jit(fn):
+    return numba.njit(cache=True, nogil=True)(fn) if ENABLED else fn
+
+
+@_jit
+def leg_pivots(highs, lows, size):
+    """SmcService._find_swings pivot bars: (high pivot indices, low pivot indices).
+
+    Bar p is tested against bars p+1..p+size once bar p+size arrives; the
+    max high / min low of that window come from monotonic index queues.
+    """
+    n = len(highs)
+    out_high = np.empty(n, np.int64)
+    out_low = np.empty(n, np.int64)
+    q_max = np.empty(n, np.int64)
+    q_min = np.empty(n, np.int64)
+    max_head = max_tail = min_head = min_tail = 0
+    n_high = n_low = 0
+    leg = 0  # 1 bullish, -1 bearish, 0 none yet
+    for i in range(n):
+        while max_tail > max_head and highs[q_max[max_tail - 1]] <= highs[i]:
+            max_tail -= 1
+        q_max[max_tail] = i
+        max_tail += 1
+        while min_tail > min_head and lows[q_min[min_tail - 1]] >= lows[i]:
+            min_tail -= 1
+        q_min[min_tail] = i
+        min_tail += 1
+
+        p = i - size
+        if p < 0:
+            continue
+        while q_max[max_head] <= p:
+            max_head += 1
+        while q_min[min_head] <= p:
+            min_head += 1
+        new_leg_high = highs[p] > highs[q_max[max_head]]
+        new_leg_low = lows[p] < lows[q_min[min_head]]
+        if not (new_leg_high or new_leg_low):
+            continue
+        new_leg = -1 if new_leg_high else 1
+        if leg != 0 and new_leg != leg:
+            if new_leg == 1:  # startOfBullishLeg → pivot LOW confirmed
+                out_low[n_low] = p
+                n_low += 1
+            else:  # startOfBearishLeg → pivot HIGH confirmed
+                out_high[n_high] = p
+                n_high += 1
+        leg = new_leg
+    return out_high[:n_high], out_low[:n_low]
+
+
+@_jit
+def structure_breaks(closes, high_idx, high_px, low_idx, low_px):
+    """StructureTracker.advance over every bar: (break bars, directions, pivot positions).
+
+    Direction is 1 for a bullish break of high pivot high_idx[pos], -1 for a
+    bearish break of low pivot low_idx[pos]; breaks come in bar order, the
+    bullish one first on a shared bar.
+    """
+    n_breaks = len(high_idx) + len(low_idx)
+    bars = np.empty(n_breaks, np.int64)
+    directions = np.empty(n_breaks, np.int64)
+    positions = np.empty(n_breaks, np.int64)
+    sh_ptr = sl_ptr = 0
+    current_sh = current_sl = -1
+    sh_crossed = sl_crossed = False
+    m = 0
+    for i in range(len(closes)):
+        while sh_ptr < len(high_idx) and high_idx[sh_ptr] <= i:
+            current_sh = sh_ptr
+            sh_crossed = False
+            sh_ptr += 1
+        while sl_ptr < len(low_idx) and low_idx[sl_ptr] <= i:
+            current_sl = sl_ptr
+            sl_crossed = False
+            sl_ptr += 1
+
+        close = closes[i]
+        if current_sh >= 0 and not sh_crossed and close > high_px[current_sh]:
+            bars[m], directions[m], positions[m] = i, 1, current_sh
+            m += 1
+            sh_crossed = True
+        if current_sl >= 0 and not sl_crossed and close < low_px[current_sl]:
+            bars[m], directions[m], positions[m] = i, -1, current_sl
+            m += 1
+            sl_crossed = True
+    return bars[:m], directions[:m], positions[:m]
+
+
+@_jit
+def order_blocks(bars, directions, pivots, parsed_highs, parsed_lows, lows, low_suffix, highs, high_suffix):
+    """OB bar and mitigation bar (-1 = none) for each break; see SmcService._order_blocks.
+
+    Bullish: first min parsedLow in [pivot, bar), mitigated by the first later
+    low below it. Bearish: first max parsedHigh, mitigated by a later high
+    above it. The suffix extremes rule out never-mitigated OBs without a scan.
+    """
+    m = len(bars)
+    n = len(lows)
+    ob = np.full(m, -1, np.int64)
+    mitigated = np.full(m, -1, np.int64)
+    for k in range(m):
+        start, stop = pivots[k], bars[k]
+        if start >= stop:
+            continue
+        j = start
+        if directions[k] == 1:
+            for t in range(start + 1, stop):
+                if parsed_lows[t] < parsed_lows[j]:
+                    j = t
+            level = parsed_lows[j]
+            if j + 1 < n and low_suffix[j + 1] < level:
+                for t in range(j + 1, n):
+                    if lows[t] < level:
+                        mitigated[k] = t
+                        break
+        else:
+            for t in range(start + 1, stop):
+                if parsed_highs[t] > parsed_highs[j]:
+                    j = t
+            level = parsed_highs[j]
+            if j + 1 < n and high_suffix[j + 1] > level:
+                for t in range(j + 1, n):
+                    if highs[t] > level:
+                        mitigated[k] = t
+                        break
+        ob[k] = j
+    return ob, mitigated
@@ -0,0 +1,178 @@
+"""Pieces of the smc_analysis result shared by the batch analysis and SmcEngine.
+
+SmcService computes structure, order blocks and gaps over a whole frame;
+SmcEngine keeps them up to date bar by bar. Both score, pool and assemble
+them into the same _calc_smc-shaped result with these functions.
+"""
+
+import numpy as np
+
+import config
+from services.analysis_records import (
+    EntryZone, FairValueGap, LiquidityPool, OrderBlock, StructureBreak, SwingPoint,
+)
+from services.candle_frame import CandleFrame
+
+
+def score_ob(frame: CandleFrame, idx: int, atr: float) -> int:
+    rng = float(frame.high[idx] - frame.low[idx])
+    if rng == 0 or atr == 0:
+        return 0
+    body_ratio = abs(float(frame.close[idx] - frame.open[idx])) / rng
+    size_vs_atr = min(rng / atr, 2) / 2
+    return min(100, round(body_ratio * 65 + (1 - size_vs_atr) * 35))
+
+
+def score_fvg(high: float, low: float, atr: float) -> int:
+    if atr == 0:
+        return 0
+    return min(100, round(((high - low) / atr) * 80))
+
+
+def order_block(
+    frame: CandleFrame, kind: str, idx: int, high: float, low: float, mitigated_index: int | None, atr: float
+) -> OrderBlock:
+    strength = 0 if mitigated_index is not None else score_ob(frame, idx, atr)
+    return OrderBlock(kind, idx, high, low, mitigated_index, strength)
+
+
+def premium_discount(range_high: float, range_low: float, close: float) -> dict:
+    """Premium/Discount: full dataset range (Pine Script trailing extremes)."""
+    rng = range_high - range_low
+    premium_discount_pct = ((close - range_low) / rng * 100) if rng > 0 else 50
+    if premium_discount_pct >= 55:
+        premium_discount_zone = "premium"
+    elif premium_discount_pct <= 45:
+        premium_discount_zone = "discount"
+    else:
+        premium_discount_zone = "equilibrium"
+    return {
+        "premium_discount_pct": round(premium_discount_pct, 2),
+        "premium_discount_zone": premium_discount_zone,
+        "equilibrium": range_low + rng / 2,
+        "range_high": range_high,
+        "range_low": range_low,
+    }
+
+
+def liquidity_pools(
+    highs: list[SwingPoint],
+    lows: list[SwingPoint],
+    atr: float,
+    high_suffix: np.ndarray,
+    low_suffix: np.ndarray,
+) -> list[LiquidityPool]:
+    """Equal highs (buy-side) and equal lows (sell-side): pivots within a fraction of ATR of each other.
+
+    Each side's pivots are sorted by price once and swept in order; a pool
+    holds every pivot within SMC_LIQUIDITY_TOLERANCE_ATR * atr of its
+    lowest price. Pools of two or more touches are kept. A pool is swept
+    once a later bar trades beyond its outermost price, read from the
+    suffix max high / min low. Pivots listed twice (swing and internal) count once.
+    """
+    tolerance = config.SMC_LIQUIDITY_TOLERANCE_ATR * atr
+    pools = []
+    for kind, pivots, suffix in (("buy_side", highs, high_suffix), ("sell_side", lows, low_suffix)):
+        points = sorted({p.index: p.price for p in pivots}.items(), key=lambda point: point[1])
+        cluster: list[tuple[int, float]] = []
+        for point in points:
+            if cluster and point[1] - cluster[0][1] > tolerance:
+                if len(cluster) > 1:
+                    pools.append(_liquidity_pool(kind, cluster, suffix))
+                cluster = []
+            cluster.append(point)
+        if len(cluster) > 1:
+            pools.append(_liquidity_pool(kind, cluster, suffix))
+    return pools
+
+
+def _liquidity_pool(kind: str, cluster: list[tuple[int, float]], suffix: np.ndarray) -> LiquidityPool:
+    low, high = cluster[0][1], cluster[-1][1]
+    level = high if kind == "buy_side" else low
+    last_index = max(index for index, _ in cluster)
+    beyond = float(suffix[last_index + 1]) if last_index + 1 < len(suffix) else level
+    return LiquidityPool(
+        kind, level, low, high, len(cluster),
+        min(index for index, _ in cluster), last_index,
+        beyond > level if kind == "buy_side" else beyond < level,
+    )
+
+
+def nearest(pools: list[LiquidityPool], price: float, count: int = 10) -> list[LiquidityPool]:
+    """The `count` liquidity pools closest to price."""
+    return sorted(pools, key=lambda pool: abs(pool.level - price))[:count]
+
+
+def potential_entries(
+    order_blocks: list[OrderBlock], active_fvgs: list[FairValueGap], close: float, atr: float
+) -> list[EntryZone]:
+    """Unmitigated strong OBs overlapping (or within one ATR of) a strong active FVG of the same side."""
+    entries = []
+    strong_obs = [ob for ob in order_blocks if not ob.mitigated and ob.strength >= 50]
+    strong_fvgs = [f for f in active_fvgs if not f.filled and f.strength >= 30]
+
+    for ob in strong_obs:
+        for fvg in strong_fvgs:
+            if ob.type != fvg.type:
+                continue
+            overlaps = ob.low <= fvg.high and ob.high >= fvg.low
+            ob_mid = (ob.high + ob.low) / 2
+            fvg_mid = (fvg.high + fvg.low) / 2
+            if overlaps or abs(ob_mid - fvg_mid) <= atr:
+                zone_high = max(ob.high, fvg.high)
+                zone_low = min(ob.low, fvg.low)
+                zone_mid = (zone_high + zone_low) / 2
+                confluence_score = round((ob.strength + fvg.strength) / 2)
+                distance_pct = abs(close - zone_mid) / close * 100 if close > 0 else 0
+                entries.append(EntryZone(
+                    ob.type, zone_high, zone_low, confluence_score,
+                    ob.strength, fvg.strength, round(distance_pct, 4),
+                ))
+
+    entries.sort(key=lambda x: x.confluence_score, reverse=True)
+    return entries
+
+
+def empty_smc(last: float) -> dict:
+    return {
+        "trend": "ranging",
+        "swing_highs": [], "swing_lows": [],
+        "internal_highs": [], "internal_lows": [],
+        "last_bos": None, "last_choch": None,
+        "internal_last_bos": None, "internal_last_choch": None,
+        "order_blocks": [], "fair_value_gaps": [],
+        "premium_discount_pct": 50, "premium_discount_zone": "equilibrium",
+        "equilibrium": last, "range_high": last, "range_low": last,
+        "buy_side_liquidity": [], "sell_side_liquidity": [], "liquidity_pools": [],
+        "potential_entries": [],
+    }
+
+
+def assemble(
+    *, trend: str, swing_highs: list[SwingPoint], swing_lows: list[SwingPoint],
+    internal_highs: list[SwingPoint], internal_lows: list[SwingPoint],
+    last_bos: StructureBreak | None, last_choch: StructureBreak | None,
+    internal_last_bos: StructureBreak | None, internal_last_choch: StructureBreak | None,
+    order_blocks: list[OrderBlock], active_fvgs: list[FairValueGap], liquidity_pools: list[LiquidityPool],
+    range_high: float, range_low: float, close: float, atr: float,
+) -> dict:
+    """_calc_smc-shaped result from structure pieces computed elsewhere (SmcEngine)."""
+    zone = premium_discount(range_high, range_low, close)
+    return {
+        "trend": trend,
+        "swing_highs": swing_highs,
+        "swing_lows": swing_lows,
+        "internal_highs": internal_highs,
+        "internal_lows": internal_lows,
+        "last_bos": last_bos,
+        "last_choch": last_choch,
+        "internal_last_bos": internal_last_bos,
+        "internal_last_choch": internal_last_choch,
+        "order_blocks": order_blocks,
+        "fair_value_gaps": active_fvgs,
+        **zone,
+        "buy_side_liquidity": sorted([s.price for s in swing_highs[-5:]], reverse=True),
+        "sell_side_liquidity": sorted([s.price for s in swing_lows[-5:]]),
+        "liquidity_pools": liquidity_pools,
+        "potential_entries": potential_entries(order_blocks, active_fvgs, close, atr),
+    }
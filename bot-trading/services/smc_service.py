@@ -1,426 +1,513 @@
-from services.candle_service import CandleService
+from typing import Any, Callable
+
+import numpy as np
+
+import config
+from services import smc_kernels, smc_results
+from services.analysis_context import AnalysisContext
+from services.analysis_records import FairValueGap, LiquidityPool, OrderBlock, SwingPoint, plain
+from services.candle_cache import candle_cache
+from services.candle_frame import CandleFrame
+from services.candle_source import candle_source
+from services.range_index import RangeIndex
+from services.smc_engine import SmcEngine
+from services.smc_structure import StructureLevel
 from services.wyckoff_service import WyckoffService
 
-_candle_service = CandleService()
+
+def _last(values: np.ndarray, ndigits: int | None = None) -> float | None:
+    value = float(values[-1]) if len(values) else float("nan")
+    if value != value:
+        return None
+    return value if ndigits is None else round(value, ndigits)
+
+
+# Classic indicator fields of the smc_analysis result
+_INDICATORS: dict[str, Callable[[AnalysisContext], float | None]] = {
+    "atr": lambda c: round(c.atr(14), 6),
+    "ema9": lambda c: _last(c.ema(9)),
+    "ema20": lambda c: _last(c.ema(20)),
+    "ema50": lambda c: _last(c.ema(50)),
+    "bb_upper": lambda c: _last(c.bollinger(20, 2.0)[0]),
+    "bb_middle": lambda c: _last(c.bollinger(20, 2.0)[1]),
+    "bb_lower": lambda c: _last(c.bollinger(20, 2.0)[2]),
+    "rsi7": lambda c: _last(c.rsi(7), 2),
+    "rsi14": lambda c: _last(c.rsi(14), 2),
+    "rsi21": lambda c: _last(c.rsi(21), 2),
+}
+
+# Selectable smc_analysis fields, in payload order (symbol, timeframe and current_price are always included)
+SMC_FIELDS = (
+    "trend", "last_bos", "last_choch", "internal_last_bos", "internal_last_choch",
+    "order_blocks", "mitigated_order_blocks", "fair_value_gaps",
+    "premium_discount_pct", "premium_discount_zone", "equilibrium", "range_high", "range_low",
+    "buy_side_liquidity", "sell_side_liquidity", "liquidity_pools",
+    "swing_highs", "swing_lows", "internal_highs", "internal_lows",
+    "potential_entries", "candles", *_INDICATORS,
+)
+
+# Fields only computed when asked for by name
+SMC_OPTIONAL_FIELDS = ("structure_levels",)
 
 
 class SmcService:
-    def _calc_atr(self, candles: list[dict], period: int = 14) -> float:
-        if len(candles) < period + 1:
-            return 0.0
-        trs = []
-        for i in range(1, len(candles)):
-            hl = candles[i]["high"] - candles[i]["low"]
-            hpc = abs(candles[i]["high"] - candles[i - 1]["close"])
-            lpc = abs(candles[i]["low"] - candles[i - 1]["close"])
-            trs.append(max(hl, hpc, lpc))
-        atr = sum(trs[:period]) / period
-        for i in range(period, len(trs)):
-            atr = (atr * (period - 1) + trs[i]) / period
-        return atr
-
-    def _calc_ema(self, closes: list[float], period: int) -> list[float | None]:
-        if len(closes) < period:
-            return [None] * len(closes)
-        k = 2 / (period + 1)
-        result: list[float | None] = [None] * (period - 1)
-        ema = sum(closes[:period]) / period
-        result.append(ema)
-        for i in range(period, len(closes)):
-            ema = closes[i] * k + ema * (1 - k)
-            result.append(ema)
-        return result
-
-    def _calc_bb(self, closes: list[float], period: int = 20, mult: float = 2.0) -> dict:
-        upper, middle, lower = [], [], []
-        for i in range(len(closes)):
-            if i < period - 1:
-                upper.append(None); middle.append(None); lower.append(None)
-            else:
-                sl = closes[i - period + 1: i + 1]
-                avg = sum(sl) / period
-                std = (sum((x - avg) ** 2 for x in sl) / period) ** 0.5
-                upper.append(avg + mult * std)
-                middle.append(avg)
-                lower.append(avg - mult * std)
-        return {"upper": upper, "middle": middle, "lower": lower}
-
-    def _calc_rsi(self, closes: list[float], period: int = 14) -> list[float | None]:
-        if len(closes) < period + 1:
-            return [None] * len(closes)
-        result: list[float | None] = [None] * period
-        gains = [max(closes[i] - closes[i - 1], 0) for i in range(1, period + 1)]
-        losses = [max(closes[i - 1] - closes[i], 0) for i in range(1, period + 1)]
-        avg_gain = sum(gains) / period
-        avg_loss = sum(losses) / period
-        result.append(100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss))
-        for i in range(period + 1, len(closes)):
-            diff = closes[i] - closes[i - 1]
-            avg_gain = (avg_gain * (period - 1) + max(diff, 0)) / period
-            avg_loss = (avg_loss * (period - 1) + max(-diff, 0)) / period
-            result.append(100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss))
-        return result
-
-    def _score_ob(self, candle: dict, atr: float) -> int:
-        rng = candle["high"] - candle["low"]
-        if rng == 0 or atr == 0:
-            return 0
-        body_ratio = abs(candle["close"] - candle["open"]) / rng
-        size_vs_atr = min(rng / atr, 2) / 2
-        return min(100, round(body_ratio * 65 + (1 - size_vs_atr) * 35))
-
-    def _score_fvg(self, high: float, low: float, atr: float) -> int:
-        if atr == 0:
-            return 0
-        return min(100, round(((high - low) / atr) * 80))
-
-    def _find_swings(self, candles: list[dict], size: int) -> tuple[list[dict], list[dict]]:
+    def _find_swings(
+        self,
+        frame: CandleFrame,
+        size: int,
+        high_index: RangeIndex | None = None,
+        low_index: RangeIndex | None = None,
+    ) -> tuple[list[SwingPoint], list[SwingPoint]]:
         """Pine Script leg()-based swing detection.
 
         Checks if bar at (i - size) is a pivot vs the next `size` bars.
-        size=50 → swing structure, size=5 → internal structure.
+        size=50 → swing structure, size=5 → internal structure. The window
+        extremes come from the highs/lows RangeIndex tables, which every size
+        can share, or from smc_kernels.leg_pivots when it is compiled.
         """
-        pivots_high: list[dict] = []
-        pivots_low: list[dict] = []
-        leg: str | None = None  # 'bearish' | 'bullish' | None
-
-        for i in range(size, len(candles)):
-            pivot_idx = i - size
-            # Pine: high[size] > ta.highest(size) — pivot bar vs next `size` bars
-            sub_high = max(candles[j]["high"] for j in range(pivot_idx + 1, i + 1))
-            sub_low = min(candles[j]["low"] for j in range(pivot_idx + 1, i + 1))
+        highs, lows = frame.high, frame.low
+        if len(highs) <= size:
+            return [], []
+        if smc_kernels.ENABLED:
+            high_pivots, low_pivots = smc_kernels.leg_pivots(highs, lows, size)
+            high_pivots, low_pivots = high_pivots.tolist(), low_pivots.tolist()
+        else:
+            high_pivots, low_pivots = self._leg_pivots(highs, lows, size, high_index, low_index)
+        return (
+            [SwingPoint(i, float(highs[i]), "high") for i in high_pivots],
+            [SwingPoint(i, float(lows[i]), "low") for i in low_pivots],
+        )
 
-            new_leg_high = candles[pivot_idx]["high"] > sub_high
-            new_leg_low = candles[pivot_idx]["low"] < sub_low
+    def _leg_pivots(
+        self,
+        highs: np.ndarray,
+        lows: np.ndarray,
+        size: int,
+        high_index: RangeIndex | None,
+        low_index: RangeIndex | None,
+    ) -> tuple[list[int], list[int]]:
+        """NumPy path of smc_kernels.leg_pivots: (high pivot bars, low pivot bars)."""
+        pivots_high: list[int] = []
+        pivots_low: list[int] = []
+        leg: str | None = None  # 'bearish' | 'bullish' | None
 
+        # Pine: high[size] > ta.highest(size) — pivot bar vs next `size` bars
+        pivots = len(highs) - size
+        if high_index is None:
+            high_index = RangeIndex(highs, "max")
+        if low_index is None:
+            low_index = RangeIndex(lows, "min")
+        new_leg_high = highs[:pivots] > high_index.window_extremes(size)[1:]
+        new_leg_low = lows[:pivots] < low_index.window_extremes(size)[1:]
+
+        # The leg only changes on bars that start one, so walk just those.
+        for pivot_idx in np.flatnonzero(new_leg_high | new_leg_low).tolist():
             prev_leg = leg
-            if new_leg_high:
-                leg = "bearish"
-            elif new_leg_low:
-                leg = "bullish"
+            leg = "bearish" if new_leg_high[pivot_idx] else "bullish"
 
             if leg != prev_leg and prev_leg is not None:
                 if leg == "bullish":  # startOfBullishLeg → pivot LOW confirmed
-                    pivots_low.append({
-                        "index": pivot_idx,
-                        "price": candles[pivot_idx]["low"],
-                        "type": "low",
-                    })
+                    pivots_low.append(pivot_idx)
                 elif leg == "bearish":  # startOfBearishLeg → pivot HIGH confirmed
-                    pivots_high.append({
-                        "index": pivot_idx,
-                        "price": candles[pivot_idx]["high"],
-                        "type": "high",
-                    })
+                    pivots_high.append(pivot_idx)
 
         return pivots_high, pivots_low
 
-    def _detect_structure_and_obs(
+    def _order_blocks(
         self,
-        candles: list[dict],
-        swing_highs: list[dict],
-        swing_lows: list[dict],
-        parsed_highs: list[float],
-        parsed_lows: list[float],
+        frame: CandleFrame,
+        breaks: list[tuple[int, str, int]],
+        parsed_highs: RangeIndex,
+        parsed_lows: RangeIndex,
         atr: float,
-    ) -> tuple[str, dict | None, dict | None, list[dict]]:
-        """BOS/CHoCH detection with trend-bias tracking + order block finding.
+        low_index: RangeIndex,
+        high_index: RangeIndex,
+    ) -> list[OrderBlock]:
+        """Order blocks for the structure breaks of one pass (StructureTracker.breaks).
 
-        Matches Pine Script displayStructure():
-        - Bullish break: close > active swing high → BOS if trend==bullish, CHoCH if trend==bearish
-        - Bearish break: close < active swing low → BOS if trend==bearish, CHoCH if trend==bullish
         OBs are found at the bar with min parsedLow (bullish) or max parsedHigh (bearish)
         between the pivot and break bar — matching Pine's storeOrdeBlock().
+        An OB is mitigated by the first later bar trading through its far edge
+        (mitigated_index).
         """
-        trend = "ranging"
-        last_bos: dict | None = None
-        last_choch: dict | None = None
-        order_blocks: list[dict] = []
-
-        sh_ptr = 0
-        sl_ptr = 0
-        current_sh: dict | None = None
-        current_sl: dict | None = None
-        sh_crossed = False
-        sl_crossed = False
-
-        for i in range(len(candles)):
-            close = candles[i]["close"]
-
-            # Advance to latest confirmed swing high/low up to bar i
-            while sh_ptr < len(swing_highs) and swing_highs[sh_ptr]["index"] <= i:
-                current_sh = swing_highs[sh_ptr]
-                sh_crossed = False
-                sh_ptr += 1
-
-            while sl_ptr < len(swing_lows) and swing_lows[sl_ptr]["index"] <= i:
-                current_sl = swing_lows[sl_ptr]
-                sl_crossed = False
-                sl_ptr += 1
-
-            # Bullish break: close crosses above swing high
-            if current_sh and not sh_crossed and close > current_sh["price"]:
-                tag = "CHoCH" if trend == "bearish" else "BOS"
-                event = {"price": current_sh["price"], "direction": "bullish", "type": tag, "bar_index": i}
-                last_bos = event
-                if tag == "CHoCH":
-                    last_choch = event
-                trend = "bullish"
-                sh_crossed = True
-
+        if smc_kernels.ENABLED:
+            return self._order_blocks_compiled(frame, breaks, parsed_highs, parsed_lows, atr, low_index, high_index)
+        order_blocks: list[OrderBlock] = []
+        for i, direction, pivot_idx in breaks:
+            if pivot_idx >= i:
+                continue
+            if direction == "bullish":
                 # Bullish OB: bar with min parsedLow in [pivot_idx, break_bar)
-                pivot_idx = current_sh["index"]
-                if pivot_idx < i:
-                    min_pl = float("inf")
-                    ob_idx = pivot_idx
-                    for j in range(pivot_idx, i):
-                        if parsed_lows[j] < min_pl:
-                            min_pl = parsed_lows[j]
-                            ob_idx = j
-                    ob_high = parsed_highs[ob_idx]
-                    ob_low = parsed_lows[ob_idx]
-                    mitigated = any(candles[k]["low"] < ob_low for k in range(ob_idx + 1, len(candles)))
-                    strength = 0 if mitigated else self._score_ob(candles[ob_idx], atr)
-                    order_blocks.append({
-                        "type": "bullish", "index": ob_idx,
-                        "high": ob_high, "low": ob_low,
-                        "mitigated": mitigated, "strength": strength,
-                    })
-
-            # Bearish break: close crosses below swing low
-            if current_sl and not sl_crossed and close < current_sl["price"]:
-                tag = "CHoCH" if trend == "bullish" else "BOS"
-                event = {"price": current_sl["price"], "direction": "bearish", "type": tag, "bar_index": i}
-                last_bos = event
-                if tag == "CHoCH":
-                    last_choch = event
-                trend = "bearish"
-                sl_crossed = True
-
+                ob_idx = parsed_lows.arg_extreme(pivot_idx, i)
+                mitigated_index = low_index.first_crossing(ob_idx + 1, float(parsed_lows.values[ob_idx]))
+            else:
                 # Bearish OB: bar with max parsedHigh in [pivot_idx, break_bar)
-                pivot_idx = current_sl["index"]
-                if pivot_idx < i:
-                    max_ph = float("-inf")
-                    ob_idx = pivot_idx
-                    for j in range(pivot_idx, i):
-                        if parsed_highs[j] > max_ph:
-                            max_ph = parsed_highs[j]
-                            ob_idx = j
-                    ob_high = parsed_highs[ob_idx]
-                    ob_low = parsed_lows[ob_idx]
-                    mitigated = any(candles[k]["high"] > ob_high for k in range(ob_idx + 1, len(candles)))
-                    strength = 0 if mitigated else self._score_ob(candles[ob_idx], atr)
-                    order_blocks.append({
-                        "type": "bearish", "index": ob_idx,
-                        "high": ob_high, "low": ob_low,
-                        "mitigated": mitigated, "strength": strength,
-                    })
-
-        return trend, last_bos, last_choch, order_blocks
-
-    def _find_fvgs(self, candles: list[dict], atr: float) -> list[dict]:
+                ob_idx = parsed_highs.arg_extreme(pivot_idx, i)
+                mitigated_index = high_index.first_crossing(ob_idx + 1, float(parsed_highs.values[ob_idx]))
+            order_blocks.append(smc_results.order_block(
+                frame, direction, ob_idx,
+                float(parsed_highs.values[ob_idx]), float(parsed_lows.values[ob_idx]), mitigated_index, atr,
+            ))
+        return order_blocks
+
+    def _order_blocks_compiled(
+        self,
+        frame: CandleFrame,
+        breaks: list[tuple[int, str, int]],
+        parsed_highs: RangeIndex,
+        parsed_lows: RangeIndex,
+        atr: float,
+        low_index: RangeIndex,
+        high_index: RangeIndex,
+    ) -> list[OrderBlock]:
+        """_order_blocks through smc_kernels.order_blocks."""
+        if not breaks:
+            return []
+        bars = np.fromiter((b[0] for b in breaks), np.int64, len(breaks))
+        directions = np.fromiter((1 if b[1] == "bullish" else -1 for b in breaks), np.int64, len(breaks))
+        pivots = np.fromiter((b[2] for b in breaks), np.int64, len(breaks))
+        obs, mitigated = smc_kernels.order_blocks(
+            bars, directions, pivots, parsed_highs.values, parsed_lows.values,
+            low_index.values, low_index.suffix, high_index.values, high_index.suffix,
+        )
+        return [
+            smc_results.order_block(
+                frame, direction, ob_idx,
+                float(parsed_highs.values[ob_idx]), float(parsed_lows.values[ob_idx]),
+                mitigated_index if mitigated_index >= 0 else None, atr,
+            )
+            for (_, direction, _), ob_idx, mitigated_index in zip(breaks, obs.tolist(), mitigated.tolist())
+            if ob_idx >= 0
+        ]
+
+    def _find_fvgs(
+        self, frame: CandleFrame, atr: float, low_index: RangeIndex, high_index: RangeIndex
+    ) -> list[FairValueGap]:
         """Pine Script FVG detection with close confirmation.
 
         Bullish: candle[i+1].low > candle[i-1].high AND candle[i].close > candle[i-1].high
         Bearish: candle[i+1].high < candle[i-1].low AND candle[i].close < candle[i-1].low
+        A gap is filled by the first bar from i+2 on that trades through it (filled_index).
         """
+        highs, lows, closes = frame.high, frame.low, frame.close
+        bullish = (lows[2:] > highs[:-2]) & (closes[1:-1] > highs[:-2])
+        bearish = (highs[2:] < lows[:-2]) & (closes[1:-1] < lows[:-2])
         fvgs = []
-        for i in range(1, len(candles) - 1):
-            prev, mid, nxt = candles[i - 1], candles[i], candles[i + 1]
-
-            if nxt["low"] > prev["high"] and mid["close"] > prev["high"]:
-                gap_low, gap_high = prev["high"], nxt["low"]
-                filled = any(c["low"] < gap_low for c in candles[i + 2:])
-                strength = 0 if filled else self._score_fvg(gap_high, gap_low, atr)
-                fvgs.append({
-                    "type": "bullish", "high": gap_high, "low": gap_low,
-                    "index": i, "filled": filled, "strength": strength,
-                })
-
-            if nxt["high"] < prev["low"] and mid["close"] < prev["low"]:
-                gap_low, gap_high = nxt["high"], prev["low"]
-                filled = any(c["high"] > gap_high for c in candles[i + 2:])
-                strength = 0 if filled else self._score_fvg(gap_high, gap_low, atr)
-                fvgs.append({
-                    "type": "bearish", "high": gap_high, "low": gap_low,
-                    "index": i, "filled": filled, "strength": strength,
-                })
+        # The two conditions are mutually exclusive for a bar, so one sorted walk keeps the order.
+        for i in (np.flatnonzero(bullish | bearish) + 1).tolist():
+            if bullish[i - 1]:
+                gap_low, gap_high = float(highs[i - 1]), float(lows[i + 1])
+                filled_index = low_index.first_crossing(i + 2, gap_low)
+                kind = "bullish"
+            else:
+                gap_low, gap_high = float(highs[i + 1]), float(lows[i - 1])
+                filled_index = high_index.first_crossing(i + 2, gap_high)
+                kind = "bearish"
+            strength = 0 if filled_index is not None else smc_results.score_fvg(gap_high, gap_low, atr)
+            fvgs.append(FairValueGap(kind, gap_high, gap_low, i, filled_index, strength))
 
         return fvgs
 
-    def _calc_smc(self, candles: list[dict]) -> dict:
-        if len(candles) < 60:
-            last = candles[-1]["close"] if candles else 0
-            return {
-                "trend": "ranging",
-                "swing_highs": [], "swing_lows": [],
-                "internal_highs": [], "internal_lows": [],
-                "last_bos": None, "last_choch": None,
-                "internal_last_bos": None, "internal_last_choch": None,
-                "order_blocks": [], "fair_value_gaps": [],
-                "premium_discount_pct": 50, "premium_discount_zone": "equilibrium",
-                "equilibrium": last, "range_high": last, "range_low": last,
-                "buy_side_liquidity": [], "sell_side_liquidity": [],
-                "potential_entries": [],
-            }
-
-        atr = self._calc_atr(candles, 14)
-
-        # Volatility filter: high-volatility bars get inverted high/low (Pine: parsedHigh/parsedLow)
-        atr200 = self._calc_atr(candles, min(200, len(candles) - 1))
-        if atr200 == 0:
-            atr200 = atr
-        parsed_highs: list[float] = []
-        parsed_lows: list[float] = []
-        for c in candles:
-            high_vol = (c["high"] - c["low"]) >= 2 * atr200
-            parsed_highs.append(c["low"] if high_vol else c["high"])
-            parsed_lows.append(c["high"] if high_vol else c["low"])
-
-        # Swing structure (size=50) + internal structure (size=5)
-        swing_highs, swing_lows = self._find_swings(candles, 50)
-        internal_highs, internal_lows = self._find_swings(candles, 5)
-
-        # Swing BOS/CHoCH + swing OBs
-        trend, last_bos, last_choch, swing_obs = self._detect_structure_and_obs(
-            candles, swing_highs, swing_lows, parsed_highs, parsed_lows, atr
-        )
-
-        # Internal BOS/CHoCH + internal OBs
-        _, int_last_bos, int_last_choch, internal_obs = self._detect_structure_and_obs(
-            candles, internal_highs, internal_lows, parsed_highs, parsed_lows, atr
+    # ── components, computed on first use and memoized on the AnalysisContext ──
+    def _swings(self, context: AnalysisContext, size: int) -> tuple[list[SwingPoint], list[SwingPoint]]:
+        low_index, high_index = self._raw_indexes(context)
+        return context.memo(
+            ("smc_swings", size), lambda: self._find_swings(context.frame, size, high_index, low_index)
         )
 
-        order_blocks = swing_obs + internal_obs
-
-        fvgs = self._find_fvgs(candles, atr)
-        active_fvgs = [f for f in fvgs if not f["filled"]][-6:]
-
-        # Premium/Discount: full dataset range (Pine Script trailing extremes)
-        range_high = max(c["high"] for c in candles)
-        range_low = min(c["low"] for c in candles)
-        rng = range_high - range_low
-        close = candles[-1]["close"]
-        equilibrium = range_low + rng / 2
-        premium_discount_pct = ((close - range_low) / rng * 100) if rng > 0 else 50
-        if premium_discount_pct >= 55:
-            premium_discount_zone = "premium"
-        elif premium_discount_pct <= 45:
-            premium_discount_zone = "discount"
-        else:
-            premium_discount_zone = "equilibrium"
-
-        buy_side_liquidity = sorted([s["price"] for s in swing_highs[-5:]], reverse=True)
-        sell_side_liquidity = sorted([s["price"] for s in swing_lows[-5:]])
-
-        potential_entries = []
-        strong_obs = [ob for ob in order_blocks if not ob["mitigated"] and ob["strength"] >= 50]
-        strong_fvgs = [f for f in active_fvgs if not f["filled"] and f["strength"] >= 30]
-
-        for ob in strong_obs:
-            for fvg in strong_fvgs:
-                if ob["type"] != fvg["type"]:
-                    continue
-                overlaps = ob["low"] <= fvg["high"] and ob["high"] >= fvg["low"]
-                ob_mid = (ob["high"] + ob["low"]) / 2
-                fvg_mid = (fvg["high"] + fvg["low"]) / 2
-                if overlaps or abs(ob_mid - fvg_mid) <= atr:
-                    zone_high = max(ob["high"], fvg["high"])
-                    zone_low = min(ob["low"], fvg["low"])
-                    zone_mid = (zone_high + zone_low) / 2
-                    confluence_score = round((ob["strength"] + fvg["strength"]) / 2)
-                    distance_pct = abs(close - zone_mid) / close * 100 if close > 0 else 0
-                    potential_entries.append({
-                        "type": ob["type"],
-                        "zone_high": zone_high, "zone_low": zone_low,
-                        "confluence_score": confluence_score,
-                        "ob_strength": ob["strength"], "fvg_strength": fvg["strength"],
-                        "distance_pct": round(distance_pct, 4),
-                    })
-
-        potential_entries.sort(key=lambda x: x["confluence_score"], reverse=True)
+    def _structure(self, context: AnalysisContext, size: int) -> StructureLevel:
+        """BOS/CHoCH over the pivots of one size (50 = swing, 5 = internal, or any other level)."""
+
+        def compute():
+            frame = context.frame
+            closes = context.memo(
+                ("smc_closes",), lambda: (RangeIndex(frame.close, "max"), RangeIndex(frame.close, "min"))
+            )
+            return StructureLevel(size, *self._swings(context, size), *closes)
+
+        return context.memo(("smc_structure", size), compute)
+
+    def _parsed_indexes(self, context: AnalysisContext) -> tuple[RangeIndex, RangeIndex]:
+        """Range argmax/argmin for OB location, shared by the swing and internal passes."""
+
+        def compute():
+            frame = context.frame
+            # Volatility filter: high-volatility bars get inverted high/low (Pine: parsedHigh/parsedLow)
+            atr200 = context.atr(min(200, len(frame) - 1)) or context.atr(14)
+            high_vol = (frame.high - frame.low) >= 2 * atr200
+            return (
+                RangeIndex(np.where(high_vol, frame.low, frame.high), "max"),
+                RangeIndex(np.where(high_vol, frame.high, frame.low), "min"),
+            )
+
+        return context.memo(("smc_parsed",), compute)
+
+    def _raw_indexes(self, context: AnalysisContext) -> tuple[RangeIndex, RangeIndex]:
+        """Mitigation / fill lookups against raw lows and highs."""
+        frame = context.frame
+        return context.memo(("smc_raw",), lambda: (RangeIndex(frame.low, "min"), RangeIndex(frame.high, "max")))
+
+    def _level_order_blocks(self, context: AnalysisContext, size: int) -> list[OrderBlock]:
+        def compute():
+            return self._order_blocks(
+                context.frame, self._structure(context, size).breaks,
+                *self._parsed_indexes(context), context.atr(14), *self._raw_indexes(context),
+            )
+
+        return context.memo(("smc_order_blocks", size), compute)
+
+    def _all_order_blocks(self, context: AnalysisContext) -> list[OrderBlock]:
+        """Swing OBs followed by internal OBs."""
+        return self._level_order_blocks(context, 50) + self._level_order_blocks(context, 5)
+
+    def _structure_levels(self, context: AnalysisContext, sizes: tuple[int, ...]) -> list[dict]:
+        """Trend, last BOS/CHoCH, recent pivots, unmitigated OBs and liquidity pools for each swing size.
+
+        All sizes share the highs/lows/closes RangeIndex tables, so each extra
+        level costs a few vectorized lookups plus a walk over its own pivots
+        and breaks, not another pass over every bar.
+        """
+        if len(context.frame) < 60:
+            return []
+        low_index, high_index = self._raw_indexes(context)
+        close = float(context.frame.close[-1])
+        levels = []
+        for size in sizes:
+            structure = self._structure(context, size)
+            pools = smc_results.liquidity_pools(
+                structure.highs, structure.lows, context.atr(14), high_index.suffix, low_index.suffix
+            )
+            levels.append({
+                "size": size,
+                "trend": structure.trend,
+                "last_bos": structure.last_bos,
+                "last_choch": structure.last_choch,
+                "swing_highs": structure.highs[-10:],
+                "swing_lows": structure.lows[-10:],
+                "order_blocks": [ob for ob in self._level_order_blocks(context, size) if not ob.mitigated],
+                "liquidity_pools": smc_results.nearest(pools, close),
+            })
+        return levels
+
+    def _all_liquidity_pools(self, context: AnalysisContext) -> list[LiquidityPool]:
+        """Pools over the swing and internal pivots."""
+
+        def compute():
+            swing_highs, swing_lows = self._swings(context, 50)
+            internal_highs, internal_lows = self._swings(context, 5)
+            low_index, high_index = self._raw_indexes(context)
+            return smc_results.liquidity_pools(
+                swing_highs + internal_highs, swing_lows + internal_lows, context.atr(14),
+                high_index.suffix, low_index.suffix,
+            )
+
+        return context.memo(("smc_liquidity",), compute)
+
+    def _active_fvgs(self, context: AnalysisContext) -> list[FairValueGap]:
+        def compute():
+            fvgs = self._find_fvgs(context.frame, context.atr(14), *self._raw_indexes(context))
+            return [f for f in fvgs if not f.filled][-6:]
+
+        return context.memo(("smc_fvgs",), compute)
+
+    def _smc_getters(self, context: AnalysisContext) -> dict[str, Callable[[], Any]]:
+        """_calc_smc keys -> thunks that compute only the components each key depends on."""
+        frame = context.frame
+        if len(frame) < 60:
+            empty = smc_results.empty_smc(float(frame.close[-1]) if len(frame) else 0)
+            return {key: (lambda key=key: empty[key]) for key in empty}
+
+        close = float(frame.close[-1])
+
+        def swings(size: int) -> tuple[list[SwingPoint], list[SwingPoint]]:
+            return self._swings(context, size)
+
+        def structure(size: int) -> StructureLevel:
+            return self._structure(context, size)
+
+        def zone() -> dict:
+            return context.memo(
+                ("smc_zone",),
+                lambda: smc_results.premium_discount(float(frame.high.max()), float(frame.low.min()), close),
+            )
 
         return {
-            "trend": trend,
-            "swing_highs": swing_highs,
-            "swing_lows": swing_lows,
-            "internal_highs": internal_highs,
-            "internal_lows": internal_lows,
-            "last_bos": last_bos,
-            "last_choch": last_choch,
-            "internal_last_bos": int_last_bos,
-            "internal_last_choch": int_last_choch,
-            "order_blocks": order_blocks,
-            "fair_value_gaps": active_fvgs,
-            "premium_discount_pct": round(premium_discount_pct, 2),
-            "premium_discount_zone": premium_discount_zone,
-            "equilibrium": equilibrium,
-            "range_high": range_high,
-            "range_low": range_low,
-            "buy_side_liquidity": buy_side_liquidity,
-            "sell_side_liquidity": sell_side_liquidity,
-            "potential_entries": potential_entries,
+            "trend": lambda: structure(50).trend,
+            "swing_highs": lambda: swings(50)[0],
+            "swing_lows": lambda: swings(50)[1],
+            "internal_highs": lambda: swings(5)[0],
+            "internal_lows": lambda: swings(5)[1],
+            "last_bos": lambda: structure(50).last_bos,
+            "last_choch": lambda: structure(50).last_choch,
+            "internal_last_bos": lambda: structure(5).last_bos,
+            "internal_last_choch": lambda: structure(5).last_choch,
+            "order_blocks": lambda: self._all_order_blocks(context),
+            "fair_value_gaps": lambda: self._active_fvgs(context),
+            "premium_discount_pct": lambda: zone()["premium_discount_pct"],
+            "premium_discount_zone": lambda: zone()["premium_discount_zone"],
+            "equilibrium": lambda: zone()["equilibrium"],
+            "range_high": lambda: zone()["range_high"],
+            "range_low": lambda: zone()["range_low"],
+            "buy_side_liquidity": lambda: sorted([s.price for s in swings(50)[0][-5:]], reverse=True),
+            "sell_side_liquidity": lambda: sorted([s.price for s in swings(50)[1][-5:]]),
+            "liquidity_pools": lambda: self._all_liquidity_pools(context),
+            "potential_entries": lambda: smc_results.potential_entries(
+                self._all_order_blocks(context), self._active_fvgs(context), close, context.atr(14)
+            ),
         }
 
-    def _calc_classic_indicators(self, candles: list[dict]) -> dict:
-        closes = [c["close"] for c in candles]
-        atr = self._calc_atr(candles, 14)
+    def _calc_smc(self, frame: CandleFrame, context: AnalysisContext | None = None) -> dict:
+        getters = self._smc_getters(context or AnalysisContext(frame))
+        return {key: get() for key, get in getters.items()}
+
+    def _calc_classic_indicators(self, frame: CandleFrame, context: AnalysisContext | None = None) -> dict:
+        context = context or AnalysisContext(frame)
+        return {name: get(context) for name, get in _INDICATORS.items()}
 
-        ema9 = self._calc_ema(closes, 9)
-        ema20 = self._calc_ema(closes, 20)
-        ema50 = self._calc_ema(closes, 50)
-        bb = self._calc_bb(closes, 20, 2.0)
-        rsi7 = self._calc_rsi(closes, 7)
-        rsi14 = self._calc_rsi(closes, 14)
-        rsi21 = self._calc_rsi(closes, 21)
+    def _result_getters(
+        self,
+        frame: CandleFrame,
+        context: AnalysisContext,
+        smc: dict | None = None,
+        classic: dict | None = None,
+    ) -> dict[str, Callable[[], Any]]:
+        """smc_analysis result fields -> thunks; see SMC_FIELDS.
+
+        `smc` / `classic` are _calc_smc / _calc_classic_indicators results
+        computed elsewhere (SmcEngine); without them the fields are computed
+        from `context` on demand.
+        """
+        if smc is None:
+            smc = self._smc_getters(context)
+        else:
+            smc = {key: (lambda value=value: value) for key, value in smc.items()}
+        if classic is None:
+            classic = {name: (lambda get=get: get(context)) for name, get in _INDICATORS.items()}
+        else:
+            classic = {name: (lambda value=value: value) for name, value in classic.items()}
+        return {
+            "trend": smc["trend"],
+            "last_bos": smc["last_bos"],
+            "last_choch": smc["last_choch"],
+            "internal_last_bos": smc["internal_last_bos"],
+            "internal_last_choch": smc["internal_last_choch"],
+            "order_blocks": lambda: [ob for ob in smc["order_blocks"]() if not ob.mitigated],
+            "mitigated_order_blocks": lambda: sorted(
+                (ob for ob in smc["order_blocks"]() if ob.mitigated), key=lambda ob: ob.mitigated_index
+            )[-5:],
+            "fair_value_gaps": smc["fair_value_gaps"],
+            "premium_discount_pct": smc["premium_discount_pct"],
+            "premium_discount_zone": smc["premium_discount_zone"],
+            "equilibrium": smc["equilibrium"],
+            "range_high": smc["range_high"],
+            "range_low": smc["range_low"],
+            "buy_side_liquidity": smc["buy_side_liquidity"],
+            "sell_side_liquidity": smc["sell_side_liquidity"],
+            "liquidity_pools": lambda: smc_results.nearest(smc["liquidity_pools"](), float(frame.close[-1])),
+            "swing_highs": lambda: smc["swing_highs"]()[-10:],
+            "swing_lows": lambda: smc["swing_lows"]()[-10:],
+            "internal_highs": lambda: smc["internal_highs"]()[-10:],
+            "internal_lows": lambda: smc["internal_lows"]()[-10:],
+            "potential_entries": lambda: smc["potential_entries"]()[:5],
+            "candles": lambda: frame[-50:].to_dicts(),
+            **classic,
+            "structure_levels": lambda: self._structure_levels(context, config.SMC_STRUCTURE_SIZES),
+        }
 
-        last = -1
+    def _select(self, symbol: str, timeframe: str, frame: CandleFrame, getters: dict, fields: list[str] | None) -> dict:
+        """The payload of `fields` (all SMC_FIELDS by default); records become dicts only here, after truncation."""
+        names = SMC_FIELDS if fields is None else [
+            name for name in SMC_FIELDS + SMC_OPTIONAL_FIELDS if name in fields
+        ]
         return {
-            "atr": round(atr, 6),
-            "ema9": ema9[last],
-            "ema20": ema20[last],
-            "ema50": ema50[last],
-            "bb_upper": bb["upper"][last],
-            "bb_middle": bb["middle"][last],
-            "bb_lower": bb["lower"][last],
-            "rsi7": round(rsi7[last], 2) if rsi7[last] is not None else None,
-            "rsi14": round(rsi14[last], 2) if rsi14[last] is not None else None,
-            "rsi21": round(rsi21[last], 2) if rsi21[last] is not None else None,
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "current_price": float(frame.close[-1]),
+            **{name: plain(getters[name]()) for name in names},
         }
 
-    def smc_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
+    def _build_result(
+        self,
+        symbol: str,
+        timeframe: str,
+        frame: CandleFrame,
+        context: AnalysisContext | None = None,
+        fields: list[str] | None = None,
+    ) -> dict:
+        """smc_analysis result; with `fields`, only those (plus symbol/timeframe/current_price) are computed."""
+        getters = self._result_getters(frame, context or AnalysisContext(frame))
+        return self._select(symbol, timeframe, frame, getters, fields)
+
+    def _build_result_as_of(
+        self, symbol: str, timeframe: str, limit: int, fields: list[str] | None, as_of: int
+    ) -> dict:
+        """smc_analysis result for the bars up to the one open at `as_of` (ms), as it was then.
+
+        Served from an SmcEngine over the closed bars of the cached window,
+        kept with them until the window rolls, so forming-bar refreshes do
+        not rebuild it. Its checkpoints bound each lookup to a replay of at
+        most SMC_CHECKPOINT_INTERVAL bars. When `as_of` falls in the forming
+        bar, that bar is applied on top of the replay: the latest bar gives
+        the same result as smc_analysis without `as_of`.
+        """
+        engine, forming = candle_cache.derive_closed(
+            symbol, timeframe, limit, "smc_engine", lambda rows: SmcEngine.from_frame(CandleFrame.from_records(rows))
+        )
+        n = len(engine)
+        if as_of >= int(forming["timestamp"][0]):
+            past = engine.as_of(n - 1) if n else SmcEngine()
+            past.update(forming[0].tolist())
+        else:
+            bar = int(np.searchsorted(engine.frame().timestamp, as_of, side="right")) - 1
+            if bar < 0:
+                raise ValueError(f"as_of {as_of} is before the first of the {limit} bars")
+            past = engine.as_of(bar)
+        frame = past.frame()
+        getters = self._result_getters(frame, AnalysisContext(frame), past.snapshot(), past.indicators())
+        return self._select(symbol, timeframe, frame, getters, fields)
+
+    def smc_analysis(
+        self,
+        symbol: str,
+        timeframe: str = "1h",
+        limit: int = 200,
+        fields: list[str] | None = None,
+        as_of: int | None = None,
+    ) -> dict:
+        """Full SMC + indicator result, or only `fields` (see SMC_FIELDS, SMC_OPTIONAL_FIELDS) and what they depend on.
+
+        With `as_of` (a bar open time in ms), the result as of that bar of the `limit` latest bars.
+        """
+        if fields is not None:
+            unknown = [name for name in fields if name not in SMC_FIELDS + SMC_OPTIONAL_FIELDS]
+            if unknown:
+                return {"status": "error", "message": f"Unknown fields: {', '.join(unknown)}"}
         try:
-            candles = _candle_service.fetch_candles(symbol, timeframe, limit=limit)
-            smc = self._calc_smc(candles)
-            indicators = self._calc_classic_indicators(candles)
-            current_price = candles[-1]["close"]
-
-            result = {
-                "symbol": symbol,
-                "timeframe": timeframe,
-                "current_price": current_price,
-                "trend": smc["trend"],
-                "last_bos": smc["last_bos"],
-                "last_choch": smc["last_choch"],
-                "internal_last_bos": smc["internal_last_bos"],
-                "internal_last_choch": smc["internal_last_choch"],
-                "order_blocks": [ob for ob in smc["order_blocks"] if not ob["mitigated"]],
-                "fair_value_gaps": smc["fair_value_gaps"],
-                "premium_discount_pct": smc["premium_discount_pct"],
-                "premium_discount_zone": smc["premium_discount_zone"],
-                "equilibrium": smc["equilibrium"],
-                "range_high": smc["range_high"],
-                "range_low": smc["range_low"],
-                "buy_side_liquidity": smc["buy_side_liquidity"],
-                "sell_side_liquidity": smc["sell_side_liquidity"],
-                "swing_highs": smc["swing_highs"][-10:],
-                "swing_lows": smc["swing_lows"][-10:],
-                "internal_highs": smc["internal_highs"][-10:],
-                "internal_lows": smc["internal_lows"][-10:],
-                "potential_entries": smc["potential_entries"][:5],
-                "candles": candles[-50:],
-                **indicators,
-            }
+            if as_of is not None:
+                return {"result": self._build_result_as_of(symbol, timeframe, limit, fields, as_of)}
+            result = candle_cache.derive(
+                symbol, timeframe, limit, "smc" if fields is None else "smc:" + ",".join(sorted(set(fields))),
+                lambda context: self._build_result(symbol, timeframe, context.frame, context, fields),
+            )
             return {"result": result}
         except Exception as e:
             return {"status": "error", "message": str(e)}
+
+    def smc_analysis_multi(
+        self, symbol: str, timeframes: list[str], limit: int = 200, base_interval: str = "30m"
+    ) -> dict[str, dict]:
+        """SMC analysis for several timeframes, resampled from one base-interval fetch where that is cheaper.
+
+        Returns {timeframe: smc_analysis-shaped response}.
+        """
+        try:
+            by_tf = candle_source.fetch_resampled(symbol, timeframes, limit, base_interval)
+        except Exception as e:
+            return {tf: {"status": "error", "message": str(e)} for tf in timeframes}
+        results = {}
+        for tf in timeframes:
+            try:
+                results[tf] = {"result": self._build_result(symbol, tf, by_tf[tf])}
+            except Exception as e:
+                results[tf] = {"status": "error", "message": str(e)}
+        return results
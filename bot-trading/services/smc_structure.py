@@ -0,0 +1,193 @@
+import numpy as np
+
+from services import smc_kernels
+from services.analysis_records import StructureBreak, SwingPoint
+from services.range_index import RangeIndex
+
+
+class StructureTracker:
+    """BOS/CHoCH state machine over one pivot set (swing or internal structure).
+
+    Matches Pine Script displayStructure():
+    - Bullish break: close > active swing high → BOS if trend==bullish, CHoCH if trend==bearish
+    - Bearish break: close < active swing low → BOS if trend==bearish, CHoCH if trend==bullish
+
+    At bar i the active pivot is the latest one with index <= i. The batch
+    analysis runs it once over the whole series; the incremental engine keeps
+    `history` bars of saved state so that when a pivot is confirmed `size`
+    bars late, the bars since the pivot can be replayed with it.
+
+    `breaks` holds (bar_index, direction, pivot_index) for every break, in
+    the order they happened.
+    """
+
+    _INITIAL = (0, 0, None, None, False, False, "ranging", None, None)
+
+    def __init__(self, pivots_high: list[SwingPoint], pivots_low: list[SwingPoint], history: int = 0):
+        self.pivots_high = pivots_high
+        self.pivots_low = pivots_low
+        self.breaks: list[tuple[int, str, int]] = []
+        self._state = self._INITIAL
+        self._history = history
+        self._saved: dict[int, tuple] = {}
+
+    @property
+    def trend(self) -> str:
+        return self._state[6]
+
+    @property
+    def last_bos(self) -> StructureBreak | None:
+        return self._state[7]
+
+    @property
+    def last_choch(self) -> StructureBreak | None:
+        return self._state[8]
+
+    def advance(self, closes: list[float], start: int, stop: int):
+        """Process bars start..stop-1."""
+        sh_ptr, sl_ptr, current_sh, current_sl, sh_crossed, sl_crossed, trend, last_bos, last_choch = self._state
+        swing_highs, swing_lows = self.pivots_high, self.pivots_low
+        breaks = self.breaks
+        history, saved = self._history, self._saved
+
+        for i in range(start, stop):
+            close = closes[i]
+
+            # Advance to latest confirmed swing high/low up to bar i
+            while sh_ptr < len(swing_highs) and swing_highs[sh_ptr].index <= i:
+                current_sh = swing_highs[sh_ptr]
+                sh_crossed = False
+                sh_ptr += 1
+
+            while sl_ptr < len(swing_lows) and swing_lows[sl_ptr].index <= i:
+                current_sl = swing_lows[sl_ptr]
+                sl_crossed = False
+                sl_ptr += 1
+
+            # Bullish break: close crosses above swing high
+            if current_sh and not sh_crossed and close > current_sh.price:
+                tag = "CHoCH" if trend == "bearish" else "BOS"
+                event = StructureBreak(current_sh.price, "bullish", tag, i)
+                last_bos = event
+                if tag == "CHoCH":
+                    last_choch = event
+                trend = "bullish"
+                sh_crossed = True
+                breaks.append((i, "bullish", current_sh.index))
+
+            # Bearish break: close crosses below swing low
+            if current_sl and not sl_crossed and close < current_sl.price:
+                tag = "CHoCH" if trend == "bullish" else "BOS"
+                event = StructureBreak(current_sl.price, "bearish", tag, i)
+                last_bos = event
+                if tag == "CHoCH":
+                    last_choch = event
+                trend = "bearish"
+                sl_crossed = True
+                breaks.append((i, "bearish", current_sl.index))
+
+            if history:
+                saved[i] = (
+                    (sh_ptr, sl_ptr, current_sh, current_sl, sh_crossed, sl_crossed, trend, last_bos, last_choch),
+                    len(breaks),
+                )
+                saved.pop(i - history, None)
+
+        self._state = (sh_ptr, sl_ptr, current_sh, current_sl, sh_crossed, sl_crossed, trend, last_bos, last_choch)
+
+    def rewind(self, bar: int):
+        """Restore the state as it was right after `bar` (-1 = before the first bar)."""
+        state, n_breaks = self._saved[bar] if bar >= 0 else (self._INITIAL, 0)
+        self._state = state
+        del self.breaks[n_breaks:]
+        for i in [i for i in self._saved if i > bar]:
+            del self._saved[i]
+
+
+class StructureLevel:
+    """StructureTracker's end state for one pivot size, built from break events.
+
+    A pivot stays active from its own bar until the next pivot of the same
+    kind, and breaks at most once, so its break is the first close beyond it
+    in that window. With the closes' max/min RangeIndex those are found for
+    every pivot in one vectorized pass; only the breaks themselves are walked
+    in Python to assign BOS/CHoCH. With smc_kernels enabled the breaks come
+    from the compiled bar-by-bar state machine instead. Either way this gives
+    the same result as StructureTracker.advance() over every bar. Only the
+    last BOS and CHoCH become StructureBreak records.
+    """
+
+    __slots__ = ("size", "highs", "lows", "trend", "last_bos", "last_choch", "breaks")
+
+    def __init__(
+        self,
+        size: int,
+        highs: list[SwingPoint],
+        lows: list[SwingPoint],
+        close_max: RangeIndex,
+        close_min: RangeIndex,
+    ):
+        self.size = size
+        self.highs = highs
+        self.lows = lows
+        if smc_kernels.ENABLED:
+            events = self._compiled_events(highs, lows, close_max.values)
+        else:
+            events = self._events(highs, lows, close_max, close_min)
+
+        trend = "ranging"
+        last_bos = last_choch = -1  # positions in events
+        last_tag = "BOS"
+        for k, (_, _, direction, _) in enumerate(events):
+            opposite = "bearish" if direction == "bullish" else "bullish"
+            last_tag = "CHoCH" if trend == opposite else "BOS"
+            last_bos = k
+            if last_tag == "CHoCH":
+                last_choch = k
+            trend = direction
+        self.trend = trend
+        self.last_bos = self._break(events[last_bos], last_tag) if last_bos >= 0 else None
+        self.last_choch = self._break(events[last_choch], "CHoCH") if last_choch >= 0 else None
+        self.breaks = [(i, direction, pivot.index) for i, _, direction, pivot in events]
+
+    @staticmethod
+    def _break(event: tuple[int, int, str, SwingPoint], tag: str) -> StructureBreak:
+        i, _, direction, pivot = event
+        return StructureBreak(pivot.price, direction, tag, i)
+
+    @staticmethod
+    def _events(
+        highs: list[SwingPoint], lows: list[SwingPoint], close_max: RangeIndex, close_min: RangeIndex
+    ) -> list[tuple[int, int, str, SwingPoint]]:
+        """(bar, order, direction, pivot) per break, in the order StructureTracker meets them."""
+        n = len(close_max)
+        events = []
+        for pivots, index, direction, order in ((highs, close_max, "bullish", 0), (lows, close_min, "bearish", 1)):
+            if not pivots:
+                continue
+            starts = np.fromiter((p.index for p in pivots), np.int64, len(pivots))
+            stops = np.append(starts[1:], n)
+            prices = np.fromiter((p.price for p in pivots), np.float64, len(pivots))
+            bars = index.first_crossings(starts, stops, prices)
+            events += [(int(bars[k]), order, direction, pivots[k]) for k in np.flatnonzero(bars >= 0)]
+        # Same bar: the bullish check runs before the bearish one
+        events.sort(key=lambda e: (e[0], e[1]))
+        return events
+
+    @staticmethod
+    def _compiled_events(
+        highs: list[SwingPoint], lows: list[SwingPoint], closes: np.ndarray
+    ) -> list[tuple[int, int, str, SwingPoint]]:
+        """_events through smc_kernels.structure_breaks."""
+
+        def arrays(pivots: list[SwingPoint]) -> tuple[np.ndarray, np.ndarray]:
+            return (
+                np.fromiter((p.index for p in pivots), np.int64, len(pivots)),
+                np.fromiter((p.price for p in pivots), np.float64, len(pivots)),
+            )
+
+        bars, directions, positions = smc_kernels.structure_breaks(closes, *arrays(highs), *arrays(lows))
+        return [
+            (i, 0, "bullish", highs[k]) if direction == 1 else (i, 1, "bearish", lows[k])
+            for i, direction, k in zip(bars.tolist(), directions.tolist(), positions.tolist())
+        ]
@@ -1,56 +1,51 @@
-from services.candle_service import CandleService
+from services.analysis_context import AnalysisContext
+from services.analysis_records import WyckoffEvent
+from services.candle_cache import candle_cache
+from services.candle_frame import CandleFrame
 
-_candle_service = CandleService()
 
+class _Bars:
+    """Per-call Python-float columns: the Wyckoff passes index single bars, which
+    is much cheaper on lists than on numpy scalars."""
 
-class WyckoffService:
-    def _calc_atr(self, candles: list[dict], period: int = 14) -> float:
-        if len(candles) < period + 1:
-            return 0.0
-        trs = []
-        for i in range(1, len(candles)):
-            hl = candles[i]["high"] - candles[i]["low"]
-            hpc = abs(candles[i]["high"] - candles[i - 1]["close"])
-            lpc = abs(candles[i]["low"] - candles[i - 1]["close"])
-            trs.append(max(hl, hpc, lpc))
-        atr = sum(trs[:period]) / period
-        for i in range(period, len(trs)):
-            atr = (atr * (period - 1) + trs[i]) / period
-        return atr
+    __slots__ = ("open", "high", "low", "close", "volume", "vol_sma")
 
-    @staticmethod
-    def _vol_sma(vols: list[float], i: int, period: int = 20) -> float:
-        start = max(0, i - period + 1)
-        sl = vols[start : i + 1]
-        return sum(sl) / len(sl) if sl else 1.0
+    def __init__(self, frame: CandleFrame, vol_sma: list[float]):
+        self.open = frame.open.tolist()
+        self.high = frame.high.tolist()
+        self.low = frame.low.tolist()
+        self.close = frame.close.tolist()
+        self.volume = frame.volume.tolist()
+        self.vol_sma = vol_sma
 
+
+class WyckoffService:
     @staticmethod
-    def _spread(c: dict) -> float:
-        return c["high"] - c["low"]
+    def _spread(b: _Bars, i: int) -> float:
+        return b.high[i] - b.low[i]
 
     @staticmethod
-    def _close_ratio(c: dict) -> float:
-        s = c["high"] - c["low"]
-        return (c["close"] - c["low"]) / s if s > 0 else 0.5
+    def _close_ratio(b: _Bars, i: int) -> float:
+        s = b.high[i] - b.low[i]
+        return (b.close[i] - b.low[i]) / s if s > 0 else 0.5
 
     @staticmethod
-    def _is_bullish(c: dict) -> bool:
-        return c["close"] > c["open"]
+    def _is_bullish(b: _Bars, i: int) -> bool:
+        return b.close[i] > b.open[i]
 
     @staticmethod
-    def _is_bearish(c: dict) -> bool:
-        return c["close"] < c["open"]
+    def _is_bearish(b: _Bars, i: int) -> bool:
+        return b.close[i] < b.open[i]
 
-    def _detect_prior_trend(self, candles: list[dict], end_idx: int, lookback: int = 20) -> str:
+    def _detect_prior_trend(self, b: _Bars, end_idx: int, lookback: int = 20) -> str:
         start = max(0, end_idx - lookback)
-        segment = candles[start : end_idx + 1]
-        if len(segment) < 5:
+        lows = b.low[start : end_idx + 1]
+        highs = b.high[start : end_idx + 1]
+        if len(lows) < 5:
             return "none"
-        total = len(segment) - 1
+        total = len(lows) - 1
         if total == 0:
             return "none"
-        lows = [c["low"] for c in segment]
-        highs = [c["high"] for c in segment]
         down = sum(1 for i in range(1, len(lows)) if lows[i] < lows[i - 1])
         up = sum(1 for i in range(1, len(highs)) if highs[i] > highs[i - 1])
         if down / total >= 0.5:
@@ -71,72 +66,71 @@ class WyckoffService:
         }
 
     def _detect_climaxes(
-        self, candles: list[dict], vols: list[float], atr: float
-    ) -> tuple[list[dict], list[dict], list[dict]]:
+        self, b: _Bars, atr: float
+    ) -> tuple[list[WyckoffEvent], list[WyckoffEvent], list[WyckoffEvent]]:
         """Pass 1: detect Selling Climax (SC) and Buying Climax (BC) bars."""
-        events: list[dict] = []
-        sc_events: list[dict] = []
-        bc_events: list[dict] = []
-        n = len(candles)
+        events: list[WyckoffEvent] = []
+        sc_events: list[WyckoffEvent] = []
+        bc_events: list[WyckoffEvent] = []
+        n = len(b.volume)
 
         for i in range(1, n - 1):
-            vsma = self._vol_sma(vols, i)
-            c = candles[i]
-            s = self._spread(c)
-            cr = self._close_ratio(c)
-            vol_ratio = c["volume"] / vsma if vsma > 0 else 0
+            vsma = b.vol_sma[i]
+            s = self._spread(b, i)
+            cr = self._close_ratio(b, i)
+            vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
             spread_ratio = s / atr if atr > 0 else 0
 
             if (
-                self._is_bearish(c)
+                self._is_bearish(b, i)
                 and vol_ratio >= 1.8
                 and spread_ratio >= 1.5
                 and 0.05 < cr < 0.45
-                and candles[i + 1]["close"] > c["close"]
-                and self._detect_prior_trend(candles, i - 1) == "down"
+                and b.close[i + 1] > b.close[i]
+                and self._detect_prior_trend(b, i - 1) == "down"
             ):
                 quality = min(100, round(
                     (min(vol_ratio, 4) / 4) * 40 + (1 - cr) * 30 + min(spread_ratio, 3) / 3 * 30
                 ))
-                ev = {
-                    "event_type": "SC", "bar_index": i, "price": c["low"],
-                    "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                    "spread_ratio": round(spread_ratio, 2), "close_ratio": round(cr, 2),
-                    "quality_score": quality,
-                }
+                ev = WyckoffEvent(
+                    event_type="SC", bar_index=i, price=b.low[i],
+                    volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                    spread_ratio=round(spread_ratio, 2), close_ratio=round(cr, 2),
+                    quality_score=quality,
+                )
                 events.append(ev)
                 sc_events.append(ev)
 
             if (
-                self._is_bullish(c)
+                self._is_bullish(b, i)
                 and vol_ratio >= 1.8
                 and spread_ratio >= 1.5
                 and 0.55 < cr < 0.95
-                and candles[i + 1]["close"] < c["close"]
-                and self._detect_prior_trend(candles, i - 1) == "up"
+                and b.close[i + 1] < b.close[i]
+                and self._detect_prior_trend(b, i - 1) == "up"
             ):
                 quality = min(100, round(
                     (min(vol_ratio, 4) / 4) * 40 + cr * 30 + min(spread_ratio, 3) / 3 * 30
                 ))
-                ev = {
-                    "event_type": "BC", "bar_index": i, "price": c["high"],
-                    "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                    "spread_ratio": round(spread_ratio, 2), "close_ratio": round(cr, 2),
-                    "quality_score": quality,
-                }
+                ev = WyckoffEvent(
+                    event_type="BC", bar_index=i, price=b.high[i],
+                    volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                    spread_ratio=round(spread_ratio, 2), close_ratio=round(cr, 2),
+                    quality_score=quality,
+                )
                 events.append(ev)
                 bc_events.append(ev)
 
         return events, sc_events, bc_events
 
-    def calc_wyckoff(self, candles: list[dict], atr: float) -> dict:
+    def calc_wyckoff(self, frame: CandleFrame, atr: float, context: AnalysisContext | None = None) -> dict:
         """Wyckoff market cycle analysis: phase detection, key events, price targets."""
-        n = len(candles)
+        n = len(frame)
         if n < 50:
             return self._empty_result()
 
-        vols = [c["volume"] for c in candles]
-        events, sc_events, bc_events = self._detect_climaxes(candles, vols, atr)
+        b = _Bars(frame, (context or AnalysisContext(frame)).vol_sma(20))
+        events, sc_events, bc_events = self._detect_climaxes(b, atr)
 
         # Anchor on the most recent SC or BC
         recent_sc = sc_events[-1] if sc_events else None
@@ -145,14 +139,14 @@ class WyckoffService:
         analysis_type = None
         anchor_idx = -1
         if recent_sc and recent_bc:
-            if recent_sc["bar_index"] > recent_bc["bar_index"]:
-                analysis_type, anchor_idx = "accumulation", recent_sc["bar_index"]
+            if recent_sc.bar_index > recent_bc.bar_index:
+                analysis_type, anchor_idx = "accumulation", recent_sc.bar_index
             else:
-                analysis_type, anchor_idx = "distribution", recent_bc["bar_index"]
+                analysis_type, anchor_idx = "distribution", recent_bc.bar_index
         elif recent_sc:
-            analysis_type, anchor_idx = "accumulation", recent_sc["bar_index"]
+            analysis_type, anchor_idx = "accumulation", recent_sc.bar_index
         elif recent_bc:
-            analysis_type, anchor_idx = "distribution", recent_bc["bar_index"]
+            analysis_type, anchor_idx = "distribution", recent_bc.bar_index
 
         range_high = range_low = spring_low = spring_quality = utad_high = None
         lps_level = lpsy_level = None
@@ -166,89 +160,85 @@ class WyckoffService:
         # ── Accumulation branch ───────────────────────────────────────────────
         if analysis_type == "accumulation" and anchor_idx >= 0:
             sc_idx = anchor_idx
-            sc_price = candles[sc_idx]["low"]
+            sc_price = b.low[sc_idx]
             range_low = sc_price
 
             # AR (Automatic Rally)
             ar_idx = ar_high = None
             for i in range(sc_idx + 1, min(sc_idx + 8, n)):
-                c = candles[i]
-                vsma = self._vol_sma(vols, i)
-                if self._is_bullish(c) and c["volume"] >= vsma * 0.9 and self._close_ratio(c) > 0.5:
-                    if ar_high is None or c["high"] > ar_high:
-                        ar_high, ar_idx = c["high"], i
+                vsma = b.vol_sma[i]
+                if self._is_bullish(b, i) and b.volume[i] >= vsma * 0.9 and self._close_ratio(b, i) > 0.5:
+                    if ar_high is None or b.high[i] > ar_high:
+                        ar_high, ar_idx = b.high[i], i
 
             if ar_high is not None and ar_idx is not None:
                 range_high = ar_high
-                events.append({
-                    "event_type": "AR", "bar_index": ar_idx, "price": ar_high,
-                    "volume": candles[ar_idx]["volume"],
-                    "volume_ratio": round(candles[ar_idx]["volume"] / self._vol_sma(vols, ar_idx), 2),
-                    "spread_ratio": round(self._spread(candles[ar_idx]) / atr, 2) if atr > 0 else 0,
-                    "close_ratio": round(self._close_ratio(candles[ar_idx]), 2),
-                    "quality_score": 70,
-                })
+                events.append(WyckoffEvent(
+                    event_type="AR", bar_index=ar_idx, price=ar_high,
+                    volume=b.volume[ar_idx],
+                    volume_ratio=round(b.volume[ar_idx] / b.vol_sma[ar_idx], 2),
+                    spread_ratio=round(self._spread(b, ar_idx) / atr, 2) if atr > 0 else 0,
+                    close_ratio=round(self._close_ratio(b, ar_idx), 2),
+                    quality_score=70,
+                ))
                 phase, phase_confidence = "ACCUMULATION_A", 0.5
 
             # ST (Secondary Test)
             if ar_idx is not None:
                 for i in range(ar_idx + 1, min(ar_idx + 20, n)):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
+                    vsma = b.vol_sma[i]
                     if (
-                        abs(c["low"] - sc_price) / sc_price < 0.025
-                        and c["volume"] < vsma * 0.75
-                        and c["close"] > sc_price
-                        and self._spread(c) < atr
+                        abs(b.low[i] - sc_price) / sc_price < 0.025
+                        and b.volume[i] < vsma * 0.75
+                        and b.close[i] > sc_price
+                        and self._spread(b, i) < atr
                     ):
-                        events.append({
-                            "event_type": "ST", "bar_index": i, "price": c["low"],
-                            "volume": c["volume"], "volume_ratio": round(c["volume"] / vsma, 2),
-                            "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(self._close_ratio(c), 2),
-                            "quality_score": 65,
-                        })
+                        events.append(WyckoffEvent(
+                            event_type="ST", bar_index=i, price=b.low[i],
+                            volume=b.volume[i], volume_ratio=round(b.volume[i] / vsma, 2),
+                            spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(self._close_ratio(b, i), 2),
+                            quality_score=65,
+                        ))
                         phase, phase_confidence = "ACCUMULATION_B", 0.55
                         break
 
             # Phase B: volume asymmetry
             if ar_idx is not None and range_high is not None:
                 for i in range(ar_idx, min(n, ar_idx + 60)):
-                    c = candles[i]
-                    if self._is_bullish(c):
-                        phase_b_up_vol += c["volume"]
+                    if self._is_bullish(b, i):
+                        phase_b_up_vol += b.volume[i]
                     else:
-                        phase_b_down_vol += c["volume"]
+                        phase_b_down_vol += b.volume[i]
                 volume_asymmetry = phase_b_up_vol / phase_b_down_vol if phase_b_down_vol > 0 else 1.0
 
             # Spring (Phase C)
             if ar_idx is not None:
                 for i in range(ar_idx + 3, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    penetration = (sc_price - c["low"]) / sc_price if sc_price > 0 else 0
-                    if c["low"] < sc_price and penetration < 0.05:
+                    vsma = b.vol_sma[i]
+                    penetration = (sc_price - b.low[i]) / sc_price if sc_price > 0 else 0
+                    if b.low[i] < sc_price and penetration < 0.05:
                         recovery = False
                         recovery_bar = i
                         for j in range(i, min(i + 3, n)):
-                            if candles[j]["close"] > sc_price:
+                            if b.close[j] > sc_price:
                                 recovery, recovery_bar = True, j
                                 break
                         if recovery:
-                            vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                            cr = self._close_ratio(c)
+                            vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                            cr = self._close_ratio(b, i)
                             pen_score = max(0, 100 - (penetration / 0.05) * 50)
                             vol_score = max(0, 100 * (1 - vol_ratio)) if vol_ratio < 1 else 0
-                            rec_score = self._close_ratio(candles[recovery_bar]) * 100
+                            rec_score = self._close_ratio(b, recovery_bar) * 100
                             quality = round((pen_score + vol_score + rec_score) / 3)
-                            spring_low, spring_quality = c["low"], quality
-                            events.append({
-                                "event_type": "SPRING", "bar_index": i, "price": c["low"],
-                                "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                                "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                                "close_ratio": round(cr, 2),
-                                "quality_score": quality,
-                            })
+                            spring_low, spring_quality = b.low[i], quality
+                            events.append(WyckoffEvent(
+                                event_type="SPRING", bar_index=i, price=b.low[i],
+                                volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                                spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                                close_ratio=round(cr, 2),
+                                quality_score=quality,
+                            ))
                             phase, phase_confidence = "ACCUMULATION_C", 0.65
                             break
 
@@ -257,28 +247,27 @@ class WyckoffService:
             if ar_idx is not None and range_high is not None and range_low is not None:
                 range_mid = (range_high + range_low) / 2
                 for i in range(ar_idx + 1, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                    cr = self._close_ratio(c)
-                    s = self._spread(c)
+                    vsma = b.vol_sma[i]
+                    vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                    cr = self._close_ratio(b, i)
+                    s = self._spread(b, i)
                     if (
-                        self._is_bullish(c)
+                        self._is_bullish(b, i)
                         and vol_ratio >= 1.5
                         and s > atr * 1.2
                         and cr > 0.65
-                        and c["close"] > range_mid
+                        and b.close[i] > range_mid
                     ):
                         sos_idx = i
-                        events.append({
-                            "event_type": "SOS", "bar_index": i, "price": c["close"],
-                            "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                            "spread_ratio": round(s / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(cr, 2),
-                            "quality_score": min(100, round(
+                        events.append(WyckoffEvent(
+                            event_type="SOS", bar_index=i, price=b.close[i],
+                            volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                            spread_ratio=round(s / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(cr, 2),
+                            quality_score=min(100, round(
                                 vol_ratio * 30 + cr * 40 + min(s / atr, 2) / 2 * 30
                             )),
-                        })
+                        ))
                         if phase in ("ACCUMULATION_C", "ACCUMULATION_B", "ACCUMULATION_A"):
                             phase, phase_confidence = "ACCUMULATION_D", 0.75
                         break
@@ -286,28 +275,27 @@ class WyckoffService:
             # LPS (Last Point of Support)
             if sos_idx is not None and range_low is not None:
                 for i in range(sos_idx + 1, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                    cr = self._close_ratio(c)
+                    vsma = b.vol_sma[i]
+                    vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                    cr = self._close_ratio(b, i)
                     if (
-                        self._is_bearish(c)
+                        self._is_bearish(b, i)
                         and vol_ratio < 0.75
-                        and self._spread(c) < atr
-                        and c["close"] > range_low
+                        and self._spread(b, i) < atr
+                        and b.close[i] > range_low
                         and cr > 0.4
                     ):
-                        lps_level = c["close"]
-                        events.append({
-                            "event_type": "LPS", "bar_index": i, "price": c["close"],
-                            "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                            "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(cr, 2),
-                            "quality_score": min(100, round((1 - vol_ratio) * 50 + cr * 50)),
-                        })
+                        lps_level = b.close[i]
+                        events.append(WyckoffEvent(
+                            event_type="LPS", bar_index=i, price=b.close[i],
+                            volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                            spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(cr, 2),
+                            quality_score=min(100, round((1 - vol_ratio) * 50 + cr * 50)),
+                        ))
                         break
 
-            if range_high is not None and candles[-1]["close"] > range_high:
+            if range_high is not None and b.close[-1] > range_high:
                 phase, phase_confidence = "ACCUMULATION_E", 0.85
 
             wyckoff_bias = "bullish"
@@ -319,86 +307,82 @@ class WyckoffService:
         # ── Distribution branch ───────────────────────────────────────────────
         elif analysis_type == "distribution" and anchor_idx >= 0:
             bc_idx = anchor_idx
-            bc_price = candles[bc_idx]["high"]
+            bc_price = b.high[bc_idx]
             range_high = bc_price
 
             # AR (Automatic Reaction)
             ar_idx = ar_low = None
             for i in range(bc_idx + 1, min(bc_idx + 8, n)):
-                c = candles[i]
-                vsma = self._vol_sma(vols, i)
-                if self._is_bearish(c) and c["volume"] >= vsma * 0.9 and self._close_ratio(c) < 0.5:
-                    if ar_low is None or c["low"] < ar_low:
-                        ar_low, ar_idx = c["low"], i
+                vsma = b.vol_sma[i]
+                if self._is_bearish(b, i) and b.volume[i] >= vsma * 0.9 and self._close_ratio(b, i) < 0.5:
+                    if ar_low is None or b.low[i] < ar_low:
+                        ar_low, ar_idx = b.low[i], i
 
             if ar_low is not None and ar_idx is not None:
                 range_low = ar_low
-                events.append({
-                    "event_type": "AR", "bar_index": ar_idx, "price": ar_low,
-                    "volume": candles[ar_idx]["volume"],
-                    "volume_ratio": round(candles[ar_idx]["volume"] / self._vol_sma(vols, ar_idx), 2),
-                    "spread_ratio": round(self._spread(candles[ar_idx]) / atr, 2) if atr > 0 else 0,
-                    "close_ratio": round(self._close_ratio(candles[ar_idx]), 2),
-                    "quality_score": 70,
-                })
+                events.append(WyckoffEvent(
+                    event_type="AR", bar_index=ar_idx, price=ar_low,
+                    volume=b.volume[ar_idx],
+                    volume_ratio=round(b.volume[ar_idx] / b.vol_sma[ar_idx], 2),
+                    spread_ratio=round(self._spread(b, ar_idx) / atr, 2) if atr > 0 else 0,
+                    close_ratio=round(self._close_ratio(b, ar_idx), 2),
+                    quality_score=70,
+                ))
                 phase, phase_confidence = "DISTRIBUTION_A", 0.5
 
             # ST (Secondary Test)
             if ar_idx is not None:
                 for i in range(ar_idx + 1, min(ar_idx + 20, n)):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
+                    vsma = b.vol_sma[i]
                     if (
-                        abs(c["high"] - bc_price) / bc_price < 0.025
-                        and c["volume"] < vsma * 0.75
-                        and c["close"] < bc_price
-                        and self._spread(c) < atr
+                        abs(b.high[i] - bc_price) / bc_price < 0.025
+                        and b.volume[i] < vsma * 0.75
+                        and b.close[i] < bc_price
+                        and self._spread(b, i) < atr
                     ):
-                        events.append({
-                            "event_type": "ST", "bar_index": i, "price": c["high"],
-                            "volume": c["volume"], "volume_ratio": round(c["volume"] / vsma, 2),
-                            "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(self._close_ratio(c), 2),
-                            "quality_score": 65,
-                        })
+                        events.append(WyckoffEvent(
+                            event_type="ST", bar_index=i, price=b.high[i],
+                            volume=b.volume[i], volume_ratio=round(b.volume[i] / vsma, 2),
+                            spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(self._close_ratio(b, i), 2),
+                            quality_score=65,
+                        ))
                         phase, phase_confidence = "DISTRIBUTION_B", 0.55
                         break
 
             # Phase B: volume asymmetry
             if ar_idx is not None and range_low is not None:
                 for i in range(ar_idx, min(n, ar_idx + 60)):
-                    c = candles[i]
-                    if self._is_bullish(c):
-                        phase_b_up_vol += c["volume"]
+                    if self._is_bullish(b, i):
+                        phase_b_up_vol += b.volume[i]
                     else:
-                        phase_b_down_vol += c["volume"]
+                        phase_b_down_vol += b.volume[i]
                 volume_asymmetry = phase_b_down_vol / phase_b_up_vol if phase_b_up_vol > 0 else 1.0
 
             # UTAD (Phase C)
             if ar_idx is not None and range_high is not None:
                 for i in range(ar_idx + 3, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    if c["high"] > range_high:
-                        penetration = (c["high"] - range_high) / range_high
+                    vsma = b.vol_sma[i]
+                    if b.high[i] > range_high:
+                        penetration = (b.high[i] - range_high) / range_high
                         if penetration < 0.05:
                             recovery = any(
-                                candles[j]["close"] < range_high
+                                b.close[j] < range_high
                                 for j in range(i, min(i + 3, n))
                             )
                             if recovery:
-                                vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                                cr = self._close_ratio(c)
-                                utad_high = c["high"]
-                                events.append({
-                                    "event_type": "UTAD", "bar_index": i, "price": c["high"],
-                                    "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                                    "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                                    "close_ratio": round(cr, 2),
-                                    "quality_score": min(100, round(
-                                        (1 - cr) * 60 + min(self._spread(c) / atr, 2) / 2 * 40
+                                vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                                cr = self._close_ratio(b, i)
+                                utad_high = b.high[i]
+                                events.append(WyckoffEvent(
+                                    event_type="UTAD", bar_index=i, price=b.high[i],
+                                    volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                                    spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                                    close_ratio=round(cr, 2),
+                                    quality_score=min(100, round(
+                                        (1 - cr) * 60 + min(self._spread(b, i) / atr, 2) / 2 * 40
                                     )),
-                                })
+                                ))
                                 phase, phase_confidence = "DISTRIBUTION_C", 0.65
                                 break
 
@@ -407,28 +391,27 @@ class WyckoffService:
             if ar_idx is not None and range_high is not None and range_low is not None:
                 range_mid = (range_high + range_low) / 2
                 for i in range(ar_idx + 1, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                    cr = self._close_ratio(c)
-                    s = self._spread(c)
+                    vsma = b.vol_sma[i]
+                    vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                    cr = self._close_ratio(b, i)
+                    s = self._spread(b, i)
                     if (
-                        self._is_bearish(c)
+                        self._is_bearish(b, i)
                         and vol_ratio >= 1.5
                         and s > atr * 1.2
                         and cr < 0.35
-                        and c["close"] < range_mid
+                        and b.close[i] < range_mid
                     ):
                         sow_idx = i
-                        events.append({
-                            "event_type": "SOW", "bar_index": i, "price": c["close"],
-                            "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                            "spread_ratio": round(s / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(cr, 2),
-                            "quality_score": min(100, round(
+                        events.append(WyckoffEvent(
+                            event_type="SOW", bar_index=i, price=b.close[i],
+                            volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                            spread_ratio=round(s / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(cr, 2),
+                            quality_score=min(100, round(
                                 vol_ratio * 30 + (1 - cr) * 40 + min(s / atr, 2) / 2 * 30
                             )),
-                        })
+                        ))
                         if phase in ("DISTRIBUTION_C", "DISTRIBUTION_B", "DISTRIBUTION_A"):
                             phase, phase_confidence = "DISTRIBUTION_D", 0.75
                         break
@@ -436,28 +419,27 @@ class WyckoffService:
             # LPSY (Last Point of Supply)
             if sow_idx is not None and range_high is not None:
                 for i in range(sow_idx + 1, n):
-                    c = candles[i]
-                    vsma = self._vol_sma(vols, i)
-                    vol_ratio = c["volume"] / vsma if vsma > 0 else 0
-                    cr = self._close_ratio(c)
+                    vsma = b.vol_sma[i]
+                    vol_ratio = b.volume[i] / vsma if vsma > 0 else 0
+                    cr = self._close_ratio(b, i)
                     if (
-                        self._is_bullish(c)
+                        self._is_bullish(b, i)
                         and vol_ratio < 0.75
-                        and self._spread(c) < atr
-                        and c["close"] < range_high
+                        and self._spread(b, i) < atr
+                        and b.close[i] < range_high
                         and cr < 0.6
                     ):
-                        lpsy_level = c["close"]
-                        events.append({
-                            "event_type": "LPSY", "bar_index": i, "price": c["close"],
-                            "volume": c["volume"], "volume_ratio": round(vol_ratio, 2),
-                            "spread_ratio": round(self._spread(c) / atr, 2) if atr > 0 else 0,
-                            "close_ratio": round(cr, 2),
-                            "quality_score": min(100, round((1 - vol_ratio) * 50 + (1 - cr) * 50)),
-                        })
+                        lpsy_level = b.close[i]
+                        events.append(WyckoffEvent(
+                            event_type="LPSY", bar_index=i, price=b.close[i],
+                            volume=b.volume[i], volume_ratio=round(vol_ratio, 2),
+                            spread_ratio=round(self._spread(b, i) / atr, 2) if atr > 0 else 0,
+                            close_ratio=round(cr, 2),
+                            quality_score=min(100, round((1 - vol_ratio) * 50 + (1 - cr) * 50)),
+                        ))
                         break
 
-            if range_low is not None and candles[-1]["close"] < range_low:
+            if range_low is not None and b.close[-1] < range_low:
                 phase, phase_confidence = "DISTRIBUTION_E", 0.85
 
             wyckoff_bias = "bearish"
@@ -484,7 +466,7 @@ class WyckoffService:
         return {
             "phase": phase,
             "phase_confidence": round(phase_confidence, 2),
-            "events": sorted(events, key=lambda e: e["bar_index"], reverse=True)[:10],
+            "events": [e.to_dict() for e in sorted(events, key=lambda e: e.bar_index, reverse=True)[:10]],
             "range_high": range_high,
             "range_low": range_low,
             "range_midpoint": (
@@ -499,7 +481,7 @@ class WyckoffService:
             "target_minimum": target_min,
             "target_moderate": target_mod,
             "target_maximum": target_max,
-            "vol_sma20": round(self._vol_sma(vols, n - 1), 2),
+            "vol_sma20": round(b.vol_sma[n - 1], 2),
             "phase_b_up_vol": round(phase_b_up_vol, 2),
             "phase_b_down_vol": round(phase_b_down_vol, 2),
             "volume_asymmetry": round(volume_asymmetry, 3),
@@ -508,11 +490,16 @@ class WyckoffService:
             "smc_score_bonus": smc_bonus,
         }
 
+    def _calc(self, frame: CandleFrame, context: AnalysisContext | None = None) -> dict:
+        context = context or AnalysisContext(frame)
+        return self.calc_wyckoff(frame, context.atr(14), context)
+
     def wyckoff_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
         try:
-            candles = _candle_service.fetch_candles(symbol, timeframe, limit=limit)
-            atr = self._calc_atr(candles, 14)
-            wyckoff = self.calc_wyckoff(candles, atr)
+            wyckoff = candle_cache.derive(
+                symbol, timeframe, limit, "wyckoff",
+                lambda context: self._calc(context.frame, context),
+            )
             return {"result": {"symbol": symbol, "timeframe": timeframe, **wyckoff}}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -0,0 +1,78 @@
+"""Local stand-in for Binance's combined kline stream (wss://fstream.binance.com/stream).
+
+Speaks just enough of the protocol for MarketStream: SUBSCRIBE / UNSUBSCRIBE
+requests with ids, and {"stream": ..., "data": {"e": "kline", ...}} pushes.
+"""
+
+import json
+
+from aiohttp import WSMsgType, web
+
+
+class LocalKlineServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.url = None
+        self.subscriptions: set[str] = set()
+        self._sockets: set[web.WebSocketResponse] = set()
+        self._runner: web.AppRunner | None = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/stream", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{self.host}:{port}"
+
+    async def stop(self):
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def drop_connections(self):
+        for ws in list(self._sockets):
+            await ws.close()
+        self.subscriptions.clear()
+
+    async def push_kline(
+        self, symbol: str, interval: str, open_time: int,
+        o: float, h: float, l: float, c: float, v: float, closed: bool = False,
+    ):
+        stream = f"{symbol.lower()}@kline_{interval}"
+        if stream not in self.subscriptions:
+            return
+        payload = {
+            "stream": stream,
+            "data": {
+                "e": "kline", "s": symbol.upper(),
+                "k": {
+                    "t": open_time, "s": symbol.upper(), "i": interval,
+                    "o": str(o), "h": str(h), "l": str(l), "c": str(c), "v": str(v),
+                    "x": closed,
+                },
+            },
+        }
+        for ws in list(self._sockets):
+            await ws.send_str(json.dumps(payload))
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                if req.get("method") == "SUBSCRIBE":
+                    self.subscriptions.update(req["params"])
+                elif req.get("method") == "UNSUBSCRIBE":
+                    self.subscriptions.difference_update(req["params"])
+                await ws.send_str(json.dumps({"result": None, "id": req.get("id")}))
+        finally:
+            self._sockets.discard(ws)
+        return ws
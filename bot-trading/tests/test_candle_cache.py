@@ -0,0 +1,116 @@
+# Run: cd bot-trading && python tests/test_candle_cache.py
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from services.candle_cache import CandleCache
+from services.candle_frame import CandleFrame
+from services.kline_store import KLINE_DTYPE
+
+STEP = 60_000
+START = 1_700_000_000_000 // STEP * STEP
+
+
+class _LiveSource:
+    """Minute bars up to the one forming at `now`; records every requested limit."""
+
+    live = True
+
+    def __init__(self):
+        self.now = START + STEP // 2
+        self.forming_close = None
+        self.calls: list[tuple[str, int]] = []
+
+    def fetch_rows(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> np.ndarray:
+        self.calls.append((symbol, limit))
+        rows = np.zeros(limit, dtype=KLINE_DTYPE)
+        rows["timestamp"] = self.now // STEP * STEP - np.arange(limit)[::-1] * STEP
+        rows["open"] = rows["high"] = rows["low"] = rows["close"] = rows["timestamp"] // STEP % 1000
+        if self.forming_close is not None:
+            rows["close"][-1] = self.forming_close
+        return rows
+
+    def fetch_frame(self, symbol: str, timeframe: str, limit: int = 300, end_time: int | None = None) -> CandleFrame:
+        return CandleFrame.from_records(self.fetch_rows(symbol, timeframe, limit, end_time))
+
+
+def main():
+    source = _LiveSource()
+    cache = CandleCache(max_entries=2, forming_ttl=0.2, source=source, clock=lambda: source.now)
+    computed = []
+
+    def closes(context) -> list[float]:
+        computed.append(1)
+        return context.frame.close.tolist()
+
+    frame = cache.get_frame("BTCUSDT", "1m", 50)
+    assert len(frame) == 50 and source.calls == [("BTCUSDT", 50)]
+    assert cache.derive("BTCUSDT", "1m", 50, "closes", closes) == frame.close.tolist()
+    assert cache.derive("BTCUSDT", "1m", 50, "closes", closes) == frame.close.tolist()
+    assert len(computed) == 1 and len(source.calls) == 1
+    print("miss, then hits within the forming TTL: OK")
+
+    # Past the TTL only the forming bar is fetched; unchanged, derived results are kept.
+    time.sleep(0.25)
+    cache.derive("BTCUSDT", "1m", 50, "closes", closes)
+    assert source.calls[-1] == ("BTCUSDT", 1) and len(computed) == 1
+    time.sleep(0.25)
+    source.forming_close = 123.0
+    got = cache.derive("BTCUSDT", "1m", 50, "closes", closes)
+    assert source.calls[-1] == ("BTCUSDT", 1) and len(computed) == 2
+    assert got[-1] == 123.0 and got[:-1] == frame.close.tolist()[:-1]
+    print("forming-bar refresh reuses derive() until the bar changes: OK")
+
+    closed_calls = []
+
+    def closed_count(rows: np.ndarray) -> int:
+        closed_calls.append(1)
+        return len(rows)
+
+    closed, forming = cache.derive_closed("BTCUSDT", "1m", 50, "closed", closed_count)
+    assert (closed, forming["close"][0]) == (49, 123.0)
+    time.sleep(0.25)
+    source.forming_close = 124.0
+    closed, forming = cache.derive_closed("BTCUSDT", "1m", 50, "closed", closed_count)
+    assert forming["close"][0] == 124.0 and len(closed_calls) == 1
+    print("derive_closed() survives forming-bar changes: OK")
+
+    # Two bars close: the roll fetches those two and the new forming bar, not the window.
+    source.now += 2 * STEP
+    source.forming_close = None
+    frame = cache.get_frame("BTCUSDT", "1m", 50)
+    assert source.calls[-1] == ("BTCUSDT", 3)
+    assert len(frame) == 50 and frame.timestamp[-1] == source.now // STEP * STEP
+    assert np.array_equal(frame.close, source.fetch_frame("BTCUSDT", "1m", 50).close)
+    cache.derive_closed("BTCUSDT", "1m", 50, "closed", closed_count)
+    assert len(closed_calls) == 2
+    # A window that closed entirely is reloaded in full.
+    source.now += 60 * STEP
+    cache.get_frame("BTCUSDT", "1m", 50)
+    assert source.calls[-1] == ("BTCUSDT", 50)
+    print("roll fetches elapsed + 1 bars: OK")
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["rolls"], stats["forming_refreshes"]) == (2, 1, 3), stats
+
+    cache.get_frame("ETHUSDT", "1m", 50)
+    cache.get_frame("BTCUSDT", "1m", 50)
+    cache.get_frame("SOLUSDT", "1m", 50)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+    calls = len(source.calls)
+    cache.get_frame("BTCUSDT", "1m", 50)
+    assert len(source.calls) == calls
+    cache.get_frame("ETHUSDT", "1m", 50)
+    assert source.calls[-1] == ("ETHUSDT", 50)
+    print("LRU eviction: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
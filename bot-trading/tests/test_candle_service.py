@@ -0,0 +1,113 @@
+# Run: cd bot-trading && python tests/test_candle_service.py
+
+import sys
+import os
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = tempfile.mkdtemp()
+os.environ["KLINE_STORE_ENABLED"] = "true"
+os.environ["KLINE_STORE_DIR"] = ROOT
+
+import httpx
+import numpy as np
+
+from services import http_client
+from services.candle_service import CandleService
+from services.intervals import now_ms
+from services.kline_store import KlineStore, find_gaps
+
+STEP = 60_000
+
+
+class _Exchange:
+    """Klines endpoint stub: minute bars up to now, minus an outage, with one short page."""
+
+    def __init__(self, start: int):
+        self.start = start
+        self.outage = {start + i * STEP for i in range(3900, 3905)}
+        self.short_page = start + 1500 * STEP  # answered 10 bars short the first time
+        self.requests: list[dict] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.requests.append(params)
+        last = now_ms() // STEP * STEP
+        end = min(int(params.get("endTime", last)), last)
+        limit = int(params["limit"])
+        if "startTime" in params:
+            first = -(-int(params["startTime"]) // STEP) * STEP
+            ts = list(range(first, end + 1, STEP))[:limit]
+        else:
+            ts = list(range(end - (limit - 1) * STEP, end + 1, STEP))
+        if int(params.get("startTime", -1)) == self.short_page:
+            self.short_page = None
+            ts = ts[:-10]
+        return httpx.Response(200, json=[self._kline(t) for t in ts if t not in self.outage])
+
+    @staticmethod
+    def _kline(ts: int) -> list:
+        price = ts // STEP % 1000 + 0.5
+        return [ts, str(price), str(price + 1), str(price - 1), str(price), "10.0", ts + STEP - 1]
+
+
+def _check_resample_plan():
+    service = CandleService()
+    # One 30m fetch of 200 bars for 4h needs 1600 base bars (two weight-10
+    # pages), more than the direct 4h and 2h calls (weight 2 each) cost.
+    assert service._resample_plan(["4h", "2h", "30m"], 200, "30m") == ("30m", ["30m"])
+    assert service._resample_plan(["4h", "2h", "30m"], 50, "30m") == ("30m", ["30m", "2h", "4h"])
+    # Without a 30m timeframe the coarsest common base is used.
+    assert service._resample_plan(["4h", "2h"], 100, "30m") == ("2h", ["2h", "4h"])
+    print("resample plan by request weight: OK")
+
+
+def _check_backfill(symbol: str, fetch_range) -> tuple[_Exchange, np.ndarray]:
+    start = (now_ms() // STEP - 3999) * STEP
+    exchange = _Exchange(start)
+    http_client._client = httpx.Client(base_url="https://stub", transport=httpx.MockTransport(exchange))
+    http_client._async_client = httpx.AsyncClient(base_url="https://stub", transport=httpx.MockTransport(exchange))
+
+    rows = fetch_range(symbol, "1m", start)
+    ts = rows["timestamp"]
+    assert ts[0] == start and len(ts) == (ts[-1] - start) // STEP + 1 - 5
+    assert find_gaps(ts, STEP) == [(start + 3900 * STEP, 5)]
+    # Three pages, then the short page's missing bars and the outage are each re-requested once.
+    starts = [int(params["startTime"]) for params in exchange.requests]
+    assert sorted(starts[:3]) == [start, start + 1500 * STEP, start + 3000 * STEP], starts
+    assert sorted(starts[3:]) == [start + 2990 * STEP, start + 3900 * STEP], starts
+    assert all(int(params["limit"]) == CandleService.MAX_LIMIT for params in exchange.requests)
+
+    # The store keeps one contiguous run: only the bars after the outage.
+    stored = KlineStore(ROOT).read(symbol, "1m")
+    assert stored["timestamp"][0] == start + 3905 * STEP
+    assert np.array_equal(stored, rows[np.searchsorted(ts, start + 3905 * STEP):])
+    return exchange, rows
+
+
+def main():
+    _check_resample_plan()
+
+    service = CandleService()
+    exchange, rows = _check_backfill("BTCUSDT", service.fetch_range)
+    print("paged backfill: pages merged, holes refetched, outage reported: OK")
+
+    # A later fetch resumes from the stored tail instead of refetching the window.
+    last_ts = KlineStore(ROOT).last_timestamp("BTCUSDT", "1m")
+    got = service.fetch_rows("BTCUSDT", "1m", 50)
+    params = exchange.requests[-1]
+    assert int(params["startTime"]) == last_ts and int(params["limit"]) <= 3, params
+    assert len(got) == 50 and find_gaps(got["timestamp"], STEP) == []
+    assert got["timestamp"][-1] >= rows["timestamp"][-1]
+    print("store tail resume: OK")
+
+    _check_backfill("ETHUSDT", lambda *args: asyncio.run(service.fetch_range_async(*args)))
+    print("paged backfill (async): OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Run: cd bot-trading && python tests/test_file_candle_source.py
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = tempfile.mkdtemp()
+os.environ["CANDLE_SOURCE"] = "file"
+os.environ["CANDLE_SOURCE_DIR"] = ROOT
+
+import numpy as np
+
+from services.candle_source import FileCandleSource
+from services.kline_store import KLINE_DTYPE
+from services.resampler import resample
+
+STEP = 3_600_000
+START = 1_700_000_000_000 // 86_400_000 * 86_400_000
+
+
+def _bars(count: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + np.arange(count) * STEP
+    rows["close"] = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows["open"] = np.r_[rows["close"][0], rows["close"][:-1]]
+    rows["high"] = np.maximum(rows["open"], rows["close"]) + rng.random(count)
+    rows["low"] = np.minimum(rows["open"], rows["close"]) - rng.random(count)
+    rows["volume"] = rng.random(count) * 1000
+    return rows
+
+
+def main():
+    rows = _bars(500)
+    np.save(os.path.join(ROOT, "BTCUSDT_1h.npy"), rows)
+    rows.tofile(os.path.join(ROOT, "ETHUSDT_1h.bin"))
+    with open(os.path.join(ROOT, "SOLUSDT_1h.csv"), "w") as f:
+        f.write("open_time,open,high,low,close,volume,close_time\n")
+        for ts, o, h, lo, c, v in rows.tolist():
+            f.write(f"{ts * 1000},{o!r},{h!r},{lo!r},{c!r},{v!r},0\n")
+
+    source = FileCandleSource(ROOT)
+    for symbol in ("BTCUSDT", "ETHUSDT", "SOLUSDT"):
+        got = source.fetch_rows(symbol, "1h", 200)
+        assert np.array_equal(got, rows[-200:]), symbol
+    print("npy / bin / csv (microsecond open times): OK")
+
+    end_time = int(rows["timestamp"][299])
+    got = source.fetch_rows("BTCUSDT", "1h", 100, end_time=end_time)
+    assert got["timestamp"][-1] == end_time and len(got) == 100
+    print("end_time: OK")
+
+    got = source.fetch_rows("BTCUSDT", "4h", 50)
+    assert np.array_equal(got, resample(rows, "1h", "4h")[-50:])
+    print("4h resampled from 1h file: OK")
+
+    try:
+        source.fetch_rows("XRPUSDT", "1h", 10)
+        raise AssertionError("missing file should raise")
+    except FileNotFoundError:
+        pass
+
+    from services.smc_service import SmcService
+    from services.wyckoff_service import WyckoffService
+
+    smc = SmcService().smc_analysis("BTCUSDT", "1h", 200)
+    assert "result" in smc, smc
+    assert smc["result"]["current_price"] == rows["close"][-1]
+    wyckoff = WyckoffService().wyckoff_analysis("SOLUSDT", "1h", 200)
+    assert "result" in wyckoff, wyckoff
+    print("SMC / Wyckoff on the file source: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Run: cd bot-trading && python tests/test_indicator_scan.py
+
+import sys
+import os
+import math
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = tempfile.mkdtemp()
+os.environ["CANDLE_SOURCE"] = "file"
+os.environ["CANDLE_SOURCE_DIR"] = ROOT
+
+import numpy as np
+
+from services.candle_frame import CandleFrame
+from services.indicator_scan import IndicatorScanService
+from services.kline_store import KLINE_DTYPE
+from services.smc_service import SmcService
+
+STEP = 3_600_000
+START = 1_700_000_000_000 // 86_400_000 * 86_400_000
+
+
+def _bars(count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + np.arange(count) * STEP
+    rows["close"] = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows["open"] = np.r_[rows["close"][0], rows["close"][:-1]]
+    rows["high"] = np.maximum(rows["open"], rows["close"]) + rng.random(count)
+    rows["low"] = np.minimum(rows["open"], rows["close"]) - rng.random(count)
+    rows["volume"] = rng.random(count) * 1000
+    return rows
+
+
+def main():
+    # Ragged histories: ADAUSDT has fewer bars than the requested limit, XRPUSDT has none.
+    histories = {"BTCUSDT": _bars(500, 7), "ETHUSDT": _bars(200, 8), "ADAUSDT": _bars(40, 9)}
+    for symbol, rows in histories.items():
+        np.save(os.path.join(ROOT, f"{symbol}_1h.npy"), rows)
+
+    scan = IndicatorScanService().scan(["BTCUSDT", "ETHUSDT", "ADAUSDT", "XRPUSDT"], "1h", 200)
+    assert list(scan) == ["BTCUSDT", "ETHUSDT", "ADAUSDT", "XRPUSDT"]
+    assert scan["XRPUSDT"]["status"] == "error"
+    assert scan["ADAUSDT"]["result"]["bars"] == 40
+    for symbol, rows in histories.items():
+        expected = SmcService()._calc_classic_indicators(CandleFrame.from_records(rows[-200:]))
+        got = scan[symbol]["result"]
+        assert got["current_price"] == rows["close"][-1]
+        for name, value in expected.items():
+            assert (value is None) == (got[name] is None), (symbol, name)
+            assert value is None or math.isclose(value, got[name], rel_tol=1e-9, abs_tol=1e-9), (symbol, name)
+    print("ragged batch scan == per-symbol indicators: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Run: cd bot-trading && python tests/test_kline_archive.py
+
+import sys
+import os
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from services.kline_archive import import_archives, parse_archive_name
+from services.kline_store import KLINE_DTYPE, KlineStore
+
+STEP = 3_600_000
+START = 1_704_067_200_000  # 2024-01-01T00:00Z
+
+
+def _bars(count: int) -> np.ndarray:
+    rng = np.random.default_rng(11)
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + np.arange(count) * STEP
+    rows["close"] = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows["open"] = np.r_[rows["close"][0], rows["close"][:-1]]
+    rows["high"] = np.maximum(rows["open"], rows["close"]) + rng.random(count)
+    rows["low"] = np.minimum(rows["open"], rows["close"]) - rng.random(count)
+    rows["volume"] = rng.random(count) * 1000
+    return rows
+
+
+def _write_archive(path: str, rows: np.ndarray, header: bool, ts_scale: int = 1):
+    lines = ["open_time,open,high,low,close,volume,close_time\n"] if header else []
+    lines += [f"{ts * ts_scale},{o!r},{h!r},{lo!r},{c!r},{v!r},0\n" for ts, o, h, lo, c, v in rows.tolist()]
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(os.path.basename(path).replace(".zip", ".csv"), "".join(lines))
+
+
+def main():
+    root = tempfile.mkdtemp()
+    archives = os.path.join(root, "klines")
+    os.makedirs(archives)
+    rows = _bars(200)
+
+    # Two overlapping monthly archives: bars 0..99 (with a header row) and
+    # 80..199 in microseconds, missing bars 150..152 (an exchange outage).
+    _write_archive(os.path.join(archives, "BTCUSDT-1h-2024-01.zip"), rows[:100], header=True)
+    second = np.concatenate([rows[80:150], rows[153:]])
+    _write_archive(os.path.join(archives, "BTCUSDT-1h-2024-02.zip"), second, header=False, ts_scale=1000)
+    with open(os.path.join(archives, "README.txt"), "w") as f:
+        f.write("not an archive\n")
+
+    assert parse_archive_name("BTCUSDT-1h-2024-02-01.zip") == ("BTCUSDT", "1h", "2024-02-01")
+    assert parse_archive_name("README.txt") is None
+
+    store = KlineStore(os.path.join(root, "store"))
+    (report,) = import_archives([archives], store, workers=2)
+    assert report["status"] == "written", report
+    assert report["files"] == 2
+    assert report["rows"] == 197
+    assert report["duplicates"] == 20
+    assert report["gaps"] == [(int(rows["timestamp"][150]), 3)], report["gaps"]
+    assert report["first"] == START and report["last"] == int(rows["timestamp"][-1])
+    # The store keeps one contiguous run: only the bars after the gap are written.
+    assert report["stored"] == 47 and report["message"] == "150 bars before the last gap were not stored"
+    stored = store.read("BTCUSDT", "1h")
+    assert np.array_equal(stored["timestamp"], rows["timestamp"][153:])
+    for field in ("open", "high", "low", "close", "volume"):
+        assert np.allclose(stored[field], rows[field][153:], rtol=1e-12, atol=0), field
+    print("overlapping monthly archives: deduped, gaps reported, tail after the gap stored: OK")
+
+    try:
+        import_archives([archives], KlineStore(os.path.join(root, "strict")), workers=1, strict=True)
+        raise AssertionError("strict import of a gapped series should raise")
+    except ValueError:
+        pass
+    print("strict mode: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Run: cd bot-trading && python tests/test_kline_store.py
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from services.kline_store import KLINE_DTYPE, KlineStore, find_gaps
+
+STEP = 60_000
+START = 1_700_000_000_000 // STEP * STEP
+
+
+def _bars(first: int, count: int, price: float = 100.0) -> np.ndarray:
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + (first + np.arange(count)) * STEP
+    rows["open"] = rows["high"] = rows["low"] = rows["close"] = price + np.arange(count)
+    rows["volume"] = 1.0
+    return rows
+
+
+def _stored(store: KlineStore) -> tuple[list[int], list[float]]:
+    data = store.read("BTCUSDT", "1m")
+    return [int(t - START) // STEP for t in data["timestamp"]], data["close"].tolist()
+
+
+def main():
+    store = KlineStore(tempfile.mkdtemp())
+    assert store.count("BTCUSDT", "1m") == 0 and store.last_timestamp("BTCUSDT", "1m") is None
+    assert store.write("BTCUSDT", "1m", _bars(0, 0), STEP) is False
+
+    assert store.write("BTCUSDT", "1m", _bars(0, 10), STEP)
+    # Overlap: the stored last bar (the forming one) is overwritten and the run extended.
+    assert store.write("BTCUSDT", "1m", _bars(9, 3, price=500), STEP)
+    index, close = _stored(store)
+    assert index == list(range(12)) and close[8:] == [108.0, 500.0, 501.0, 502.0]
+    # Append directly after the last bar; lowercase symbols are the same key.
+    assert store.write("btcusdt", "1m", _bars(12, 2, price=600), STEP)
+    assert store.count("BTCUSDT", "1m") == 14
+    assert store.last_timestamp("BTCUSDT", "1m") == START + 13 * STEP
+    print("overlap overwrite and append: OK")
+
+    # Bars in the middle of the run are rewritten in place of the stored ones.
+    assert store.write("BTCUSDT", "1m", _bars(4, 2, price=700), STEP)
+    index, close = _stored(store)
+    assert index == list(range(14)) and close[3:7] == [103.0, 700.0, 701.0, 106.0]
+    # An older batch ending right before the run is prepended.
+    assert store.write("BTCUSDT", "1m", _bars(-3, 3, price=50), STEP)
+    index, close = _stored(store)
+    assert index == list(range(-3, 14)) and close[:4] == [50.0, 51.0, 52.0, 100.0]
+    assert [int(t - START) // STEP for t in store.tail("BTCUSDT", "1m", 2)["timestamp"]] == [12, 13]
+    print("middle overwrite and adjacent prepend: OK")
+
+    # A newer batch past a gap replaces the run: the store keeps one contiguous run.
+    assert store.write("BTCUSDT", "1m", _bars(20, 5, price=900), STEP)
+    index, close = _stored(store)
+    assert index == list(range(20, 25)) and close == [900.0, 901.0, 902.0, 903.0, 904.0]
+    # An older batch that does not touch the run is refused and leaves it as it was.
+    assert store.write("BTCUSDT", "1m", _bars(0, 10), STEP) is False
+    assert _stored(store)[0] == list(range(20, 25))
+    print("disjoint newer batch replaces, older refused: OK")
+
+    # The stored run survives a new store over the same directory.
+    reopened = KlineStore(store.root)
+    assert np.array_equal(reopened.read("BTCUSDT", "1m"), store.read("BTCUSDT", "1m"))
+    assert not reopened.read("BTCUSDT", "1m").flags.writeable
+    print("reopen: OK")
+
+    ts = np.concatenate([_bars(0, 5), _bars(8, 2), _bars(11, 4)])["timestamp"]
+    assert find_gaps(ts, STEP) == [(START + 5 * STEP, 3), (START + 10 * STEP, 1)]
+    assert find_gaps(_bars(0, 5)["timestamp"], STEP) == []
+    print("find_gaps: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
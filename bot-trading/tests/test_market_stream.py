@@ -0,0 +1,86 @@
+# Run: cd bot-trading && python tests/test_market_stream.py
+
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from services.kline_store import KLINE_DTYPE
+from services.market_stream import MarketStream
+from tests.kline_stream_server import LocalKlineServer
+
+SYMBOL = "SOLUSDT"
+INTERVAL = "1m"
+STEP = 60_000
+START = 1_700_000_000_000 // STEP * STEP
+
+
+def _bars(first: int, count: int) -> np.ndarray:
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = first + np.arange(count) * STEP
+    rows["open"] = rows["high"] = rows["low"] = rows["close"] = 100.0
+    return rows
+
+
+async def _seed(symbol: str, interval: str, limit: int) -> np.ndarray:
+    return _bars(START, 10)
+
+
+async def _wait_until(predicate, timeout: float = 3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise TimeoutError("condition not reached")
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    server = LocalKlineServer()
+    await server.start()
+    stream = MarketStream(url=server.url, capacity=8, seed=_seed)
+
+    await stream.subscribe(SYMBOL, INTERVAL)
+    await stream.subscribe(SYMBOL, INTERVAL)
+    await _wait_until(lambda: stream.get_candles(SYMBOL, INTERVAL, 8) is not None)
+    assert server.subscriptions == {"solusdt@kline_1m"}
+    print("Seeded buffer:", stream.subscriptions())
+
+    # Update the forming bar, then open a new one: the ring keeps the last 8 bars.
+    await server.push_kline(SYMBOL, INTERVAL, START + 9 * STEP, 100, 105, 99, 104, 5)
+    await server.push_kline(SYMBOL, INTERVAL, START + 10 * STEP, 104, 106, 103, 105, 1)
+    await _wait_until(lambda: stream.get_candles(SYMBOL, INTERVAL, 1)["timestamp"][-1] == START + 10 * STEP)
+    rows = stream.get_candles(SYMBOL, INTERVAL, 8)
+    assert rows["timestamp"][0] == START + 3 * STEP
+    assert rows["high"][-2] == 105 and rows["close"][-1] == 105
+    print("Ring buffer tail:", rows["timestamp"].tolist())
+
+    # A skipped bar is a gap: the buffer goes cold until it is re-seeded.
+    await server.push_kline(SYMBOL, INTERVAL, START + 12 * STEP, 105, 105, 105, 105, 1)
+    await asyncio.sleep(0.1)
+    assert stream.get_candles(SYMBOL, INTERVAL, 8)["timestamp"][-1] == START + 9 * STEP
+    print("Gap triggered re-seed")
+
+    # Dropping the socket makes buffers cold; reconnect re-subscribes and re-warms.
+    await server.drop_connections()
+    await _wait_until(lambda: stream.get_candles(SYMBOL, INTERVAL, 8) is None)
+    await _wait_until(lambda: stream.get_candles(SYMBOL, INTERVAL, 8) is not None, timeout=5)
+    assert server.subscriptions == {"solusdt@kline_1m"}
+    print("Reconnected:", stream.subscriptions())
+
+    # Reference counting: the stream is only removed on the last unsubscribe.
+    await stream.unsubscribe(SYMBOL, INTERVAL)
+    assert stream.get_candles(SYMBOL, INTERVAL, 8) is not None
+    await stream.unsubscribe(SYMBOL, INTERVAL)
+    assert stream.get_candles(SYMBOL, INTERVAL, 8) is None
+    print("Unsubscribed:", stream.subscriptions())
+
+    await stream.close()
+    await server.stop()
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+# Run: cd bot-trading && python tests/test_rate_limiter.py
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+
+from services.rate_limiter import Priority, RequestBudget, endpoint_cost
+
+WEIGHT = "x-mbx-used-weight-1m"
+
+
+def _budget(weight_limit: int) -> RequestBudget:
+    return RequestBudget(weight_limit=weight_limit, orders_per_10s=100, orders_per_minute=100, headroom=1.0)
+
+
+def _check_priority():
+    # 600 weight a minute refills 10 tokens a second.
+    budget = _budget(600)
+    assert budget.try_acquire(600)
+    finished = []
+
+    def run(name: str, weight: int, orders: int, priority: Priority):
+        budget.acquire(weight, orders, priority)
+        finished.append(name)
+
+    scan = threading.Thread(target=run, args=("scan", 5, 0, Priority.SCAN))
+    scan.start()
+    while budget.snapshot()["queued"] < 1:
+        time.sleep(0.01)
+    order = threading.Thread(target=run, args=("order", 1, 1, Priority.ORDER))
+    order.start()
+    # Nothing jumps a queue: a free token still goes to the waiters first.
+    assert not budget.try_acquire(1)
+    scan.join()
+    order.join()
+    assert finished == ["order", "scan"], finished
+    print("an ORDER waiter overtakes a queued SCAN: OK")
+
+
+def _check_headers():
+    budget = _budget(2400)
+    weight, _ = endpoint_cost("GET", "/fapi/v1/klines", {"limit": 1500})
+    assert weight == 10
+    budget.record("/fapi/v1/klines", weight, 200, httpx.Headers({"X-MBX-USED-WEIGHT-1M": "2000"}))
+    snapshot = budget.snapshot()
+    assert 399 < snapshot["available"][WEIGHT] < 402, snapshot
+    assert snapshot["endpoints"] == {"/fapi/v1/klines": {"requests": 1, "weight": 10}}
+    assert not budget.try_acquire(500)
+    assert budget.try_acquire(300)
+    print("X-MBX-USED-WEIGHT-1M lowers the available weight: OK")
+
+
+def _check_retry_after():
+    budget = _budget(2400)
+    budget.record("/fapi/v1/klines", 1, 429, httpx.Headers({"Retry-After": "0.5"}))
+    assert budget.snapshot()["paused_for_s"] > 0
+    assert not budget.try_acquire(1)
+
+    async def on_loop():
+        budget.acquire(1)
+
+    try:
+        asyncio.run(on_loop())
+        raise AssertionError("a blocking acquire on the event loop should be refused")
+    except RuntimeError:
+        pass
+
+    started = time.monotonic()
+    budget.acquire(1, priority=Priority.ORDER)
+    assert time.monotonic() - started >= 0.4
+    assert budget.try_acquire(1)
+    print("429 Retry-After pauses every caller: OK")
+
+
+def main():
+    _check_priority()
+    _check_headers()
+    _check_retry_after()
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
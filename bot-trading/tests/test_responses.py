@@ -0,0 +1,80 @@
+# Run: cd bot-trading && python tests/test_responses.py
+
+import sys
+import os
+import json
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = tempfile.mkdtemp()
+os.environ["CANDLE_SOURCE"] = "file"
+os.environ["CANDLE_SOURCE_DIR"] = ROOT
+
+import numpy as np
+
+from routers.responses import FastJSONResponse
+from services.analysis_records import OrderBlock, SwingPoint
+from services.kline_store import KLINE_DTYPE
+from services.smc_service import SmcService
+from services.wyckoff_service import WyckoffService
+
+STEP = 3_600_000
+START = 1_700_000_000_000 // 86_400_000 * 86_400_000
+
+
+def _bars(count: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + np.arange(count) * STEP
+    rows["close"] = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows["open"] = np.r_[rows["close"][0], rows["close"][:-1]]
+    rows["high"] = np.maximum(rows["open"], rows["close"]) + rng.random(count)
+    rows["low"] = np.minimum(rows["open"], rows["close"]) - rng.random(count)
+    rows["volume"] = rng.random(count) * 1000
+    return rows
+
+
+def main():
+    np.save(os.path.join(ROOT, "BTCUSDT_1h.npy"), _bars(500))
+
+    # Service payloads are plain JSON (the agents json.dumps tool results);
+    # the router encoder writes the same document, key order included.
+    payloads = [
+        SmcService().smc_analysis("BTCUSDT", "1h", 200),
+        SmcService().smc_analysis("BTCUSDT", "1h", 200, fields=["structure_levels", "liquidity_pools"]),
+        WyckoffService().wyckoff_analysis("BTCUSDT", "1h", 200),
+    ]
+    for payload in payloads:
+        assert "result" in payload, payload
+        body = FastJSONResponse(payload).body
+        assert json.loads(body) == json.loads(json.dumps(payload))
+        assert list(json.loads(body)["result"]) == list(payload["result"])
+    print("SMC / Wyckoff payloads: OK")
+
+    # Records and numpy scalars left in the content are still encoded.
+    content = {
+        "swing": SwingPoint(3, 101.5, "high"),
+        "blocks": [OrderBlock("bullish", 7, 102.0, 100.0, None, 2)],
+        "count": np.int64(4),
+        "price": np.float64(99.25),
+    }
+    assert json.loads(FastJSONResponse(content).body) == {
+        "swing": {"index": 3, "price": 101.5, "type": "high"},
+        "blocks": [{"type": "bullish", "index": 7, "high": 102.0, "low": 100.0, "mitigated": False,
+                    "mitigated_index": None, "strength": 2}],
+        "count": 4,
+        "price": 99.25,
+    }
+    try:
+        FastJSONResponse({"bad": object()})
+        raise AssertionError("an unknown type should raise")
+    except TypeError:
+        pass
+    print("records and numpy scalars: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
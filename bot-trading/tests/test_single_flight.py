@@ -0,0 +1,147 @@
+# Run: cd bot-trading && python tests/test_single_flight.py
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.single_flight import SingleFlight
+
+
+def _run_threads(count: int, target) -> list:
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i: int):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _check_threads():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = _run_threads(8, lambda: flight.do("k", work))
+    assert len(calls) == 1 and all(r is results[0] for r in results), calls
+    # Nothing is cached: the next call runs the work again.
+    flight.do("k", work)
+    assert len(calls) == 2
+    print("concurrent do() callers share one call: OK")
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    results = _run_threads(8, lambda: flight.do("k", fail))
+    assert all(isinstance(r, ValueError) for r in results) and all(r is results[0] for r in results)
+    print("an exception reaches every waiter: OK")
+
+
+def _check_coroutines_join_thread():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append("thread")
+        started.set()
+        release.wait()
+        return "from thread"
+
+    async def never():
+        calls.append("coroutine")
+        return "from coroutine"
+
+    async def main():
+        leader = threading.Thread(target=flight.do, args=("k", work))
+        leader.start()
+        started.wait()
+        waiters = [asyncio.create_task(flight.do_async("k", never)) for _ in range(5)]
+        while len(flight._calls["k"].waiters) < 5:
+            await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        leader.join()
+        return results
+
+    assert asyncio.run(main()) == ["from thread"] * 5
+    assert calls == ["thread"]
+    print("coroutines join a thread leader: OK")
+
+
+def _check_blocking_caller_of_coroutine_leader():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "from coroutine"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        # Waiting here would block the loop the leader needs to finish.
+        assert flight.do("k", lambda: "own") == "own"
+        release.set()
+        return await leader
+
+    assert asyncio.run(main()) == "from coroutine"
+    print("a blocking caller runs the work itself under a coroutine leader: OK")
+
+
+def _check_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(3600 if len(calls) == 1 else 0.05)
+        return "retried"
+
+    async def main():
+        leader = asyncio.create_task(flight.do_async("k", work))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.do_async("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        try:
+            await leader
+            raise AssertionError("the cancelled leader should raise")
+        except asyncio.CancelledError:
+            pass
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["retried"] * 3
+    assert len(calls) == 2
+    print("waiters of a cancelled coroutine leader retry once: OK")
+
+
+def main():
+    _check_threads()
+    _check_coroutines_join_thread()
+    _check_blocking_caller_of_coroutine_leader()
+    _check_cancelled_leader()
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# Run: cd bot-trading && python tests/test_smc_engine.py
+
+import sys
+import os
+import math
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+import config
+from services import smc_results
+from services.analysis_records import Record, SwingPoint
+from services.candle_frame import CandleFrame
+from services.smc_engine import SmcEngine
+from services.smc_service import SmcService
+
+
+def _bars(seed: int, count: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count) + np.repeat(rng.normal(0, 0.004, count // 50 + 1), 50)[:count]))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.006, count)) * close * (1 + 3 * (rng.random(count) < 0.04))
+    high = np.maximum(open_, close) + spread * rng.random(count)
+    low = np.minimum(open_, close) - spread * rng.random(count)
+    ts = 1_700_000_000_000 + np.arange(count) * 3_600_000
+    return CandleFrame(ts, open_, high, low, close, rng.random(count) * 1000).to_dicts()
+
+
+def _assert_same(expected, got, path="smc"):
+    if isinstance(expected, Record):
+        assert type(expected) is type(got), (path, expected, got)
+        _assert_same(expected.to_dict(), got.to_dict(), path)
+    elif isinstance(expected, dict):
+        assert list(expected) == list(got), path
+        for key in expected:
+            _assert_same(expected[key], got[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(expected) == len(got), (path, len(expected), len(got))
+        for i, (a, b) in enumerate(zip(expected, got)):
+            _assert_same(a, b, f"{path}[{i}]")
+    elif isinstance(expected, float) and isinstance(got, float):
+        assert math.isclose(expected, got, rel_tol=1e-9, abs_tol=1e-9), (path, expected, got)
+    else:
+        assert expected == got, (path, expected, got)
+
+
+def _reference_pools(kind, pivots, tolerance, high, low):
+    """O(p^2) clustering: each unclaimed pivot, lowest price first, claims every pivot within tolerance above it."""
+    points = sorted({p.index: p.price for p in pivots}.items(), key=lambda point: point[1])
+    claimed, pools = set(), []
+    for anchor, price in points:
+        if anchor in claimed:
+            continue
+        members = [(i, q) for i, q in points if i not in claimed and 0 <= q - price <= tolerance]
+        claimed.update(i for i, _ in members)
+        if len(members) < 2:
+            continue
+        lo, hi = min(q for _, q in members), max(q for _, q in members)
+        level = hi if kind == "buy_side" else lo
+        last = max(i for i, _ in members)
+        later = high[last + 1:] if kind == "buy_side" else low[last + 1:]
+        swept = bool(len(later)) and (later.max() > level if kind == "buy_side" else later.min() < level)
+        pools.append((kind, level, lo, hi, len(members), min(i for i, _ in members), last, swept))
+    return pools
+
+
+def _check_liquidity_pools():
+    rng = np.random.default_rng(7)
+    for trial in range(40):
+        n = 400
+        high = 100 + rng.normal(0, 2, n).cumsum() * 0.1 + rng.random(n)
+        low = high - 1 - rng.random(n)
+        # Pivot prices on a coarse grid, so many land within tolerance of each other.
+        picks = rng.choice(n, 60, replace=False)
+        highs = [SwingPoint(int(i), float(100 + rng.integers(0, 12) * 0.05), "high") for i in picks[:30]]
+        lows = [SwingPoint(int(i), float(99 + rng.integers(0, 12) * 0.05), "low") for i in picks[30:]]
+        atr = float(rng.uniform(0.3, 1.5))
+        high_suffix = np.maximum.accumulate(high[::-1])[::-1]
+        low_suffix = np.minimum.accumulate(low[::-1])[::-1]
+
+        pools = smc_results.liquidity_pools(highs, lows, atr, high_suffix, low_suffix)
+        tolerance = config.SMC_LIQUIDITY_TOLERANCE_ATR * atr
+        expected = _reference_pools("buy_side", highs, tolerance, high, low) + _reference_pools(
+            "sell_side", lows, tolerance, high, low
+        )
+        got = [tuple(pool.to_dict().values()) for pool in pools]
+        assert sorted(got) == sorted(expected), trial
+        assert all(pool.touches >= 2 for pool in pools)
+
+        # Swing and internal lists repeat pivots; a repeated index is one touch.
+        doubled = smc_results.liquidity_pools(highs + highs[::2], lows + lows[1::2], atr, high_suffix, low_suffix)
+        assert doubled == pools, trial
+
+        price = float(rng.uniform(99, 101))
+        nearest = smc_results.nearest(pools, price)
+        assert len(nearest) == min(10, len(pools))
+        distances = sorted(abs(pool.level - price) for pool in pools)
+        assert [abs(pool.level - price) for pool in nearest] == distances[:10]
+    print("liquidity pools == pairwise reference: OK")
+
+    # The swept flag reads only the bars after the last touch.
+    high = np.array([10.0, 12.0, 10.0, 10.0, 9.0, 9.5])
+    low = high - 1
+    suffix = np.maximum.accumulate(high[::-1])[::-1]
+    touches = [SwingPoint(1, 12.0, "high"), SwingPoint(3, 11.99, "high")]
+    (pool,) = smc_results.liquidity_pools(touches, [], 1.0, suffix, low)
+    assert (pool.level, pool.touches, pool.first_index, pool.last_index, pool.swept) == (12.0, 2, 1, 3, False)
+    high[5] = 12.5
+    suffix = np.maximum.accumulate(high[::-1])[::-1]
+    (pool,) = smc_results.liquidity_pools(touches, [], 1.0, suffix, low)
+    assert pool.swept
+    (pool,) = smc_results.liquidity_pools(touches + [SwingPoint(5, 12.5, "high")], [], 10.0, suffix, low)
+    assert (pool.touches, pool.last_index, pool.swept) == (3, 5, False)
+    print("swept flag: OK")
+
+
+def main():
+    smc = SmcService()
+    rnd = random.Random(3)
+    for seed in range(3):
+        bars = _bars(seed, 500)
+        engine = SmcEngine()
+        for n, bar in enumerate(bars, 1):
+            # Forming-bar updates replace the last bar before it closes.
+            if rnd.random() < 0.3:
+                forming = dict(bar, close=bar["close"] * (1 + rnd.uniform(-0.02, 0.02)))
+                forming["high"] = max(forming["high"], forming["close"])
+                forming["low"] = min(forming["low"], forming["close"])
+                engine.update(forming)
+            engine.update(bar)
+            if n % 10 == 0 or n in (59, 60, 201):
+                frame = CandleFrame.from_dicts(bars[:n])
+                _assert_same(smc._calc_smc(frame), engine.snapshot())
+                _assert_same(smc._calc_classic_indicators(frame), engine.indicators(), "indicators")
+    print("bar-by-bar snapshot == batch _calc_smc: OK")
+
+    # as_of() replays from the nearest checkpoint, including the forming-bar rewrites above.
+    engine = SmcEngine(checkpoint_every=7)
+    for bar in bars:
+        engine.update(dict(bar, close=bar["close"] * 1.01, high=bar["high"] * 1.01))
+        engine.update(bar)
+    for n in (1, 7, 59, 60, 61, 300, 500):
+        past = engine.as_of(n - 1)
+        frame = CandleFrame.from_dicts(bars[:n])
+        _assert_same(smc._calc_smc(frame), past.snapshot())
+        _assert_same(smc._calc_classic_indicators(frame), past.indicators(), "indicators")
+    _assert_same(smc._calc_smc(CandleFrame.from_dicts(bars)), engine.snapshot())
+    print("as_of() from checkpoints == batch _calc_smc: OK")
+
+    try:
+        engine.update(bars[0])
+        raise AssertionError("an older bar should raise")
+    except ValueError:
+        pass
+
+    _check_liquidity_pools()
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
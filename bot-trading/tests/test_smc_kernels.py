@@ -0,0 +1,54 @@
+# Run: cd bot-trading && python tests/test_smc_kernels.py
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from services import smc_kernels
+from services.analysis_context import AnalysisContext
+from services.candle_frame import CandleFrame
+from services.smc_service import SmcService
+from services.smc_structure import StructureTracker
+
+
+def _bars(seed: int, count: int) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count) + np.repeat(rng.normal(0, 0.004, count // 50 + 1), 50)[:count]))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.006, count)) * close * (1 + 3 * (rng.random(count) < 0.04))
+    high = np.maximum(open_, close) + spread * rng.random(count)
+    low = np.minimum(open_, close) - spread * rng.random(count)
+    ts = 1_700_000_000_000 + np.arange(count) * 3_600_000
+    return CandleFrame(ts, open_, high, low, close, rng.random(count) * 1000).to_dicts()
+
+
+def main():
+    # The kernels run compiled with Numba and as plain Python without it; both must match the NumPy path.
+    print("Numba kernels compiled:", smc_kernels.ENABLED)
+    smc = SmcService()
+    for seed in range(3):
+        frame = CandleFrame.from_dicts(_bars(seed, 3000))
+        results = []
+        for enabled in (False, True):
+            smc_kernels.ENABLED = enabled
+            results.append(smc._calc_smc(frame))
+            for size in (3, 5, 50):
+                highs, lows = smc._find_swings(frame, size)
+                tracker = StructureTracker(highs, lows)
+                tracker.advance(frame.close.tolist(), 0, len(frame))
+                level = smc._structure(AnalysisContext(frame), size)
+                assert (tracker.trend, tracker.last_bos, tracker.last_choch) == (
+                    level.trend, level.last_bos, level.last_choch
+                ), (seed, size, enabled)
+                assert tracker.breaks == level.breaks, (seed, size, enabled)
+        assert results[0] == results[1], seed
+    print("kernel path == NumPy path: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
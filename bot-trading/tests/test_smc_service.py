@@ -0,0 +1,75 @@
+# Run: cd bot-trading && python tests/test_smc_service.py
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = tempfile.mkdtemp()
+os.environ["CANDLE_SOURCE"] = "file"
+os.environ["CANDLE_SOURCE_DIR"] = ROOT
+
+import numpy as np
+
+from services.candle_frame import CandleFrame
+from services.kline_store import KLINE_DTYPE
+from services.smc_service import SmcService
+
+STEP = 3_600_000
+START = 1_700_000_000_000 // 86_400_000 * 86_400_000
+
+
+def _bars(count: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    rows = np.zeros(count, dtype=KLINE_DTYPE)
+    rows["timestamp"] = START + np.arange(count) * STEP
+    rows["close"] = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows["open"] = np.r_[rows["close"][0], rows["close"][:-1]]
+    rows["high"] = np.maximum(rows["open"], rows["close"]) + rng.random(count)
+    rows["low"] = np.minimum(rows["open"], rows["close"]) - rng.random(count)
+    rows["volume"] = rng.random(count) * 1000
+    return rows
+
+
+def main():
+    rows = _bars(500)
+    np.save(os.path.join(ROOT, "BTCUSDT_1h.npy"), rows)
+    service = SmcService()
+
+    smc = service.smc_analysis("BTCUSDT", "1h", 200)
+    assert "result" in smc, smc
+    partial = service.smc_analysis("BTCUSDT", "1h", 200, fields=["rsi14", "trend"])
+    assert list(partial["result"]) == ["symbol", "timeframe", "current_price", "trend", "rsi14"], partial
+    assert partial["result"]["rsi14"] == smc["result"]["rsi14"]
+    assert service.smc_analysis("BTCUSDT", "1h", 200, fields=["nope"])["status"] == "error"
+    print("fields selection: OK")
+
+    # Swing size 50 is the main structure and 5 the internal one.
+    assert "structure_levels" not in smc["result"]
+    levels = service.smc_analysis("BTCUSDT", "1h", 200, fields=["structure_levels"])["result"]["structure_levels"]
+    by_size = {level["size"]: level for level in levels}
+    assert sorted(by_size) == [3, 5, 10, 20, 50]
+    assert by_size[50]["trend"] == smc["result"]["trend"]
+    assert by_size[5]["last_bos"] == smc["result"]["internal_last_bos"]
+    print("structure_levels: OK")
+
+    # as_of reads the same 200-bar window: the latest bar is the plain analysis,
+    # an earlier one is the analysis of the window's bars up to it.
+    latest = service.smc_analysis("BTCUSDT", "1h", 200, as_of=int(rows["timestamp"][-1]))["result"]
+    assert latest["order_blocks"] == smc["result"]["order_blocks"]
+    assert latest["candles"] == smc["result"]["candles"]
+    past = service.smc_analysis("BTCUSDT", "1h", 200, fields=["candles", "trend"], as_of=int(rows["timestamp"][-30]))
+    assert past["result"]["current_price"] == rows["close"][-30]
+    assert past["result"]["candles"][-1]["timestamp"] == rows["timestamp"][-30]
+    expected = service._calc_smc(CandleFrame.from_records(rows[-200:-29]))
+    assert past["result"]["trend"] == expected["trend"]
+    assert service.smc_analysis("BTCUSDT", "1h", 200, as_of=int(rows["timestamp"][-201]))["status"] == "error"
+    assert service.smc_analysis("BTCUSDT", "1h", 200, as_of=0)["status"] == "error"
+    print("as_of: OK")
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,25 @@
 from connectors.binance_v2 import BinanceConnector
-from services.candle_service import CandleService
+from services.candle_source import candle_source
+from services.market_analysis import MarketAnalysisService
 from services.smc_service import SmcService
 from services.wyckoff_service import WyckoffService
 
 binance_connector = BinanceConnector()
-_candle_service = CandleService()
 _smc_service = SmcService()
 _wyckoff_service = WyckoffService()
+_market_analysis_service = MarketAnalysisService()
 
 
 class CXConnector:
-    def smc_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
-        return _smc_service.smc_analysis(symbol, timeframe, limit)
+    def smc_analysis(
+        self, symbol: str, timeframe: str = "1h", limit: int = 200, fields: list[str] | None = None
+    ) -> dict:
+        return _smc_service.smc_analysis(symbol, timeframe, limit, fields)
+
+    def smc_analysis_multi(
+        self, symbol: str, timeframes: list[str], limit: int = 200, base_interval: str = "30m"
+    ) -> dict[str, dict]:
+        return _smc_service.smc_analysis_multi(symbol, timeframes, limit, base_interval)
 
     def create_order(
         self,
@@ -38,8 +46,11 @@ class CXConnector:
             return {"status": "error", "message": str(e)}
 
     def get_ticker(self, symbol: str, timeframe: str = "1h"):
-        candles = _candle_service.fetch_candles(symbol, timeframe, limit=100)
+        candles = candle_source.fetch_candles(symbol, timeframe, limit=100)
         return {"result": candles}
 
     def wyckoff_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
         return _wyckoff_service.wyckoff_analysis(symbol, timeframe, limit)
+
+    def market_analysis(self, symbol: str, timeframe: str = "1h", limit: int = 200) -> dict:
+        return _market_analysis_service.market_analysis(symbol, timeframe, limit)
@@ -66,6 +66,17 @@ export interface SwingPoint {
   type: 'high' | 'low';
 }
 
+export interface LiquidityPool {
+  type: 'buy_side' | 'sell_side';
+  level: number;
+  low: number;
+  high: number;
+  touches: number;
+  first_index: number;
+  last_index: number;
+  swept: boolean;
+}
+
 export interface PotentialEntry {
   type: Direction;
   zone_high: number;
@@ -101,6 +112,7 @@ export interface SmcAnalysisResult {
   range_low: number;
   buy_side_liquidity: number[];
   sell_side_liquidity: number[];
+  liquidity_pools: LiquidityPool[];
   swing_highs: SwingPoint[];
   swing_lows: SwingPoint[];
   internal_last_bos: BosChoch | null;
@@ -131,12 +143,15 @@ export async function smcAnalysis(
   symbol: string,
   timeframe = '1h',
   limit = 200,
+  asOf?: number,
 ): Promise<SmcAnalysisResponse> {
   const params = new URLSearchParams({
     symbol,
     timeframe,
     limit: String(limit),
   });
+  // Open time (ms) of a past bar: the analysis as it stood at that bar
+  if (asOf !== undefined) params.set('as_of', String(asOf));
   const res = await fetch(`${BOT_BASE_URL}/trading/smc?${params}`);
   return res.json();
 }